@@ -0,0 +1,82 @@
+"""
+Benchmark decoding of ConfigExtract data rows.
+
+Compares the previous per-line decode (split, strip, a new csv.reader and a
+header -> value dict for every row) with InidbiParser's block decoder, then
+times the full iter_classes pipeline on the same file.
+
+Usage: python benchmarks/bench_ini_decode.py [--rows 2000000]
+"""
+import argparse
+import csv
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from benchmarks.synthetic import scale_config_ini
+from src.core.parser_ini import InidbiParser, BLOCK_SIZE
+
+def legacy_decode(path: Path, default_headers) -> int:
+    """Decode rows the way the parser did before the block decoder"""
+    count = 0
+    category = None
+    headers = default_headers
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(';'):
+                continue
+            if line.startswith('[CategoryData_'):
+                category = line[13:-1]
+                continue
+            if line.startswith('header='):
+                headers = [h.strip() for h in next(csv.reader([line[7:].strip('"')]))]
+                continue
+            if category and '=' in line:
+                idx, data = line.split('=', 1)
+                fields = next(csv.reader([data.strip().strip('"')]))
+                row = {header: fields[i].strip() if i < len(fields) else ""
+                       for i, header in enumerate(headers)}
+                count += bool(row)
+    return count
+
+def block_decode(path: Path, parser: InidbiParser) -> int:
+    """Decode rows with the block decoder, without building classes"""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        blocks = iter(lambda: f.readlines(BLOCK_SIZE), [])
+        return sum(len(rows) for _, _, rows in parser._decode_blocks(blocks))
+
+def time_best(label: str, func, repeat: int) -> float:
+    """Run func repeat times and print the best wall time"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<26} {count:>9} rows {best:8.2f}s  {count / best:>12,.0f} rows/s")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark INIDBI row decoding")
+    parser.add_argument("--rows", type=int, default=2000000, help="Number of INI rows to generate")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per variant (best is reported)")
+    args = parser.parse_args()
+
+    ini_parser = InidbiParser()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ini_path = scale_config_ini(Path(tmp_dir) / "ConfigExtract_bench.ini", args.rows)
+        print(f"{ini_path.stat().st_size / 1e6:.0f} MB ConfigExtract file")
+
+        legacy = time_best("csv.reader per line", lambda: legacy_decode(ini_path, ini_parser._default_headers), args.repeat)
+        block = time_best("block decoder", lambda: block_decode(ini_path, ini_parser), args.repeat)
+        time_best("iter_classes (end to end)", lambda: sum(1 for _ in ini_parser.iter_classes(ini_path)), args.repeat)
+
+    print(f"\nDecode speedup: {legacy / block:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Measure resident memory of classes decoded from a large ConfigExtract file.
+
+Usage: python benchmarks/bench_ini_memory.py [--rows 150000]
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from benchmarks.synthetic import scale_config_ini
+from src.core.parser_ini import InidbiParser
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure INI class memory footprint")
+    parser.add_argument("--rows", type=int, default=150000, help="Number of INI rows to generate")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ini_path = scale_config_ini(Path(tmp_dir) / "ConfigExtract_bench.ini", args.rows)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        classes = list(InidbiParser().iter_classes(ini_path))
+        elapsed = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"{len(classes)} classes decoded in {elapsed:.2f}s (traced)")
+    print(f"Resident: {current / 1e6:.1f} MB ({current / len(classes):.0f} B/class), peak {peak / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    main()
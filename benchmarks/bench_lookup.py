@@ -0,0 +1,77 @@
+"""
+Benchmark case-insensitive class existence checks on a large ClassDatabase.
+
+Compares the previous lookup (a LOWER() Python UDF evaluated against every
+row) with the indexed name_folded column and the in-process name set.
+
+Usage: python benchmarks/bench_lookup.py [--classes 100000] [--lookups 2000]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.core.database import ClassDatabase
+from src.core.models import ClassDef
+
+def build_database(count: int) -> ClassDatabase:
+    """Build an in-memory database with count synthetic classes"""
+    database = ClassDatabase()
+    database.add_classes(
+        ClassDef(name=f"Bench_Class_{i}", parent=f"Bench_Class_{i // 10}" if i else None, source="bench")
+        for i in range(count)
+    )
+    return database
+
+def time_lookups(label: str, lookup, names) -> float:
+    """Time lookup over names and print the per-call cost"""
+    start = time.perf_counter()
+    for name in names:
+        lookup(name)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f}s  {elapsed / len(names) * 1e6:10.1f} us/lookup")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ClassDatabase lookups")
+    parser.add_argument("--classes", type=int, default=100000, help="Number of classes to load")
+    parser.add_argument("--lookups", type=int, default=2000, help="Number of lookups to time")
+    args = parser.parse_args()
+
+    database = build_database(args.classes)
+    conn = database._get_connection()
+
+    # Half hits with mangled case, half misses
+    rng = random.Random(0)
+    names = [f"bench_CLASS_{rng.randrange(args.classes)}" for _ in range(args.lookups // 2)]
+    names += [f"Missing_Class_{i}" for i in range(args.lookups - len(names))]
+    rng.shuffle(names)
+
+    # Previous behaviour: LOWER overridden by a Python UDF, forcing a full scan
+    conn.create_function("PY_LOWER", 1, lambda x: x.lower() if x else None)
+    def legacy(name):
+        return conn.execute(
+            "SELECT EXISTS(SELECT 1 FROM classes WHERE PY_LOWER(name) = PY_LOWER(?) LIMIT 1)",
+            (name,)).fetchone()[0]
+
+    def indexed(name):
+        return conn.execute(
+            "SELECT EXISTS(SELECT 1 FROM classes WHERE name_folded = ? LIMIT 1)",
+            (name.lower(),)).fetchone()[0]
+
+    print(f"{args.classes} classes, {len(names)} lookups")
+    legacy_time = time_lookups("UDF scan (previous, sampled)", legacy, names[:max(1, len(names) // 20)]) * 20
+    indexed_time = time_lookups("name_folded index", indexed, names)
+    database.get_class(names[0])  # load the name set outside the timed region
+    set_time = time_lookups("in-process name set", database.get_class, names)
+
+    print(f"\nSpeedup vs UDF scan (extrapolated): index {legacy_time / indexed_time:,.0f}x, "
+          f"name set {legacy_time / set_time:,.0f}x")
+
+if __name__ == "__main__":
+    main()
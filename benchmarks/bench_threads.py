@@ -0,0 +1,84 @@
+"""
+Benchmark ClassDatabase lookup throughput with several reader threads.
+
+Builds an on-disk snapshot-style database, opens it read-only and runs the
+same batch of lookups on 1, 2, 4 ... threads sharing the one ClassDatabase.
+SQLite queries release the GIL, so the per-thread connections let class
+history lookups scale with cores; name set lookups stay GIL-bound.
+
+Usage: python benchmarks/bench_threads.py [--classes 100000] [--lookups 20000] [--threads 8]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.core.database import ClassDatabase
+from src.core.models import ClassDef
+
+def build_database(path: Path, count: int) -> None:
+    """Write an on-disk database with count synthetic classes"""
+    database = ClassDatabase(path)
+    database.add_classes(
+        ClassDef(name=f"Bench_Class_{i}", parent=f"Bench_Class_{i // 10}" if i else None, source="bench",
+                 properties={"scope": "2", "displayName": f"Bench {i}"})
+        for i in range(count)
+    )
+    database.finalize()
+    database.close()
+
+def time_threads(label: str, lookup, names, threads: int, baseline: float = None) -> float:
+    """Time lookup over names split across threads and print the throughput"""
+    chunks = [names[i::threads] for i in range(threads)]
+
+    def run(chunk):
+        for name in chunk:
+            lookup(name)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(run, [names[:threads]] * threads))  # Open each thread's connection untimed
+        start = time.perf_counter()
+        list(pool.map(run, chunks))
+        elapsed = time.perf_counter() - start
+
+    rate = len(names) / elapsed
+    print(f"{label:<20} {threads:>2} threads {rate:14,.0f} lookups/s  {rate / (baseline or rate):5.2f}x")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent ClassDatabase readers")
+    parser.add_argument("--classes", type=int, default=100000, help="Number of classes to load")
+    parser.add_argument("--lookups", type=int, default=20000, help="Number of lookups per run")
+    parser.add_argument("--threads", type=int, default=8, help="Largest thread count to try")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    names = [f"bench_CLASS_{rng.randrange(args.classes)}" for _ in range(args.lookups)]
+    thread_counts = [1]
+    while thread_counts[-1] * 2 <= args.threads:
+        thread_counts.append(thread_counts[-1] * 2)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = Path(tmp_dir) / "bench.db"
+        build_database(db_path, args.classes)
+        database = ClassDatabase(db_path, read_only=True)
+        database.get_class(names[0])  # Load the name set outside the timed region
+
+        print(f"{args.classes} classes, {len(names)} lookups per run")
+        for label, lookup in (("class history (SQL)", database.get_class_history),
+                              ("name set", database.get_class)):
+            baseline = None
+            for threads in thread_counts:
+                rate = time_threads(label, lookup, names, threads, baseline)
+                baseline = baseline or rate
+        database.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Synthetic ConfigExtract files for benchmarks, scaled up from tests/config.ini"""
+from pathlib import Path
+
+TEMPLATE = Path(__file__).parent.parent / "tests" / "config.ini"
+
+def scale_config_ini(target: Path, rows: int) -> Path:
+    """
+    Write a ConfigExtract file with roughly rows data lines.
+
+    Each section of tests/config.ini is repeated with numbered class names
+    until it holds its share of rows, keeping the original sources, parents
+    and header layout.
+    """
+    sections = []
+    for line in TEMPLATE.read_text().splitlines():
+        if line.startswith('['):
+            sections.append((line, [], []))
+        elif line.startswith('header='):
+            sections[-1][1].append(line)
+        elif '=' in line:
+            sections[-1][2].append(line.split('=', 1)[1])
+
+    per_section = max(1, rows // len(sections))
+    with open(target, 'w', encoding='utf-8') as f:
+        for section, headers, data in sections:
+            f.write(section + '\n')
+            for header in headers:
+                f.write(header + '\n')
+            for i in range(per_section):
+                name, rest = data[i % len(data)].split(',', 1)
+                f.write(f'{i}={name}_{i},{rest}\n')
+    return target
@@ -7,11 +7,15 @@ import argparse
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
 
-from src.core.database import ClassDatabase
+from src.core.database import ClassDatabase, BLOOM_ERROR_RATE
 from src.core.validator import MissionValidator, MissionValidationError
 from src.core.parser_ini import InidbiParser
+from src.core.snapshot import SnapshotManager
+from src.core.models import IniStats, ConfigDiff, PackCoverage
+from src.core.attribution import AttributionIndex
+from src.core.cache import CacheManager, format_stats
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set
 import sys
 from datetime import datetime
 import yaml
@@ -35,26 +39,34 @@ def log_error(error: MissionValidationError, log_file: str) -> None:
             logger.error(f"  {key}: {value}")
 
 def validate_ini_file(ini_path: Path) -> Optional[str]:
-    """Validate INIDBI config file"""
+    """Validate INIDBI config file with a single streaming pass"""
     try:
         if not ini_path.exists():
             return f"INIDBI config file not found: {ini_path}"
-            
-        parser = InidbiParser()
-        classes = parser.parse_file(ini_path)
-        
-        if not classes:
-            return "No classes found in INIDBI config file"
-            
-        logging.info(f"\nINIDB Config Analysis:")
-        logging.info(f"Found {len(classes)} base class definitions")
-        
-        return None
+
+        stats = IniStats()
+        for _ in InidbiParser().iter_classes(ini_path, stats=stats):
+            pass
+        return validate_ini_stats(stats)
         
     except Exception as e:
         return f"Error parsing INIDBI config: {str(e)}"
 
-def write_validation_report(validator: MissionValidator, mission_path: Path) -> Path:
+def validate_ini_stats(stats: Optional[IniStats]) -> Optional[str]:
+    """Validate statistics gathered while ingesting an INIDBI config"""
+    if not stats or not stats.classes:
+        return "No classes found in INIDBI config file"
+
+    logging.info(f"\nINIDB Config Analysis:")
+    logging.info(f"Found {stats.classes} class definitions from {len(stats.sources)} sources "
+                 f"in {len(stats.categories)} categories")
+    if stats.malformed_lines:
+        logging.warning(f"Skipped {stats.malformed_lines} malformed lines")
+
+    return None
+
+def write_validation_report(validator: MissionValidator, mission_path: Path,
+                            ini_stats: Optional[IniStats] = None) -> Path:
     """Write enhanced validation report to disk"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     report_dir = Path("reports")
@@ -72,6 +84,14 @@ def write_validation_report(validator: MissionValidator, mission_path: Path) ->
         f.write(f"Mission: {mission_name}\n\n")
 
         summary = validator.get_validation_summary()
+        if ini_stats:
+            summary = {**summary, 'config': ini_stats.to_dict()}
+            f.write("Config Statistics\n")
+            f.write("-" * 20 + "\n")
+            f.write(f"Classes: {ini_stats.classes}\n")
+            f.write(f"Sources: {len(ini_stats.sources)}\n")
+            f.write(f"Categories: {len(ini_stats.categories)}\n")
+            f.write(f"Malformed Lines: {ini_stats.malformed_lines}\n\n")
         
         # Write overall statistics
         f.write("Overall Statistics\n")
@@ -121,6 +141,128 @@ def write_validation_report(validator: MissionValidator, mission_path: Path) ->
 
     return report_path
 
+def write_diff_report(diff: ConfigDiff, ini_path: Path) -> Path:
+    """Write the classes changed by an incremental config update to disk"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    report_dir = Path("reports")
+    report_dir.mkdir(exist_ok=True)
+
+    report_path = report_dir / f"config_diff_{ini_path.stem}_{timestamp}.txt"
+    summary = diff.to_dict()
+
+    with open(report_path, 'w') as f:
+        f.write("Config Diff Report\n")
+        f.write("=" * 50 + "\n\n")
+        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"Config: {ini_path}\n\n")
+
+        f.write(f"Added: {summary['added']}\n")
+        f.write(f"Removed: {summary['removed']}\n")
+        f.write(f"Changed: {summary['changed']}\n")
+        f.write(f"Unchanged: {summary['unchanged']}\n")
+
+        for change in ("added", "removed", "changed"):
+            if not summary['classes'][change]:
+                continue
+            f.write(f"\n{change.capitalize()} Classes\n")
+            f.write("-" * 20 + "\n")
+            for source, names in summary['classes'][change].items():
+                f.write(f"\n  {source}:\n")
+                for name in names:
+                    f.write(f"    - {name}\n")
+
+    yaml_path = report_path.with_suffix('.yml')
+    with open(yaml_path, 'w') as f:
+        yaml.safe_dump(summary, f)
+
+    return report_path
+
+def write_coverage_report(coverage: Dict[str, PackCoverage], mission_path: Path) -> Path:
+    """Write which modpacks provide a mission's referenced classes to disk"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    report_dir = Path("reports")
+    report_dir.mkdir(exist_ok=True)
+
+    report_path = report_dir / f"pack_coverage_{mission_path.name}_{timestamp}.txt"
+    summary = {pack: result.to_dict() for pack, result in coverage.items()}
+
+    with open(report_path, 'w') as f:
+        f.write("Modpack Coverage Report\n")
+        f.write("=" * 50 + "\n\n")
+        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"Mission: {mission_path.name}\n\n")
+
+        for pack, result in summary.items():
+            status = "complete" if not result['missing'] else f"{len(result['missing'])} missing"
+            f.write(f"{pack}: {result['found']}/{result['total']} classes ({status})\n")
+
+        for pack, result in summary.items():
+            f.write(f"\n{pack}\n")
+            f.write("-" * 20 + "\n")
+            for source, names in result['sources'].items():
+                f.write(f"  {source}: {len(names)} classes\n")
+            if result['missing']:
+                f.write("\n  Missing Classes:\n")
+                for name in result['missing']:
+                    f.write(f"    - {name}\n")
+
+    yaml_path = report_path.with_suffix('.yml')
+    with open(yaml_path, 'w') as f:
+        yaml.safe_dump(summary, f)
+
+    return report_path
+
+def compare_packs(snapshots: SnapshotManager, database: ClassDatabase, paths: Dict[str, Path],
+                  configs: List[str], references: Set[str]) -> Dict[str, PackCoverage]:
+    """Check the mission's references against the loaded config and every compared one at once"""
+    index = AttributionIndex()
+    index.add_pack(paths["Config"].stem, database)
+    indexed = {paths["Config"].resolve()}
+    for config in map(Path, configs):
+        if config.resolve() in indexed:
+            logging.warning(f"Skipping {config}: already compared")
+            continue
+        indexed.add(config.resolve())
+
+        # Configs from different folders may share a file name
+        label = config.stem
+        suffix = 2
+        while label in index.packs:
+            label = f"{config.stem}-{suffix}"
+            suffix += 1
+        if label != config.stem:
+            logging.warning(f"Pack name {config.stem} is taken, reporting {config} as {label}")
+
+        # Each compared pack keeps its snapshots apart, so exports of one config
+        # family never replace each other's snapshot as stale
+        pack_snapshots = SnapshotManager(snapshots.snapshot_dir / "packs" / label,
+                                         workers=snapshots.workers,
+                                         bloom_error_rate=snapshots.bloom_error_rate)
+        pack_database = pack_snapshots.load(config)
+        try:
+            index.add_pack(label, pack_database)
+        finally:
+            pack_database.close()  # The index keeps what coverage needs
+
+    coverage = index.coverage(references)
+    print("\nModpack Coverage:")
+    print("-" * 60)
+    for pack, result in coverage.items():
+        status = "complete" if result.is_complete else f"{len(result.missing)} missing"
+        print(f"{pack}: {result.found}/{result.total} classes ({status})")
+    print(f"Coverage report written to: {write_coverage_report(coverage, paths['Missions'])}")
+    return coverage
+
+def error_rate(value: str) -> float:
+    """Parse a --bloom-error-rate value: 0, or a rate strictly between 0 and 1"""
+    try:
+        rate = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid rate: {value}")
+    if rate != 0 and not 0 < rate < 1:
+        raise argparse.ArgumentTypeError(f"rate must be 0 or between 0 and 1, got {value}")
+    return rate
+
 def main():
     # Add argument parsing
     parser = argparse.ArgumentParser(description="Check mission files for required classes")
@@ -128,6 +270,25 @@ def main():
     parser.add_argument("--mods", default=r"C:\pcanext", help="Path to mods folder")
     parser.add_argument("--config", help="Path to INIDBI config file", 
                        default=str(Path(__file__).parent.parent / "data" / "ConfigExtract_pcanext.ini"))
+    parser.add_argument("--rebuild-db", action="store_true",
+                       help="Rebuild the class database snapshot even if the config is unchanged")
+    parser.add_argument("--workers", type=int, default=None,
+                       help="Processes used to decode the INIDBI config (default: all cores)")
+    parser.add_argument("--incremental", action="store_true",
+                       help="Update the previous export's snapshot with only the classes that changed")
+    parser.add_argument("--bloom-error-rate", type=error_rate, default=BLOOM_ERROR_RATE,
+                       help="False positive rate of the class name filter built into new snapshots "
+                            "(0 disables it; use --rebuild-db to resize an existing one)")
+    parser.add_argument("--category-scoped", action="store_true",
+                       help="Check equipment references only against the config category their array implies")
+    parser.add_argument("--compare-config", action="append", default=[], metavar="CONFIG",
+                       help="Also report which classes another modpack's INIDBI config provides (repeatable)")
+    parser.add_argument("--cache-max-mb", type=float, default=None,
+                       help="Evict the least recently used cache entries (all tables together) beyond this size")
+    parser.add_argument("--cache-max-entries", type=int, default=None,
+                       help="Evict the least recently used cache entries (all tables together) beyond this count")
+    parser.add_argument("--cache-stats", action="store_true",
+                       help="Print cache hit, miss, write and timing counters after validating")
     args = parser.parse_args()
 
     # Configure logging
@@ -153,32 +314,40 @@ def main():
         print("Error: Required paths do not exist:\n-", missing)
         sys.exit(1)
 
-    # Validate INIDBI config
-    if error := validate_ini_file(paths["Config"]):
-        print(f"Config validation error: {error}")
+    # Load the class database, reusing the compiled snapshot when the config is unchanged
+    print("\nLoading class database from config...")
+    snapshots = SnapshotManager(cache_dir / "snapshots", workers=args.workers,
+                                incremental=args.incremental,
+                                bloom_error_rate=args.bloom_error_rate or None)
+    try:
+        database = snapshots.load(paths["Config"], rebuild=args.rebuild_db)
+        ini_stats = snapshots.get_stats(database)
+    except Exception as e:
+        print(f"Config validation error: Error loading INIDBI config: {str(e)}")
         sys.exit(1)
 
-    # Correct database population
-    print("\nBuilding class database from config...")
-    database = ClassDatabase()
-    if paths["Config"].exists():
-        ini_parser = InidbiParser()
-        classes_by_source = ini_parser.parse_file(paths["Config"])
-        total_classes = 0
-        for source, class_set in classes_by_source.items():
-            for cls in class_set:
-                database.add_class(cls)
-                total_classes += 1
-        print(f"Loaded {total_classes} total classes from {len(classes_by_source)} sources")
-    else:
-        print("Warning: No config file found, database will be empty")
+    if error := validate_ini_stats(ini_stats):
+        print(f"Config validation error: {error}")
+        sys.exit(1)
+    print(f"Loaded {ini_stats.classes} total classes from {len(ini_stats.sources)} sources")
+    if diff := snapshots.last_diff:
+        print(f"Applied config diff: {len(diff.added)} added, {len(diff.removed)} removed, "
+              f"{len(diff.changed)} changed")
+        print(f"Config diff report written to: {write_diff_report(diff, paths['Config'])}")
 
     # Initialize validator with the populated database
+    cache_mgr = CacheManager(
+        cache_dir,
+        max_bytes=int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb else None,
+        max_entries=args.cache_max_entries
+    )
     validator = MissionValidator(
         cache_dir=cache_dir,
         file_patterns=[r".*\.sqf$", r".*\.pbo$", r".*\.(paa|p3d)$"],
         config_path=paths["Config"],
-        database=database  # Pass our pre-populated database
+        database=database,  # Pass our pre-populated database
+        category_scoped=args.category_scoped,
+        cache_mgr=cache_mgr
     )
 
     print(f"\nValidating missions in: {paths['Missions']}")
@@ -191,8 +360,21 @@ def main():
         warnings = validator.validate_mission_folder(paths["Missions"])
         
         # Write full report to disk
-        report_path = write_validation_report(validator, paths["Missions"])
+        report_path = write_validation_report(validator, paths["Missions"], ini_stats)
         print(f"\nDetailed report written to: {report_path}")
+        if database.has_bloom:
+            logging.info(f"Bloom filter lookups: {database.bloom_stats.to_dict()}")
+        cache_stats = cache_mgr.stats()
+        logging.info("Cache occupancy: " + ", ".join(
+            f"{table} {stats.entries} entries / {stats.bytes} bytes ({stats.evictions} evicted)"
+            for table, stats in cache_stats.items()))
+        if args.cache_stats:
+            print("\nCache Statistics:")
+            print("-" * 60)
+            print(format_stats(cache_stats))
+
+        if args.compare_config:
+            compare_packs(snapshots, database, paths, args.compare_config, validator.get_referenced_names())
         
         # Show class analysis
         print("\nClass Analysis:")
@@ -224,6 +406,9 @@ def main():
         print(f"Check {report_path} for details")
         return 2
 
+    finally:
+        cache_mgr.close()  # Commits queued writes
+
 if __name__ == "__main__":
 
     sys.exit(main())
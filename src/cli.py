@@ -1,6 +1,7 @@
 import argparse
 import sys
 from pathlib import Path
+from .core.cache import CacheManager, format_stats
 from .core.validator import MissionValidator
 
 def main():
@@ -12,6 +13,7 @@ def main():
     parser.add_argument("--folder", required=True, help="Path to the mission folder")
     parser.add_argument("--cache", default=".cache", help="Path to the cache directory")
     parser.add_argument("--strict", action="store_true", help="Treat warnings as errors.")
+    parser.add_argument("--cache-stats", action="store_true", help="Print cache hit, miss, write and timing counters.")
     args = parser.parse_args()
 
     folder_path = Path(args.folder)
@@ -20,8 +22,15 @@ def main():
         sys.exit(1)
 
     cache_dir = Path(args.cache)
-    validator = MissionValidator(cache_dir)
-    warnings = validator.validate_mission_folder(folder_path)
+    # Opened here rather than through the validator, so the counters are
+    # printed even when validation fails
+    cache_mgr = CacheManager(cache_dir)
+    try:
+        validator = MissionValidator(cache_dir, cache_mgr=cache_mgr)
+        warnings = validator.validate_mission_folder(folder_path)
+    finally:
+        if args.cache_stats:
+            print(format_stats(cache_mgr.stats()))
 
     if warnings:
         print("Validation Warnings/Errors:")
@@ -0,0 +1,87 @@
+from typing import Dict, Iterable, List, Optional
+import logging
+import time
+from .database import ClassDatabase
+from .models import PackCoverage
+
+logger = logging.getLogger(__name__)
+
+class AttributionIndex:
+    """
+    Combined class membership index over several modpack snapshots.
+
+    Every case-folded class name maps to a bitset with one bit per pack
+    (bit i set when pack i defines the class), and to the source mods that
+    provide it with, per source, the bitset of packs it provides it in. One
+    pass over a mission's references then answers coverage for every pack.
+    """
+
+    def __init__(self):
+        self.packs: List[str] = []
+        self._members: Dict[str, int] = {}
+        self._providers: Dict[str, Dict[str, int]] = {}
+
+    def add_pack(self, label: str, database: ClassDatabase) -> None:
+        """Add the classes of one pack's database under the next bit"""
+        if label in self.packs:
+            raise ValueError(f"Pack {label} is already indexed")
+        start = time.perf_counter()
+        bit = 1 << len(self.packs)
+        self.packs.append(label)
+
+        members, providers = self._members, self._providers
+        sources: Dict[str, str] = {}
+        for folded, source in database.iter_rows(("name_folded", "source")):
+            source = sources.setdefault(source, source)  # One string per source mod
+            members[folded] = members.get(folded, 0) | bit
+            by_source = providers.get(folded)
+            if by_source is None:
+                providers[folded] = {source: bit}
+            else:
+                by_source[source] = by_source.get(source, 0) | bit
+
+        logger.info(f"Indexed pack {label} in {time.perf_counter() - start:.2f}s "
+                    f"({len(members)} names across {len(self.packs)} packs)")
+
+    @classmethod
+    def from_databases(cls, databases: Dict[str, ClassDatabase]) -> 'AttributionIndex':
+        """Build an index over several packs, keyed by label in bit order"""
+        index = cls()
+        for label, database in databases.items():
+            index.add_pack(label, database)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def get_packs(self, class_name: str) -> List[str]:
+        """Get the packs that define a class"""
+        bits = self._members.get(class_name.lower(), 0)
+        return [label for i, label in enumerate(self.packs) if bits >> i & 1]
+
+    def get_sources(self, class_name: str, pack: Optional[str] = None) -> List[str]:
+        """Get the source mods providing a class, in any pack or in the given one"""
+        by_source = self._providers.get(class_name.lower(), {})
+        if pack is None:
+            return sorted(by_source)
+        bit = 1 << self.packs.index(pack)
+        return sorted(source for source, bits in by_source.items() if bits & bit)
+
+    def coverage(self, class_names: Iterable[str]) -> Dict[str, PackCoverage]:
+        """Check every referenced class against every pack in a single pass"""
+        names = set(class_names)
+        results = {label: PackCoverage(pack=label, total=len(names)) for label in self.packs}
+        by_bit = [results[label] for label in self.packs]
+        for name in names:
+            folded = name.lower()
+            bits = self._members.get(folded, 0)
+            by_source = self._providers.get(folded, {})
+            for i, result in enumerate(by_bit):
+                bit = 1 << i
+                if bits & bit:
+                    for source, source_bits in by_source.items():
+                        if source_bits & bit:
+                            result.sources.setdefault(source, set()).add(name)
+                else:
+                    result.missing.add(name)
+        return results
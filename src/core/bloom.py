@@ -0,0 +1,68 @@
+from typing import Iterable, Optional, Tuple
+import hashlib
+import math
+import struct
+
+# Bit count and probe count, ahead of the bit array
+_HEADER = struct.Struct("<QI")
+
+class BloomFilter:
+    """
+    Probabilistic set membership over strings.
+
+    "Not in the filter" is always right; "in the filter" is wrong for about
+    error_rate of absent strings. Each string is hashed once with BLAKE2b
+    and its probe positions derived by double hashing.
+    """
+    __slots__ = ('size', 'probes', '_bits')
+
+    def __init__(self, size: int, probes: int, bits: Optional[bytearray] = None):
+        self.size = max(size, 8)
+        self.probes = max(probes, 1)
+        self._bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float = 0.01) -> 'BloomFilter':
+        """Size a filter for capacity strings at the given false positive rate"""
+        if not 0 < error_rate < 1:
+            raise ValueError(f"Bloom filter error rate must be between 0 and 1, got {error_rate}")
+        capacity = max(capacity, 1)
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        return cls(size, round(size / capacity * math.log(2)))
+
+    @classmethod
+    def from_items(cls, items: Iterable[str], capacity: int, error_rate: float = 0.01) -> 'BloomFilter':
+        bloom = cls.for_capacity(capacity, error_rate)
+        for item in items:
+            bloom.add(item)
+        return bloom
+
+    def _positions(self, item: str) -> Tuple[int, ...]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return tuple((first + i * second) % size for i in range(self.probes))
+
+    def add(self, item: str) -> None:
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(self.size, self.probes) + bytes(self._bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'BloomFilter':
+        size, probes = _HEADER.unpack_from(data, 0)
+        bits = bytearray(data[_HEADER.size:])
+        if len(bits) != (size + 7) // 8:
+            raise ValueError(f"Bloom filter holds {len(bits)} bytes, expected {(size + 7) // 8}")
+        return cls(size, probes, bits)
@@ -1,28 +1,102 @@
 from pathlib import Path
-from typing import Optional, Set, Dict
-import pickle
+from dataclasses import replace
+from typing import Any, Optional, Set, Dict, Tuple
+import heapq
 import sqlite3
 import logging
 from datetime import datetime
 import hashlib
 import threading
+import time
+from .models import CacheTableStats
+from .serialization import CacheFormatError, decode, encode
 
 logger = logging.getLogger(__name__)
 
+# Pending writes are committed together once this many have queued up,
+# or once the oldest has waited COMMIT_INTERVAL seconds
+COMMIT_BATCH = 64
+COMMIT_INTERVAL = 1.0
+
+# Blobs larger than this are stored zlib-compressed
+COMPRESS_ABOVE = 4096
+
+# Eviction goes this share of the budget below it, so that it does not have
+# to run again on the very next commit
+EVICTION_SLACK = 0.1
+
+# Bumped whenever the table layout changes; older cache files are rebuilt
+CACHE_VERSION = 4
+
+# Key column of each cache table
+_KEYS = {"scan_cache": "path_hash", "pbo_cache": "pbo_hash", "parse_cache": "parse_key"}
+
+_INSERTS = {
+    "scan_cache": """INSERT OR REPLACE INTO scan_cache 
+                     (path_hash, path, data, timestamp, invalidated, fingerprint, size, last_access)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+    "pbo_cache": """INSERT OR REPLACE INTO pbo_cache 
+                    (pbo_hash, pbo_path, prefix, data, timestamp, size, last_access)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
+    "parse_cache": """INSERT OR REPLACE INTO parse_cache
+                      (parse_key, source, data, timestamp, size, last_access)
+                      VALUES (?, ?, ?, ?, ?, ?)""",
+}
+
 class CacheManager:
-    """Thread-safe cache manager using SQLite"""
+    """
+    Thread-safe persistent cache manager using SQLite.
+
+    Entries live in cache_dir/cache.db in WAL mode, so they survive the
+    process and every thread (and every CacheManager on the same directory)
+    shares one store. Each thread reads through a connection of its own.
+    Writes are queued and committed in batches by whichever thread fills the
+    batch, and reads see queued writes straight away; flush() or close()
+    commits whatever is still queued. Entries are stored in the compact
+    format of core/serialization.py; blobs it rejects read as misses. Scan
+    entries may carry a fingerprint of the content they were built from,
+    and lookups that pass the current fingerprint only return entries that
+    still match it.
+
+    parse_cache holds the classes parsed from each config file, keyed by
+    its content, so unchanged files are never parsed twice.
+
+    max_bytes and max_entries bound all tables together. Reads record when
+    an entry was last used, and every commit that takes the cache over
+    budget evicts the least recently used entries.
+
+    stats() reports, per table, the occupancy and this manager's hits,
+    misses, writes, bytes written, encode/decode time, evictions and
+    errors (which are otherwise only logged).
+    """
     
-    def __init__(self, cache_dir: Path):
+    def __init__(self, cache_dir: Path, max_bytes: Optional[int] = None, max_entries: Optional[int] = None):
         self.cache_dir = cache_dir
+        self.db_path = cache_dir / "cache.db"
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
         self._local = threading.local()
         self._lock = threading.RLock()
+        self._connections = []
+        self._initialized = False
+        self._pending: Dict[str, Dict[str, tuple]] = {table: {} for table in _KEYS}
+        self._pending_count = 0
+        self._pending_since: Optional[float] = None
+        self._touched: Dict[str, Dict[str, float]] = {table: {} for table in _KEYS}  # Key -> last read
+        self._counters = {table: CacheTableStats() for table in _KEYS}
         self._init_schema = """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+
             CREATE TABLE IF NOT EXISTS scan_cache (
                 path_hash TEXT PRIMARY KEY,
                 path TEXT NOT NULL,
                 data BLOB,
                 timestamp TEXT,
-                invalidated BOOLEAN DEFAULT 0
+                invalidated BOOLEAN DEFAULT 0,
+                fingerprint TEXT,
+                size INTEGER NOT NULL DEFAULT 0,
+                last_access REAL NOT NULL DEFAULT 0
             );
             
             CREATE TABLE IF NOT EXISTS pbo_cache (
@@ -30,70 +104,267 @@ class CacheManager:
                 pbo_path TEXT NOT NULL,
                 prefix TEXT,
                 data BLOB,
-                timestamp TEXT
+                timestamp TEXT,
+                size INTEGER NOT NULL DEFAULT 0,
+                last_access REAL NOT NULL DEFAULT 0
+            );
+            
+            CREATE TABLE IF NOT EXISTS parse_cache (
+                parse_key TEXT PRIMARY KEY,
+                source TEXT,
+                data BLOB,
+                timestamp TEXT,
+                size INTEGER NOT NULL DEFAULT 0,
+                last_access REAL NOT NULL DEFAULT 0
             );
             
             CREATE INDEX IF NOT EXISTS idx_timestamp ON scan_cache(timestamp);
             CREATE INDEX IF NOT EXISTS idx_pbo_path ON pbo_cache(pbo_path);
+            CREATE INDEX IF NOT EXISTS idx_scan_access ON scan_cache(last_access);
+            CREATE INDEX IF NOT EXISTS idx_pbo_access ON pbo_cache(last_access);
+            CREATE INDEX IF NOT EXISTS idx_parse_access ON parse_cache(last_access);
         """
 
     def _get_connection(self):
-        """Get thread-local connection with locking"""
-        with self._lock:
-            if not hasattr(self._local, 'conn'):
-                self._local.conn = sqlite3.connect(":memory:",
+        """Get thread-local connection to the shared cache file"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self._lock:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                # Only used by this thread, but close() may run on another one
+                conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False,
                     detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
                 sqlite3.register_adapter(datetime, lambda dt: dt.isoformat())
                 sqlite3.register_converter('timestamp', lambda b: datetime.fromisoformat(b.decode()))
-                self._local.conn.executescript(self._init_schema)
-            return self._local.conn
+                if not self._initialized:
+                    self._init_tables(conn)
+                    self._initialized = True
+                self._connections.append(conn)
+                self._local.conn = conn
+        return conn
+
+    def _init_tables(self, conn: sqlite3.Connection) -> None:
+        """Create the cache tables, dropping any left by an older layout"""
+        if conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+            conn.executescript("".join(f"DROP TABLE IF EXISTS {table};" for table in _KEYS))
+        conn.executescript(self._init_schema)
+        conn.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+
+    def _queue_write(self, table: str, key: str, row: tuple) -> None:
+        """Queue a row for the next batched commit, committing if the batch is due"""
+        with self._lock:
+            self._pending[table][key] = row
+            self._pending_count += 1
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            if (self._pending_count >= COMMIT_BATCH or
+                    time.monotonic() - self._pending_since >= COMMIT_INTERVAL):
+                self.flush()
+
+    def _get_pending(self, table: str, key: str) -> Optional[tuple]:
+        with self._lock:
+            return self._pending[table].get(key)
+
+    def _touch(self, table: str, key: str) -> None:
+        """Record a read, stored with the next commit"""
+        with self._lock:
+            self._touched[table][key] = time.time()
+
+    def flush(self) -> None:
+        """Commit every queued write and recorded read in a single transaction"""
+        with self._lock:
+            if not self._pending_count and not any(self._touched.values()):
+                return
+            try:
+                with self._get_connection() as conn:
+                    for table, rows in self._pending.items():
+                        conn.executemany(_INSERTS[table], rows.values())
+                    for table, touched in self._touched.items():
+                        conn.executemany(f"UPDATE {table} SET last_access = ? WHERE {_KEYS[table]} = ?",
+                                         ((when, key) for key, when in touched.items()))
+                    if self._pending_count:
+                        self._evict(conn, EVICTION_SLACK)
+            except Exception as e:
+                logger.error(f"Cache write error: {e}")
+                for table, rows in self._pending.items():
+                    self._counters[table].errors += bool(rows)
+            finally:
+                for rows in self._pending.values():
+                    rows.clear()
+                for touched in self._touched.values():
+                    touched.clear()
+                self._pending_count = 0
+                self._pending_since = None
+
+    def _evict(self, conn: sqlite3.Connection, slack: float) -> None:
+        """Delete the least recently used entries of all tables until the cache is within budget"""
+        if self.max_bytes is None and self.max_entries is None:
+            return
+        entries = size = 0
+        for table in _KEYS:
+            count, total = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {table}").fetchone()
+            entries += count
+            size += total
+
+        excess_entries = excess_bytes = 0
+        if self.max_entries is not None and entries > self.max_entries:
+            excess_entries = entries - int(self.max_entries * (1 - slack))
+        if self.max_bytes is not None and size > self.max_bytes:
+            excess_bytes = size - int(self.max_bytes * (1 - slack))
+        if excess_entries <= 0 and excess_bytes <= 0:
+            return
+
+        # Oldest first across all tables
+        cursors = [conn.execute(f"SELECT last_access, size, ?, {key} FROM {table} ORDER BY last_access", (table,))
+                   for table, key in _KEYS.items()]
+        victims = {table: [] for table in _KEYS}
+        for _, entry_size, table, key in heapq.merge(*cursors):
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            victims[table].append((key,))
+            excess_entries -= 1
+            excess_bytes -= entry_size
+        for cursor in cursors:
+            cursor.close()
+
+        for table, keys in victims.items():
+            conn.executemany(f"DELETE FROM {table} WHERE {_KEYS[table]} = ?", keys)
+            self._counters[table].evictions += len(keys)
+        logger.debug(f"Evicted {sum(map(len, victims.values()))} cache entries over budget")
+
+    def stats(self) -> Dict[str, CacheTableStats]:
+        """Get the occupancy and usage counters of each cache table, queued writes included"""
+        with self._lock:
+            self.flush()
+            conn = self._get_connection()
+            result = {}
+            for table in _KEYS:
+                entries, size = conn.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {table}").fetchone()
+                result[table] = replace(self._counters[table], entries=entries, bytes=size)
+            return result
+
+    def vacuum(self) -> Dict[str, CacheTableStats]:
+        """Evict down to the budget, drop invalidated entries and shrink the cache file"""
+        with self._lock:
+            self.flush()
+            conn = self._get_connection()
+            with conn:
+                conn.execute("DELETE FROM scan_cache WHERE invalidated = 1")
+                self._evict(conn, 0.0)
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return self.stats()
+
+    def _encode(self, table: str, value: Any) -> bytes:
+        start = time.perf_counter()
+        data = encode(value, COMPRESS_ABOVE)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            counters = self._counters[table]
+            counters.writes += 1
+            counters.bytes_written += len(data)
+            counters.encode_seconds += elapsed
+        return data
+
+    def _decode(self, table: str, data: bytes, hit: bool = True) -> Any:
+        start = time.perf_counter()
+        value = decode(data)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            counters = self._counters[table]
+            counters.hits += hit
+            counters.decode_seconds += elapsed
+        return value
+
+    def _count_failure(self, table: str, miss: bool = True, error: bool = False) -> None:
+        with self._lock:
+            counters = self._counters[table]
+            counters.misses += miss
+            counters.errors += error
 
     def _get_path_hash(self, path: str) -> str:
         return hashlib.sha256(path.encode()).hexdigest()
         
-    def get_cached_scan(self, path: str) -> Optional[Set]:
+    def _read_scan(self, path_hash: str) -> Optional[tuple]:
+        """Get the (data, fingerprint) of a scan entry, queued or committed"""
+        row = self._get_pending("scan_cache", path_hash)
+        if row:
+            return row[2], row[5]
+        return self._get_connection().execute(
+            "SELECT data, fingerprint FROM scan_cache WHERE path_hash = ?",
+            (path_hash,)
+        ).fetchone()
+
+    def get_cached_scan(self, path: str, fingerprint: Optional[str] = None) -> Optional[Set]:
+        """Get a cached scan, or None if fingerprint is given and the entry was built from other content"""
         try:
             path_hash = self._get_path_hash(path)
-            cursor = self._get_connection().execute(
-                "SELECT data FROM scan_cache WHERE path_hash = ?",
-                (path_hash,)
-            )
-            if row := cursor.fetchone():
-                return pickle.loads(row[0])
+            row = self._read_scan(path_hash)
+            if row and (fingerprint is None or row[1] == fingerprint):
+                value = self._decode("scan_cache", row[0])
+                self._touch("scan_cache", path_hash)
+                return value
+            self._count_failure("scan_cache")
+        except CacheFormatError as e:
+            logger.debug(f"Ignoring unreadable cache entry for {path}: {e}")
+            self._count_failure("scan_cache", error=True)
         except Exception as e:
             logger.error(f"Cache read error: {e}")
+            self._count_failure("scan_cache", error=True)
         return None
+
+    def get_scan_entry(self, path: str, fingerprint: str) -> Tuple[Any, Any]:
+        """
+        Get (current, previous) for a fingerprinted scan in a single lookup.
+
+        current is the cached scan if it was built from fingerprint. Otherwise
+        previous is whatever the entry holds, for callers that update it
+        incrementally; the lookup then counts as a miss, not a hit.
+        """
+        try:
+            path_hash = self._get_path_hash(path)
+            row = self._read_scan(path_hash)
+            if row is None:
+                self._count_failure("scan_cache")
+                return None, None
+            current = row[1] == fingerprint
+            value = self._decode("scan_cache", row[0], hit=current)
+            self._touch("scan_cache", path_hash)
+            if current:
+                return value, None
+            self._count_failure("scan_cache")
+            return None, value
+        except CacheFormatError as e:
+            logger.debug(f"Ignoring unreadable cache entry for {path}: {e}")
+            self._count_failure("scan_cache", error=True)
+        except Exception as e:
+            logger.error(f"Cache read error: {e}")
+            self._count_failure("scan_cache", error=True)
+        return None, None
         
-    def cache_scan(self, path: str, scan_result) -> None:
-        """Cache scan results with better error handling"""
+    def cache_scan(self, path: str, scan_result, fingerprint: Optional[str] = None) -> None:
+        """Cache scan results, optionally with the fingerprint of the content they came from"""
         try:
             # Only cache if we have valid data
             if not scan_result:
                 return
                 
             path_hash = self._get_path_hash(path)
-            
-            # Handle both set and list results
-            if isinstance(scan_result, (set, list)):
-                data = pickle.dumps(list(scan_result))
-            else:
-                data = pickle.dumps(scan_result)
-                
-            self._get_connection().execute(
-                """INSERT OR REPLACE INTO scan_cache 
-                   (path_hash, path, data, timestamp, invalidated)
-                   VALUES (?, ?, ?, ?, ?)""",
-                (
-                    path_hash,
-                    path,
-                    data,
-                    datetime.now(),
-                    False
-                )
-            )
-            self._get_connection().commit()
+            data = self._encode("scan_cache", scan_result)
+            self._queue_write("scan_cache", path_hash, (
+                path_hash,
+                path,
+                data,
+                datetime.now(),
+                False,
+                fingerprint,
+                len(data),
+                time.time()
+            ))
         except Exception as e:
             logger.error(f"Cache write error: {e}")
+            self._count_failure("scan_cache", miss=False, error=True)
 
     def __del__(self):
         """Ensure connection is closed on deletion"""
@@ -102,46 +373,86 @@ class CacheManager:
     def get_cached_pbo(self, pbo_path: str, file_hash: str) -> Optional[Set]:
         """Get cached PBO content if valid"""
         try:
+            if pending := self._get_pending("pbo_cache", file_hash):
+                return self._decode("pbo_cache", pending[3])
             cursor = self._get_connection().execute(
                 "SELECT data FROM pbo_cache WHERE pbo_hash = ?",
                 (file_hash,)
             )
             if row := cursor.fetchone():
-                return pickle.loads(row[0])
+                value = self._decode("pbo_cache", row[0])
+                self._touch("pbo_cache", file_hash)
+                return value
+            self._count_failure("pbo_cache")
+        except CacheFormatError as e:
+            logger.debug(f"Ignoring unreadable PBO cache entry for {pbo_path}: {e}")
+            self._count_failure("pbo_cache", error=True)
         except Exception as e:
             logger.error(f"PBO cache read error: {e}")
+            self._count_failure("pbo_cache", error=True)
         return None
 
     def cache_pbo(self, pbo_path: str, file_hash: str, data, prefix: str = None) -> None:
-        """Cache PBO content in memory"""
+        """Cache PBO content"""
         try:
-            self._get_connection().execute(
-                """INSERT OR REPLACE INTO pbo_cache 
-                   (pbo_hash, pbo_path, prefix, data, timestamp)
-                   VALUES (?, ?, ?, ?, ?)""",
-                (
-                    file_hash, 
-                    pbo_path,
-                    prefix,
-                    pickle.dumps(data),
-                    datetime.now()
-                )
-            )
-            self._get_connection().commit()
+            blob = self._encode("pbo_cache", data)
+            self._queue_write("pbo_cache", file_hash, (
+                file_hash, 
+                pbo_path,
+                prefix,
+                blob,
+                datetime.now(),
+                len(blob),
+                time.time()
+            ))
         except Exception as e:
             logger.error(f"PBO cache write error: {e}")
+            self._count_failure("pbo_cache", miss=False, error=True)
+
+    def get_cached_parse(self, key: str) -> Optional[Set]:
+        """Get the classes cached for a config file's parse key"""
+        try:
+            row = self._get_pending("parse_cache", key)
+            if row:
+                return self._decode("parse_cache", row[2])
+            row = self._get_connection().execute(
+                "SELECT data FROM parse_cache WHERE parse_key = ?", (key,)).fetchone()
+            if row:
+                value = self._decode("parse_cache", row[0])
+                self._touch("parse_cache", key)
+                return value
+            self._count_failure("parse_cache")
+        except CacheFormatError as e:
+            logger.debug(f"Ignoring unreadable parse cache entry {key}: {e}")
+            self._count_failure("parse_cache", error=True)
+        except Exception as e:
+            logger.error(f"Parse cache read error: {e}")
+            self._count_failure("parse_cache", error=True)
+        return None
+
+    def cache_parse(self, key: str, source: str, classes: Set) -> None:
+        """Cache the classes parsed from a config file, empty results included"""
+        try:
+            data = self._encode("parse_cache", classes)
+            self._queue_write("parse_cache", key, (key, source, data, datetime.now(), len(data), time.time()))
+        except Exception as e:
+            logger.error(f"Parse cache write error: {e}")
+            self._count_failure("parse_cache", miss=False, error=True)
 
     def invalidate_old_entries(self, max_age_days: int = 30) -> None:
         """Invalidate cache entries older than specified days"""
         try:
-            self._get_connection().execute("""
+            self.flush()
+            conn = self._get_connection()
+            conn.execute("""
                 UPDATE scan_cache 
                 SET invalidated = 1
                 WHERE timestamp < datetime('now', '-' || ? || ' days')
             """, (max_age_days,))
                 
             # Optionally remove invalidated entries
-            self._get_connection().execute("DELETE FROM scan_cache WHERE invalidated = 1")
+            conn.execute("DELETE FROM scan_cache WHERE invalidated = 1")
+            conn.commit()
         except Exception as e:
             logger.error(f"Cache invalidation error: {e}")
 
@@ -154,11 +465,25 @@ class CacheManager:
         self.close()
 
     def close(self):
-        """Close thread-local connection if it exists"""
-        if hasattr(self._local, 'conn'):
+        """Commit queued writes and close every thread's connection"""
+        if not hasattr(self, '_lock'):
+            return
+        with self._lock:
+            self.flush()
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for conn in connections:
             try:
-                self._local.conn.close()
+                conn.close()
             except Exception as e:
                 logger.error(f"Error closing database: {e}")
-            finally:
-                self._local.conn = None
+
+def format_stats(stats: Dict[str, CacheTableStats]) -> str:
+    """Render CacheManager.stats() as a table for the command line"""
+    lines = [f"{'Table':<12} {'Entries':>8} {'Bytes':>11} {'Hits':>7} {'Misses':>7} {'Hit rate':>8} "
+             f"{'Writes':>7} {'Written':>11} {'Encode s':>9} {'Decode s':>9} {'Evicted':>8} {'Errors':>7}"]
+    for table, t in stats.items():
+        lines.append(f"{table:<12} {t.entries:>8} {t.bytes:>11} {t.hits:>7} {t.misses:>7} {t.hit_rate:>8.1%} "
+                     f"{t.writes:>7} {t.bytes_written:>11} {t.encode_seconds:>9.3f} {t.decode_seconds:>9.3f} "
+                     f"{t.evictions:>8} {t.errors:>7}")
+    return "\n".join(lines)
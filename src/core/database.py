@@ -1,44 +1,197 @@
-from typing import Dict, Set, List, Optional, Generator
+from collections.abc import Mapping
+from typing import Dict, Set, List, Optional, Generator, Iterable, Iterator, Sequence, Tuple
 from pathlib import Path
+import hashlib
+import itertools
 import sqlite3
+import threading
+import time
 from datetime import datetime
-from .models import ClassDef  # Remove ClassVersion, ClassOverride imports
+from urllib.parse import quote
+from .models import BloomStats, ClassDef, ConfigDiff  # Remove ClassVersion, ClassOverride imports
+from .bloom import BloomFilter
+from .hierarchy import ClassHierarchy
+from .suggest import ClassSuggester
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the table layout changes so stale snapshots get rebuilt
+SCHEMA_VERSION = 7
+
+# Memory-map up to 1 GiB of read-only database files
+MMAP_SIZE = 1 << 30
+
+# Names bound per IN (...) query, below SQLite's default variable limit
+QUERY_CHUNK = 500
+
+# False positive rate of the class name Bloom filter stored by finalize()
+BLOOM_ERROR_RATE = 0.01
+
+# A stored filter goes stale as soon as classes change; finalize() stores a new one
+_DROP_BLOOM = "DELETE FROM meta WHERE key = 'name_bloom'"
+
+# Distinguishes the shared-cache in-memory databases of one process
+_memory_ids = itertools.count()
+
+def inherits_from(class_def: ClassDef) -> Optional[str]:
+    """Get the config base class of a class, where known separately from its parent"""
+    return class_def.inidbi_meta.inherits_from if class_def.inidbi_meta else None
+
+def class_category(class_def: ClassDef) -> Optional[str]:
+    """Get the config category (CfgVehicles, CfgWeapons, ...) a class was exported from"""
+    return class_def.inidbi_meta.category if class_def.inidbi_meta else None
+
+def row_hash(class_def: ClassDef, parent: Optional[str]) -> str:
+    """Hash the stored content of a class row, used to detect changed classes"""
+    parts = [parent or "", str(class_def.scope)]
+    if class_def.properties:
+        parts.extend(f"{key}\x1e{value}" for key, value in class_def.properties.items())
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=8).hexdigest()
+
+class LazyProperties(Mapping):
+    """
+    Read-only properties of a stored class, fetched on first access.
+
+    Lets chain walks and history lookups hand out classes without reading
+    their property rows until something actually looks at them. The owning
+    database must still be open when the properties are first read.
+    """
+    __slots__ = ('_database', '_class_id', '_data')
+
+    def __init__(self, database: 'ClassDatabase', class_id: int):
+        self._database = database
+        self._class_id = class_id
+        self._data: Optional[Dict[str, str]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._data is not None
+
+    def _load(self) -> Dict[str, str]:
+        if self._data is None:
+            self._data = self._database._read_properties(self._class_id)
+        return self._data
+
+    def __getitem__(self, key: str) -> str:
+        return self._load()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __repr__(self):
+        return f"LazyProperties({self._load()!r})" if self.loaded else f"LazyProperties(class_id={self._class_id})"
+
+class _KeyIds(dict):
+    """Property key -> id map that assigns ids to unseen keys, queueing them for insertion"""
+
+    def __init__(self, rows: Iterable[Tuple[str, int]]):
+        super().__init__(rows)
+        self.pending: List[Tuple[int, str]] = []
+        self._last_id = max(self.values(), default=0)
+
+    def __missing__(self, key: str) -> int:
+        self._last_id += 1
+        self[key] = self._last_id
+        self.pending.append((self._last_id, key))
+        return self._last_id
+
 class ClassDatabase:
     """Manages persistence and querying of class definitions"""
+
+    # Secondary indexes, dropped during bulk loads and rebuilt afterwards
+    _INDEXES = {
+        "idx_properties_class_id": "CREATE INDEX IF NOT EXISTS idx_properties_class_id ON properties(class_id)",
+        # Not unique: the same class name may be provided by several sources
+        "idx_classes_name_folded": "CREATE INDEX IF NOT EXISTS idx_classes_name_folded ON classes(name_folded)",
+        # Covers category-scoped name lookups without touching the table
+        "idx_classes_category": "CREATE INDEX IF NOT EXISTS idx_classes_category ON classes(category, name_folded)",
+    }
+    # Columns of the classes table iter_rows may read or order by
+    _ROW_COLUMNS = frozenset({"name", "name_folded", "parent", "inherits_from", "source", "scope", "category"})
     
-    def __init__(self, db_path: Optional[Path] = None):
-        """Always use in-memory database"""
-        self._conn = sqlite3.connect(":memory:", 
-            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
-        self._conn.row_factory = sqlite3.Row
+    def __init__(self, db_path: Optional[Path] = None, read_only: bool = False, use_bloom: bool = False):
+        """
+        Open a class database.
+
+        Without db_path the database lives in memory. With db_path it is stored
+        on disk; read_only opens an existing file without touching its schema
+        and memory-maps it for fast repeated lookups.
+
+        The database may be shared between threads: each thread queries it
+        through a connection of its own, opened on first use, so readers on
+        different threads never share a connection. In-memory databases use
+        SQLite's shared cache so that every thread sees the same tables.
+
+        With use_bloom, existence checks go through the Bloom filter stored by
+        finalize() when there is one: names it rejects are answered without
+        SQLite, and the rest with an indexed query, so the full name set is
+        never loaded. Outcomes are counted in bloom_stats.
+        """
+        self.db_path = db_path
+        self.read_only = read_only
+        if db_path is None:
+            self._uri = f"file:classdb_{next(_memory_ids)}?mode=memory&cache=shared"
+        elif read_only:
+            self._uri = f"file:{quote(Path(db_path).as_posix())}?mode=ro"
+        else:
+            self._uri = f"file:{quote(Path(db_path).as_posix())}"
         # Add datetime adapter
         sqlite3.register_adapter(datetime, lambda dt: dt.isoformat())
         sqlite3.register_converter('timestamp', lambda b: datetime.fromisoformat(b.decode()))
-        self._initialize_db()
+
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._conn = self._connect()
+        self._local.conn = self._conn
+        if not read_only:
+            self._initialize_db()
         self._required_classes = set()
-        self._conn.create_function("LOWER", 1, lambda x: x.lower() if x else None)
+        # Case-folded class names, loaded on first lookup for O(1) existence checks
+        self._folded_names: Optional[Set[str]] = None
+        # Case-folded class names per config category, each loaded on first scoped lookup
+        self._category_names: Dict[Optional[str], Set[str]] = {}
+        # Inheritance hierarchy, built on first use and dropped whenever classes change
+        self._hierarchy: Optional[ClassHierarchy] = None
+        self._suggester: Optional[ClassSuggester] = None
+        # Stored name filter, read on first lookup when enabled
+        self._bloom: Optional[BloomFilter] = None
+        self._use_bloom = use_bloom
+        self._bloom_loaded = not use_bloom
+        self.bloom_stats = BloomStats()
     
     def _initialize_db(self):
         """Initialize SQLite database schema"""
-        self._conn.executescript("""
+        conn = self._get_connection()
+        conn.executescript("""
             CREATE TABLE IF NOT EXISTS classes (
                 id INTEGER PRIMARY KEY,
                 name TEXT NOT NULL,
+                name_folded TEXT NOT NULL,
                 parent TEXT,
                 source TEXT NOT NULL,
                 scope TEXT DEFAULT 'private',
+                row_hash TEXT,
+                inherits_from TEXT,
+                category TEXT,
                 UNIQUE(name, source)
             );
             
+            CREATE TABLE IF NOT EXISTS property_keys (
+                id INTEGER PRIMARY KEY,
+                key TEXT NOT NULL UNIQUE
+            );
+
             CREATE TABLE IF NOT EXISTS properties (
                 class_id INTEGER,
-                key TEXT NOT NULL,
+                key_id INTEGER NOT NULL,
                 value TEXT NOT NULL,
-                FOREIGN KEY(class_id) REFERENCES classes(id)
+                FOREIGN KEY(class_id) REFERENCES classes(id),
+                FOREIGN KEY(key_id) REFERENCES property_keys(id)
             );
 
             CREATE TABLE IF NOT EXISTS required_classes (
@@ -47,127 +200,509 @@ class ClassDatabase:
                 reason TEXT
             );
 
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+
             PRAGMA journal_mode=WAL;
             PRAGMA synchronous=NORMAL;
         """)
+        self._create_indexes(conn)
+        if self.get_meta("schema_version") is None:
+            self.set_meta("schema_version", str(SCHEMA_VERSION))
+
+    def _create_indexes(self, conn) -> None:
+        """Create secondary indexes"""
+        for sql in self._INDEXES.values():
+            conn.execute(sql)
+
+    def _drop_indexes(self, conn) -> None:
+        """Drop secondary indexes ahead of a bulk load"""
+        for name in self._INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
     
     def add_class(self, class_def) -> None:
         """Add or update a class definition preserving original case"""
-        cursor = self._conn.cursor()
+        conn = self._get_connection()
+        cursor = conn.cursor()
         try:
+            # A replaced class takes its properties with it
+            cursor.execute("""
+                DELETE FROM properties WHERE class_id IN
+                    (SELECT id FROM classes WHERE name = ? AND source = ?)
+            """, (class_def.name, class_def.source))
             cursor.execute("""
-                INSERT OR REPLACE INTO classes (name, parent, source, scope)
-                VALUES (?, ?, ?, ?)
-            """, (class_def.name, class_def.parent, class_def.source, class_def.scope))
+                INSERT OR REPLACE INTO classes
+                    (name, name_folded, parent, source, scope, row_hash, inherits_from, category)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (class_def.name, class_def.name.lower(), class_def.parent,
+                  class_def.source, class_def.scope, row_hash(class_def, class_def.parent),
+                  inherits_from(class_def), class_category(class_def)))
             
             class_id = cursor.lastrowid
             
             if class_def.properties:
-                cursor.executemany("""
-                    INSERT INTO properties (class_id, key, value)
-                    VALUES (?, ?, ?)
-                """, [(class_id, k, v) for k, v in class_def.properties.items()])
+                key_ids = self._get_key_ids(cursor)
+                property_rows = [(class_id, key_ids[k], v) for k, v in class_def.properties.items()]
+                self._write_batch(cursor, [], property_rows, key_ids)
+            cursor.execute(_DROP_BLOOM)
             
-            self._conn.commit()
+            conn.commit()
         finally:
             cursor.close()
 
+        if self._folded_names is not None:
+            self._folded_names.add(class_def.name.lower())
+        self._hierarchy = None
+        self._suggester = None
+        self._category_names = {}
+        self._bloom, self._bloom_loaded = None, not self._use_bloom
+
         # Handle nested classes
         if class_def.nested_classes:
             for nested in class_def.nested_classes:
                 nested.parent = class_def.name
                 self.add_class(nested)
 
+    def add_classes(self, classes: Iterable[ClassDef], batch_size: int = 10000,
+                    drop_indexes: bool = True) -> int:
+        """
+        Bulk load class definitions in a single transaction.
+
+        Classes and properties are written with executemany in batches of
+        batch_size rows, secondary indexes are rebuilt once after the load
+        (unless drop_indexes is False, which suits small loads into a large
+        database), and nested classes are flattened with an explicit stack
+        instead of recursion. Returns the number of class rows written.
+        """
+        start = time.perf_counter()
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        class_rows = []
+        property_rows = []
+        total_classes = 0
+        total_properties = 0
+
+        try:
+            if conn.in_transaction:
+                conn.commit()
+            cursor.execute("BEGIN")
+            if drop_indexes:
+                self._drop_indexes(cursor)
+
+            # Assign ids up front so property rows can reference them without lastrowid
+            next_id, stored = cursor.execute("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM classes").fetchone()
+            key_ids = self._get_key_ids(cursor)
+
+            for class_def in classes:
+                stack = [(class_def, class_def.parent)]
+                while stack:
+                    current, parent = stack.pop()
+                    next_id += 1
+                    class_rows.append((next_id, current.name, current.name.lower(), parent,
+                                       current.source, current.scope, row_hash(current, parent),
+                                       inherits_from(current), class_category(current)))
+                    if current.properties:
+                        property_rows.extend((next_id, key_ids[k], v) for k, v in current.properties.items())
+
+                    # Nested classes inherit from their enclosing class, as in add_class
+                    for nested in current.nested_classes or ():
+                        stack.append((nested, current.name))
+
+                if len(class_rows) >= batch_size:
+                    total_classes += len(class_rows)
+                    total_properties += len(property_rows)
+                    self._write_batch(cursor, class_rows, property_rows, key_ids)
+
+            total_classes += len(class_rows)
+            total_properties += len(property_rows)
+            self._write_batch(cursor, class_rows, property_rows, key_ids)
+
+            # Classes replaced by a later row for the same (name, source) leave
+            # their properties behind; drop them in one pass, only when it happened
+            if cursor.execute("SELECT COUNT(*) FROM classes").fetchone()[0] != stored + total_classes:
+                cursor.execute("DELETE FROM properties WHERE class_id NOT IN (SELECT id FROM classes)")
+
+            if drop_indexes:
+                self._create_indexes(cursor)
+            cursor.execute(_DROP_BLOOM)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            # Reload lazily rather than tracking names through a failed load
+            self._folded_names = None
+            self._hierarchy = None
+            self._suggester = None
+            self._category_names = {}
+            self._bloom, self._bloom_loaded = None, not self._use_bloom
+
+        elapsed = time.perf_counter() - start
+        rate = total_classes / elapsed if elapsed > 0 else float(total_classes)
+        logger.info(f"Bulk loaded {total_classes} classes and {total_properties} properties "
+                    f"in {elapsed:.2f}s ({rate:,.0f} classes/s)")
+        return total_classes
+
+    def _get_key_ids(self, cursor) -> _KeyIds:
+        """Get the property key -> id map for a write"""
+        return _KeyIds(cursor.execute("SELECT key, id FROM property_keys"))
+
+    def _write_batch(self, cursor, class_rows: List[tuple], property_rows: List[tuple],
+                     key_ids: _KeyIds) -> None:
+        """Write and clear a batch of pending class, property and property key rows"""
+        if key_ids.pending:
+            cursor.executemany("INSERT INTO property_keys (id, key) VALUES (?, ?)", key_ids.pending)
+            key_ids.pending.clear()
+        if class_rows:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO classes
+                    (id, name, name_folded, parent, source, scope, row_hash, inherits_from, category)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, class_rows)
+            class_rows.clear()
+        if property_rows:
+            cursor.executemany("""
+                INSERT INTO properties (class_id, key_id, value)
+                VALUES (?, ?, ?)
+            """, property_rows)
+            property_rows.clear()
+
+    def diff_classes(self, classes: Iterable[ClassDef]) -> ConfigDiff:
+        """
+        Compare the stored classes with a new set of top-level classes.
+
+        The new classes are reduced to sorted ((name, source), row hash) keys
+        and merged against the classes table read in the same order, so neither
+        side is held as full class definitions. When a key repeats in the new
+        classes the last one wins, as it would when loading them.
+        """
+        incoming = sorted(((c.name, c.source), row_hash(c, c.parent)) for c in classes)
+        diff = ConfigDiff()
+        cursor = self._get_connection().execute(
+            "SELECT name, source, row_hash FROM classes ORDER BY name, source")
+
+        stored = cursor.fetchone()
+        for i, (key, new_hash) in enumerate(incoming):
+            if i + 1 < len(incoming) and incoming[i + 1][0] == key:
+                continue  # Superseded by a later row for the same class
+            while stored is not None and (stored[0], stored[1]) < key:
+                diff.removed.add((stored[0], stored[1]))
+                stored = cursor.fetchone()
+            if stored is not None and (stored[0], stored[1]) == key:
+                if stored[2] == new_hash:
+                    diff.unchanged += 1
+                else:
+                    diff.changed[key] = new_hash
+                stored = cursor.fetchone()
+            else:
+                diff.added[key] = new_hash
+        while stored is not None:
+            diff.removed.add((stored[0], stored[1]))
+            stored = cursor.fetchone()
+
+        logger.info(f"Config diff: {len(diff.added)} added, {len(diff.removed)} removed, "
+                    f"{len(diff.changed)} changed, {diff.unchanged} unchanged")
+        return diff
+
+    def apply_diff(self, classes: Iterable[ClassDef], diff: ConfigDiff) -> int:
+        """
+        Apply a diff from diff_classes, given the same new classes again.
+
+        Removed and changed classes are deleted with their properties, then
+        only the added and changed classes are written. Returns the number of
+        class rows written.
+        """
+        stale = list(diff.removed) + list(diff.changed)
+        with self._get_connection() as conn:
+            conn.executemany("""
+                DELETE FROM properties WHERE class_id IN
+                    (SELECT id FROM classes WHERE name = ? AND source = ?)
+            """, stale)
+            conn.executemany("DELETE FROM classes WHERE name = ? AND source = ?", stale)
+            conn.execute(_DROP_BLOOM)
+        self._folded_names = None
+        self._hierarchy = None
+        self._suggester = None
+        self._category_names = {}
+        self._bloom, self._bloom_loaded = None, not self._use_bloom
+
+        wanted = {**diff.added, **diff.changed}
+        if not wanted:
+            return 0  # Nothing to write, so the new classes are never read
+
+        def delta() -> Generator[ClassDef, None, None]:
+            for class_def in classes:
+                key = (class_def.name, class_def.source)
+                # Match the content too, so a repeated key writes the row the diff saw
+                if key in wanted and wanted[key] == row_hash(class_def, class_def.parent):
+                    del wanted[key]
+                    yield class_def
+
+        return self.add_classes(delta(), drop_indexes=False)
+
     def get_class_history(self, class_name: str) -> List[ClassDef]:
         """Get version history for a class preserving original case"""
-        with self._get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT c.name, c.parent, c.source, c.scope,
-                       GROUP_CONCAT(p.key || '=' || p.value) as props
-                FROM classes c
-                LEFT JOIN properties p ON c.id = p.class_id
-                WHERE LOWER(c.name) = LOWER(?)
-                GROUP BY c.id, c.name, c.parent, c.source, c.scope
-            """, (class_name,))
-            
-            results = []
-            for row in cursor:
-                props = {}
-                if row['props']:
-                    for prop in row['props'].split(','):
-                        if '=' in prop:
-                            key, value = prop.split('=', 1)
-                            props[key] = value
-                            
-                class_def = ClassDef(
-                    name=row['name'],
-                    parent=row['parent'],  # Parent case is now preserved
-                    source=row['source'],
-                    scope=row['scope'],
-                    properties=props
-                )
-                results.append(class_def)
-                
-            return results
+        cursor = self._get_connection().execute("""
+            SELECT id, name, parent, source, scope FROM classes
+            WHERE name_folded = ?
+            ORDER BY id
+        """, (class_name.lower(),))
+
+        return [
+            ClassDef(
+                name=row['name'],
+                parent=row['parent'],  # Parent case is now preserved
+                source=row['source'],
+                scope=row['scope'],
+                properties=LazyProperties(self, row['id'])
+            )
+            for row in cursor
+        ]
 
     def get_inheritance_chain(self, class_name: str) -> List[ClassDef]:
-        """Get complete inheritance chain for a class"""
-        chain = []
-        visited = set()
-        
-        def _get_parent_recursive(name: str):
-            if name in visited:
-                logger.warning(f"Circular inheritance detected for {name}")
-                return
-            visited.add(name)
-            
-            with self._get_connection() as conn:
-                cursor = conn.execute("""
-                    SELECT c.*, GROUP_CONCAT(p.key || '=' || p.value) as props
-                    FROM classes c
-                    LEFT JOIN properties p ON c.id = p.class_id
-                    WHERE c.name = ?
-                    GROUP BY c.id
-                """, (name,))
-                
-                row = cursor.fetchone()
-                if row:
-                    # Safely parse properties
-                    props = {}
-                    if row['props']:
-                        try:
-                            for prop in row['props'].split(','):
-                                if '=' in prop:
-                                    key, value = prop.split('=', 1)
-                                    props[key] = value
-                        except Exception as e:
-                            logger.warning(f"Error parsing properties: {e}")
-                    
-                    class_def = ClassDef(
+        """Get complete inheritance chain for a class, nearest first"""
+        return self.get_chains([class_name])[class_name]
+
+    def get_chains(self, class_names: Iterable[str]) -> Dict[str, List[ClassDef]]:
+        """
+        Get the inheritance chains of many classes at once.
+
+        Chains come from the precomputed hierarchy and every class on them is
+        loaded in a single pass; properties are only read when first accessed.
+        Unknown names map to [].
+        """
+        chains = self.get_hierarchy().get_chains(class_names)
+        classes = self._load_classes({name for chain in chains.values() for name in chain})
+        return {name: [classes[link] for link in chain if link in classes]
+                for name, chain in chains.items()}
+
+    def get_hierarchy(self) -> ClassHierarchy:
+        """
+        Get the inheritance hierarchy of the stored classes, building it on
+        first use. Classes inherit from their config base class where known
+        (InheritsFrom for INI rows), otherwise from their parent.
+        """
+        if self._hierarchy is None:
+            with self._lock:
+                if self._hierarchy is None:
+                    start = time.perf_counter()
+                    cursor = self._get_connection().execute(
+                        "SELECT name, COALESCE(inherits_from, parent) FROM classes ORDER BY name, source")
+                    self._hierarchy = ClassHierarchy(cursor)
+                    logger.debug(f"Built inheritance hierarchy of {len(self._hierarchy)} classes "
+                                 f"in {time.perf_counter() - start:.2f}s")
+        return self._hierarchy
+
+    def is_descendant(self, class_name: str, ancestor: str) -> bool:
+        """Check if a class inherits, directly or not, from ancestor"""
+        return self.get_hierarchy().is_descendant(class_name, ancestor)
+
+    def get_depth(self, class_name: str) -> Optional[int]:
+        """Get the number of ancestors above a class, or None if unknown"""
+        return self.get_hierarchy().get_depth(class_name)
+
+    def get_suggester(self) -> ClassSuggester:
+        """Get the "did you mean" index over the stored class names, building it on first use"""
+        if self._suggester is None:
+            with self._lock:
+                if self._suggester is None:
+                    cursor = self._get_connection().execute("SELECT DISTINCT name FROM classes ORDER BY name")
+                    self._suggester = ClassSuggester(row[0] for row in cursor)
+        return self._suggester
+
+    def suggest_classes(self, class_names: Iterable[str], limit: int = 3) -> Dict[str, List[str]]:
+        """Get the closest stored class names for each of class_names in one batch"""
+        return self.get_suggester().suggest_many(class_names, limit)
+
+    def get_descendants(self, class_name: str) -> List[str]:
+        """Get the names of every class inheriting, directly or not, from a class"""
+        return self.get_hierarchy().get_descendants(class_name)
+
+    def count_descendants(self, class_name: str) -> int:
+        """Get the number of classes inheriting, directly or not, from a class"""
+        return self.get_hierarchy().count_descendants(class_name)
+
+    def _load_classes(self, names: Set[str]) -> Dict[str, ClassDef]:
+        """Load classes by exact name, first source per name, with lazy properties"""
+        conn = self._get_connection()
+        classes: Dict[str, ClassDef] = {}
+        names = list(names)
+
+        for i in range(0, len(names), QUERY_CHUNK):
+            chunk = names[i:i + QUERY_CHUNK]
+            cursor = conn.execute(f"""
+                SELECT id, name, parent, source FROM classes
+                WHERE name IN ({','.join('?' * len(chunk))})
+                ORDER BY name, source
+            """, chunk)
+            for row in cursor:
+                if row['name'] not in classes:
+                    classes[row['name']] = ClassDef(
                         name=row['name'],
                         parent=row['parent'],
                         source=row['source'],
-                        properties=props
+                        properties=LazyProperties(self, row['id'])
                     )
-                    chain.append(class_def)
-                    
-                    if class_def.parent:
-                        _get_parent_recursive(class_def.parent)
-        
-        _get_parent_recursive(class_name)
-        return chain
+
+        return classes
+
+    def _read_properties(self, class_id: int) -> Dict[str, str]:
+        """Read the properties of one stored class in their original order"""
+        cursor = self._get_connection().execute("""
+            SELECT k.key, p.value FROM properties p
+            JOIN property_keys k ON k.id = p.key_id
+            WHERE p.class_id = ?
+            ORDER BY p.rowid
+        """, (class_id,))
+        return {key: value for key, value in cursor}
 
     def get_class(self, class_name: str) -> bool:
         """Check if class exists in database using case-insensitive lookup"""
         if not class_name:
             return False
-            
-        with self._get_connection() as conn:
+        return bool(self._find_folded({class_name.lower()}))
+
+    def resolve_many(self, names: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+        """
+        Check a batch of class names in one pass.
+
+        Returns (found, missing) sets holding the names as given; matching is
+        case-insensitive like get_class. Empty names are ignored.
+        """
+        names = [name for name in names if name]
+        folded_names = self._find_folded({name.lower() for name in names})
+        found, missing = set(), set()
+        for name in names:
+            if name.lower() in folded_names:
+                found.add(name)
+            else:
+                missing.add(name)
+        return found, missing
+
+    def get_class_in(self, class_name: str, categories: Iterable[str]) -> bool:
+        """
+        Check if a class exists in one of the given config categories.
+
+        Classes of unknown category (not loaded from an INIDBI export) match
+        any category, as they cannot be told apart.
+        """
+        if not class_name:
+            return False
+        folded = class_name.lower()
+        return any(folded in self._get_category_names(category)
+                   for category in (*categories, None))
+
+    def resolve_in(self, names: Iterable[str], categories: Iterable[str]) -> Set[str]:
+        """
+        Get the names, as given, of a batch that exist in one of the given config categories.
+
+        Queries run per chunk of names rather than per name. Classes of
+        unknown category match any category, as in get_class_in.
+        """
+        by_folded: Dict[str, List[str]] = {}
+        for name in names:
+            if name:
+                by_folded.setdefault(name.lower(), []).append(name)
+        folded = list(by_folded)
+        categories = list(categories)
+        found = set()
+        conn = self._get_connection()
+        for i in range(0, len(folded), QUERY_CHUNK):
+            chunk = folded[i:i + QUERY_CHUNK]
             cursor = conn.execute(
-                "SELECT EXISTS(SELECT 1 FROM classes WHERE LOWER(name) = LOWER(?) LIMIT 1)", 
-                (class_name,)
-            )
-            return bool(cursor.fetchone()[0])
+                f"SELECT DISTINCT name_folded FROM classes WHERE name_folded IN ({','.join('?' * len(chunk))}) "
+                f"AND (category IS NULL OR category IN ({','.join('?' * len(categories))}))",
+                chunk + categories)
+            for (name,) in cursor:
+                found.update(by_folded[name])
+        return found
+
+    def get_config_categories(self) -> Set[str]:
+        """Get the config categories the stored classes were exported from"""
+        cursor = self._get_connection().execute(
+            "SELECT DISTINCT category FROM classes WHERE category IS NOT NULL")
+        return {row[0] for row in cursor}
+
+    def get_categories(self, class_names: Iterable[str]) -> Dict[str, Set[str]]:
+        """Get the config categories each stored class is defined in, keyed by name as given"""
+        names = {name.lower(): name for name in class_names if name}
+        folded = list(names)
+        categories: Dict[str, Set[str]] = {}
+        conn = self._get_connection()
+        for i in range(0, len(folded), QUERY_CHUNK):
+            chunk = folded[i:i + QUERY_CHUNK]
+            cursor = conn.execute(
+                f"SELECT name_folded, category FROM classes WHERE name_folded IN ({','.join('?' * len(chunk))})",
+                chunk)
+            for name, category in cursor:
+                if category:
+                    categories.setdefault(names[name], set()).add(category)
+        return categories
+
+    def _get_category_names(self, category: Optional[str]) -> Set[str]:
+        """Get the case-folded names of one config category, loading them on first use"""
+        names = self._category_names.get(category)
+        if names is None:
+            with self._lock:
+                names = self._category_names.get(category)
+                if names is None:
+                    if category is None:
+                        cursor = self._get_connection().execute(
+                            "SELECT name_folded FROM classes WHERE category IS NULL")
+                    else:
+                        cursor = self._get_connection().execute(
+                            "SELECT name_folded FROM classes WHERE category = ?", (category,))
+                    names = self._category_names[category] = {row[0] for row in cursor}
+        return names
+
+    def _find_folded(self, folded: Set[str]) -> Set[str]:
+        """Get the stored names among a set of case-folded names"""
+        bloom = self._get_bloom() if self._folded_names is None else None
+        if bloom is None:
+            return folded & self._get_folded_names()
+
+        candidates = [name for name in folded if name in bloom]
+        found = set()
+        conn = self._get_connection()
+        for i in range(0, len(candidates), QUERY_CHUNK):
+            chunk = candidates[i:i + QUERY_CHUNK]
+            cursor = conn.execute(
+                f"SELECT DISTINCT name_folded FROM classes WHERE name_folded IN ({','.join('?' * len(chunk))})",
+                chunk)
+            found.update(row[0] for row in cursor)
+        # Readers on several threads share the counters
+        with self._lock:
+            self.bloom_stats.negatives += len(folded) - len(candidates)
+            self.bloom_stats.hits += len(found)
+            self.bloom_stats.false_positives += len(candidates) - len(found)
+        return found
+
+    def _get_bloom(self) -> Optional[BloomFilter]:
+        """Get the stored class name filter, if enabled and present"""
+        if not self._bloom_loaded:
+            with self._lock:
+                if not self._bloom_loaded:
+                    data = self.get_meta("name_bloom")
+                    self._bloom = BloomFilter.from_bytes(data) if data else None
+                    self._bloom_loaded = True
+        return self._bloom
+
+    @property
+    def has_bloom(self) -> bool:
+        """Check if existence checks are answered through a stored Bloom filter"""
+        return self._get_bloom() is not None
+
+    def _get_folded_names(self) -> Set[str]:
+        """Get the in-process set of case-folded class names, loading it on first use"""
+        if self._folded_names is None:
+            with self._lock:  # Build once when several threads start looking up together
+                if self._folded_names is None:
+                    cursor = self._get_connection().execute("SELECT name_folded FROM classes")
+                    self._folded_names = {row[0] for row in cursor}
+        return self._folded_names
 
     def add_required_class(self, name: str, category: str = None, reason: str = None) -> None:
         """Mark a class as required"""
@@ -195,17 +730,102 @@ class ClassDatabase:
                 return {"category": row[0], "reason": row[1]}
         return {}
 
+    def count_classes(self) -> int:
+        """Get the number of class rows in the database"""
+        cursor = self._get_connection().execute("SELECT COUNT(*) FROM classes")
+        return cursor.fetchone()[0]
+
+    def iter_rows(self, columns: Sequence[str], order_by: Sequence[str] = ()) -> Iterator[tuple]:
+        """
+        Stream columns of every class row, optionally ordered.
+
+        Rows are read as they are iterated, so callers that export or index
+        the whole table never hold it in memory.
+        """
+        unknown = (set(columns) | set(order_by)) - self._ROW_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown class columns: {', '.join(sorted(unknown))}")
+        sql = f"SELECT {', '.join(columns)} FROM classes"
+        if order_by:
+            sql += f" ORDER BY {', '.join(order_by)}"
+        return iter(self._get_connection().execute(sql))
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """Get a metadata value stored alongside the classes"""
+        cursor = self._get_connection().execute("SELECT value FROM meta WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        """Store a metadata value alongside the classes"""
+        with self._get_connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def finalize(self, analyze: bool = True, bloom_error_rate: Optional[float] = BLOOM_ERROR_RATE) -> None:
+        """
+        Prepare an on-disk database for read-only use by later runs.
+
+        analyze can be turned off after small updates, whose existing
+        planner statistics are still representative. A Bloom filter of the
+        class names, sized for bloom_error_rate, is stored for readers
+        opened with use_bloom; None stores none.
+        """
+        conn = self._get_connection()
+        if analyze:
+            conn.execute("ANALYZE")
+        if bloom_error_rate:
+            self._store_bloom(conn, bloom_error_rate)
+            self._bloom, self._bloom_loaded = None, not self._use_bloom  # Read the new filter on next use
+        # Leave a single self-contained file that can be opened with mode=ro
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.commit()
+
+    def _store_bloom(self, conn, error_rate: float) -> None:
+        """Build the class name filter and store it alongside the classes"""
+        start = time.perf_counter()
+        count = conn.execute("SELECT COUNT(DISTINCT name_folded) FROM classes").fetchone()[0]
+        cursor = conn.execute("SELECT DISTINCT name_folded FROM classes")
+        bloom = BloomFilter.from_items((row[0] for row in cursor), count, error_rate)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('name_bloom', ?)",
+                         (bloom.to_bytes(),))
+        logger.info(f"Stored Bloom filter of {count} class names ({bloom.size // 8:,} bytes, "
+                    f"{bloom.probes} probes) in {time.perf_counter() - start:.2f}s")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the database for the calling thread"""
+        # Each connection is only used by the thread that opened it, but close()
+        # may run on another thread
+        conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
+        conn.row_factory = sqlite3.Row
+        if self.read_only:
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
     def _get_connection(self):
-        """Return existing connection"""
-        return self._conn
+        """Get the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._conn is None:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+            conn = self._local.conn = self._connect()
+        return conn
 
     def close(self):
-        """Ensure connection is properly closed"""
-        if self._conn:
+        """Ensure every thread's connection is properly closed"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._conn = None
+        self._local = threading.local()
+        # The opening thread's connection goes last: it keeps an in-memory database alive
+        for conn in reversed(connections):
             try:
-                self._conn.close()
-            finally:
-                self._conn = None
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not close database connection: {e}")
 
     def __enter__(self):
         return self
@@ -215,4 +835,5 @@ class ClassDatabase:
 
     def __del__(self):
         """Cleanup database connection"""
-        self.close()
+        if hasattr(self, "_lock"):
+            self.close()
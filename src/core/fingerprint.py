@@ -0,0 +1,111 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+import hashlib
+import os
+
+@dataclass
+class TreeFingerprint:
+    """
+    Merkle fingerprint of a directory tree built from file metadata.
+
+    Every directory gets two hashes keyed by its path relative to the root
+    ("" for the root itself): one over the name, size and modification time
+    of the files directly inside it, and one over those plus the subtree
+    hashes of its subdirectories. Equal root hashes mean an unchanged tree;
+    otherwise comparing the per-directory hashes finds what changed without
+    reading any file content.
+    """
+    root: str
+    dirs: Dict[str, Tuple[str, str]] = field(default_factory=dict)  # Relative dir -> (subtree, files) hash
+
+    def changed_dirs(self, previous: Optional['TreeFingerprint']) -> Set[str]:
+        """Get the directories whose own files differ from a previous fingerprint, or are new"""
+        if previous is None:
+            return set(self.dirs)
+        if previous.root == self.root:
+            return set()
+        children: Dict[str, list] = {}
+        for rel_dir in self.dirs:
+            if rel_dir:
+                children.setdefault(rel_dir.rpartition("/")[0], []).append(rel_dir)
+
+        changed = set()
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            subtree, files = self.dirs[rel_dir]
+            old = previous.dirs.get(rel_dir)
+            if old is not None and old[0] == subtree:
+                continue  # Nothing below this directory changed
+            if old is None or old[1] != files:
+                changed.add(rel_dir)
+            stack.extend(children.get(rel_dir, ()))
+        return changed
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"root": self.root, "dirs": {d: list(h) for d, h in self.dirs.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> 'TreeFingerprint':
+        return cls(root=data["root"], dirs={d: tuple(h) for d, h in data["dirs"].items()})
+
+def fingerprint_tree(root: Path, suffixes: Optional[Iterable[str]] = None) -> TreeFingerprint:
+    """
+    Fingerprint the files under root from a single stat per entry.
+
+    suffixes limits the files taken into account to those a caller actually
+    reads, so unrelated files (logs, the cache itself) never invalidate it.
+    Symlinked directories are followed, except into one of their own
+    ancestors.
+    """
+    suffixes = {s.lower() for s in suffixes} if suffixes is not None else None
+    dirs: Dict[str, Tuple[str, str]] = {}
+
+    # Post-order walk with an explicit stack: a directory is hashed once all
+    # of its subdirectories have been. Each entry carries the real paths the
+    # walk passed through to reach it, to stop symlink cycles
+    stack = [(os.path.abspath(root), "", False, ())]
+    pending: Dict[str, list] = {}
+    while stack:
+        abs_dir, rel_dir, visited, trail = stack.pop()
+        if visited:
+            files_hash, subdirs = pending.pop(rel_dir)
+            subtree = hashlib.blake2b(files_hash.encode(), digest_size=16)
+            for name, child in sorted(subdirs):
+                subtree.update(f"\0d\0{name}\0{dirs[child][0]}".encode())
+            dirs[rel_dir] = (subtree.hexdigest(), files_hash)
+            continue
+
+        files = []
+        subdirs = []
+        followed = {}  # Child -> trail, for the symlinked ones
+        try:
+            entries = list(os.scandir(abs_dir))
+        except OSError:
+            entries = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    child = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_symlink():
+                        here = os.path.realpath(abs_dir)
+                        target = os.path.realpath(entry.path)
+                        if any(p == target or p.startswith(target + os.sep) for p in trail + (here,)):
+                            continue
+                        followed[child] = trail + (here,)
+                    subdirs.append((entry.name, child))
+                elif entry.is_file() and (suffixes is None or
+                                          os.path.splitext(entry.name)[1].lower() in suffixes):
+                    stat = entry.stat()
+                    files.append(f"{entry.name}\0{stat.st_size}\0{stat.st_mtime_ns}")
+            except OSError:
+                continue
+
+        files_hash = hashlib.blake2b("\0f\0".join(sorted(files)).encode(), digest_size=16).hexdigest()
+        pending[rel_dir] = (files_hash, subdirs)
+        stack.append((abs_dir, rel_dir, True, trail))
+        for name, child in subdirs:
+            stack.append((os.path.join(abs_dir, name), child, False, followed.get(child, trail)))
+
+    return TreeFingerprint(root=dirs[""][0], dirs=dirs)
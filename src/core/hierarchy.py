@@ -0,0 +1,132 @@
+from typing import Dict, List, Optional, Iterable, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ClassHierarchy:
+    """
+    Precomputed class inheritance hierarchy.
+
+    Built once from (name, parent) pairs. A single depth-first pass over the
+    parent -> child forest gives every class a preorder interval and a depth,
+    so descendant checks are two comparisons and depth is a lookup; chains
+    follow parent links without touching the database. Since a subtree is a
+    contiguous run of the preorder, listing or counting the descendants of a
+    class is a slice or a subtraction. Classes whose parent
+    is unknown are roots, and inheritance cycles are broken (and logged) at
+    the first class of the cycle that is reached.
+    """
+
+    def __init__(self, edges: Iterable[Tuple[str, Optional[str]]]):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        parent_names: List[Optional[str]] = []
+        for name, parent in edges:
+            if name in self._ids:
+                continue  # The first definition of a name wins
+            self._ids[name] = len(self._names)
+            self._names.append(name)
+            parent_names.append(parent)
+
+        count = len(self._names)
+        self._parents = [self._ids.get(parent, -1) if parent else -1 for parent in parent_names]
+        self._children: List[List[int]] = [[] for _ in range(count)]
+        for node, parent in enumerate(self._parents):
+            if parent >= 0:
+                self._children[parent].append(node)
+
+        self._enter = [-1] * count
+        self._exit = [-1] * count
+        self._depths = [0] * count
+        self._order: List[int] = []  # Nodes by preorder position
+        self._counter = 0
+
+        for node in range(count):
+            if self._parents[node] < 0:
+                self._label(node)
+
+        # Anything still unlabelled sits on or below an inheritance cycle
+        for node in range(count):
+            if self._enter[node] < 0:
+                seen = set()
+                current = node
+                while current not in seen:
+                    seen.add(current)
+                    current = self._parents[current]
+                logger.warning(f"Circular inheritance detected for {self._names[current]}")
+                self._children[self._parents[current]].remove(current)
+                self._parents[current] = -1
+                self._label(current)
+
+    def _label(self, root: int) -> None:
+        """Assign preorder intervals and depths to the subtree under root"""
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node >= 0:
+                self._enter[node] = self._counter
+                self._order.append(node)
+                self._counter += 1
+                stack.append(~node)  # Close the interval once the children are done
+                depth = self._depths[node] + 1
+                for child in self._children[node]:
+                    self._depths[child] = depth
+                    stack.append(child)
+            else:
+                self._exit[~node] = self._counter
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def get_parent(self, name: str) -> Optional[str]:
+        """Get the known parent of a class, if any"""
+        node = self._ids.get(name)
+        if node is None or self._parents[node] < 0:
+            return None
+        return self._names[self._parents[node]]
+
+    def get_depth(self, name: str) -> Optional[int]:
+        """Get the number of ancestors above a class, or None if unknown"""
+        node = self._ids.get(name)
+        return None if node is None else self._depths[node]
+
+    def is_descendant(self, name: str, ancestor: str) -> bool:
+        """Check if name inherits, directly or not, from ancestor"""
+        node, above = self._ids.get(name), self._ids.get(ancestor)
+        if node is None or above is None:
+            return False
+        return self._enter[above] < self._enter[node] < self._exit[above]
+
+    def get_children(self, name: str) -> List[str]:
+        """Get the classes that directly inherit from a class"""
+        node = self._ids.get(name)
+        return [] if node is None else [self._names[child] for child in self._children[node]]
+
+    def get_descendants(self, name: str) -> List[str]:
+        """Get every class inheriting, directly or not, from a class, in preorder"""
+        node = self._ids.get(name)
+        if node is None:
+            return []
+        names = self._names
+        return [names[child] for child in self._order[self._enter[node] + 1:self._exit[node]]]
+
+    def count_descendants(self, name: str) -> int:
+        """Get the number of classes inheriting, directly or not, from a class"""
+        node = self._ids.get(name)
+        return 0 if node is None else self._exit[node] - self._enter[node] - 1
+
+    def get_chain(self, name: str) -> List[str]:
+        """Get the class followed by its ancestors, nearest first"""
+        node = self._ids.get(name)
+        chain = []
+        while node is not None and node >= 0:
+            chain.append(self._names[node])
+            node = self._parents[node]
+        return chain
+
+    def get_chains(self, names: Iterable[str]) -> Dict[str, List[str]]:
+        """Get the chains of many classes at once; unknown names map to []"""
+        return {name: self.get_chain(name) for name in names}
@@ -1,9 +1,36 @@
+from collections.abc import ItemsView, Mapping
 from dataclasses import dataclass, field
 from pathlib import Path
 import re
-from typing import Optional, Dict, Set, List, Any
+import sys
+from typing import Optional, Dict, Set, FrozenSet, List, Any, Tuple, Iterator
 from datetime import datetime
 
+# Slotted dataclasses drop the per-instance __dict__ (Python 3.10+)
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Config categories each loadout equipment array may reference. Items arrays
+# hold CfgWeapons items alongside grenades and other magazines.
+_WEAPONS = frozenset({"CfgWeapons"})
+_ITEMS = frozenset({"CfgWeapons", "CfgMagazines", "CfgGlasses"})
+EQUIPMENT_ARRAY_CATEGORIES: Dict[str, FrozenSet[str]] = {
+    'primaryWeapon': _WEAPONS,
+    'secondaryWeapon': _WEAPONS,
+    'handgunWeapon': _WEAPONS,
+    'sidearmWeapon': _WEAPONS,
+    'uniform': _WEAPONS,
+    'vest': _WEAPONS,
+    'attachment': _WEAPONS,
+    'scope': _WEAPONS,
+    'silencer': _WEAPONS,
+    'bipod': _WEAPONS,
+    'backpack': frozenset({"CfgVehicles"}),
+    'magazines': frozenset({"CfgMagazines"}),
+    'items': _ITEMS,
+    'linkedItems': _ITEMS,
+    'backpackItems': _ITEMS,
+}
+
 @dataclass(frozen=True)  # Make Asset immutable for hashing
 class Asset:
     path: Path
@@ -21,7 +48,43 @@ class Asset:
                 self.checksum == other.checksum and 
                 self.source == other.source)
 
-@dataclass
+class RowProperties(Mapping):
+    """
+    Read-only header -> value view over one decoded INIDBI row.
+
+    The header index is shared by every row decoded with the same header, so
+    each class holds a tuple of its field values rather than a full dict.
+    """
+    __slots__ = ('_index', '_values')
+
+    def __init__(self, index: Dict[str, int], values: Tuple[str, ...]):
+        self._index = index
+        self._values = values
+
+    def __getitem__(self, key: str) -> str:
+        return self._values[self._index[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def items(self) -> ItemsView:
+        return _RowItems(self)
+
+    def __repr__(self):
+        return f"RowProperties({dict(self)!r})"
+
+class _RowItems(ItemsView):
+    """Items view of a RowProperties that pairs keys and values without a lookup per key"""
+    __slots__ = ()
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        row = self._mapping
+        return zip(row._index, map(row._values.__getitem__, row._index.values()))
+
+@dataclass(**_SLOTS)
 class InidbiProperty:
     """Property definition from INIDBI2"""
     name: str
@@ -30,7 +93,7 @@ class InidbiProperty:
     line_number: int
     inherited: bool = False
 
-@dataclass
+@dataclass(**_SLOTS)
 class InidbiClass:
     """INIDBI2 specific class metadata"""
     category: str
@@ -45,7 +108,7 @@ class InidbiClass:
     config_path: Optional[str] = None
     config_line: Optional[int] = None
 
-@dataclass
+@dataclass(**_SLOTS)
 class ClassDef:
     """Class definition model"""
     name: str
@@ -70,6 +133,169 @@ class ClassDef:
             return False
         return self.name == other.name and self.source == other.source
 
+    @property
+    def equipment_arrays(self) -> List[str]:
+        """Equipment arrays a referenced class appears in, in the order first seen"""
+        arrays = self.properties.get("equipment_arrays")
+        return arrays.split(",") if arrays else []
+
+@dataclass
+class IniStats:
+    """Statistics collected while ingesting an INIDBI file"""
+    classes: int = 0
+    malformed_lines: int = 0
+    sources: Dict[str, int] = field(default_factory=dict)  # Classes per source mod
+    categories: Dict[str, int] = field(default_factory=dict)  # Classes per config category
+
+    def record(self, class_def: 'ClassDef') -> None:
+        """Count one decoded class"""
+        self.classes += 1
+        self.sources[class_def.source] = self.sources.get(class_def.source, 0) + 1
+        category = class_def.inidbi_meta.category if class_def.inidbi_meta else "unknown"
+        self.categories[category] = self.categories.get(category, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "classes": self.classes,
+            "malformed_lines": self.malformed_lines,
+            "sources": dict(self.sources),
+            "categories": dict(self.categories),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'IniStats':
+        return cls(
+            classes=data.get("classes", 0),
+            malformed_lines=data.get("malformed_lines", 0),
+            sources=dict(data.get("sources", {})),
+            categories=dict(data.get("categories", {})),
+        )
+
+@dataclass
+class ConfigDiff:
+    """
+    Class-level differences between a class database and a newer export.
+
+    Classes are keyed by (name, source). added and changed map each key to
+    the row hash of its new content; removed holds the keys that are gone.
+    """
+    added: Dict[Tuple[str, str], str] = field(default_factory=dict)
+    removed: Set[Tuple[str, str]] = field(default_factory=set)
+    changed: Dict[Tuple[str, str], str] = field(default_factory=dict)
+    unchanged: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarise the diff with the affected class names grouped by source"""
+        def by_source(keys) -> Dict[str, List[str]]:
+            grouped: Dict[str, List[str]] = {}
+            for name, source in sorted(keys, key=lambda key: (key[1], key[0])):
+                grouped.setdefault(source, []).append(name)
+            return grouped
+
+        return {
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "changed": len(self.changed),
+            "unchanged": self.unchanged,
+            "classes": {
+                "added": by_source(self.added),
+                "removed": by_source(self.removed),
+                "changed": by_source(self.changed),
+            },
+        }
+
+@dataclass
+class CacheTableStats:
+    """Occupancy of one CacheManager table, and how one manager used it"""
+    entries: int = 0
+    bytes: int = 0  # Stored blob size
+    hits: int = 0
+    misses: int = 0  # Absent, stale or unreadable entries
+    writes: int = 0
+    bytes_written: int = 0
+    encode_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    evictions: int = 0  # Entries evicted over budget
+    errors: int = 0  # Failed reads and writes, logged and otherwise ignored
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "entries": self.entries,
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "writes": self.writes,
+            "bytes_written": self.bytes_written,
+            "encode_seconds": round(self.encode_seconds, 4),
+            "decode_seconds": round(self.decode_seconds, 4),
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+@dataclass
+class BloomStats:
+    """Outcomes of class lookups answered through a Bloom filter"""
+    negatives: int = 0  # Rejected by the filter without a query
+    hits: int = 0  # Passed the filter and stored
+    false_positives: int = 0  # Passed the filter but not stored
+
+    @property
+    def lookups(self) -> int:
+        return self.negatives + self.hits + self.false_positives
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Share of absent names the filter failed to reject"""
+        absent = self.negatives + self.false_positives
+        return self.false_positives / absent if absent else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "lookups": self.lookups,
+            "negatives": self.negatives,
+            "hits": self.hits,
+            "false_positives": self.false_positives,
+            "false_positive_rate": round(self.false_positive_rate, 4),
+        }
+
+@dataclass
+class PackCoverage:
+    """How well one modpack covers a set of referenced classes"""
+    pack: str
+    total: int = 0
+    missing: Set[str] = field(default_factory=set)
+    sources: Dict[str, Set[str]] = field(default_factory=dict)  # Source mod -> references it provides
+
+    @property
+    def found(self) -> int:
+        return self.total - len(self.missing)
+
+    @property
+    def is_complete(self) -> bool:
+        return not self.missing
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "pack": self.pack,
+            "total": self.total,
+            "found": self.found,
+            "missing": sorted(self.missing),
+            "sources": {source: sorted(names) for source, names in sorted(self.sources.items())},
+        }
+
 @dataclass
 class ScanResult:
     """Result of scanning a mission folder"""
@@ -0,0 +1,226 @@
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from .database import ClassDatabase
+
+logger = logging.getLogger(__name__)
+
+# File layout, all little-endian:
+#   header   magic, version, record count, string table counts, section offsets
+#   records  one fixed-size record per case-folded class name, sorted by folded name bytes
+#   folded   UTF-8 case-folded names the records point into
+#   names    UTF-8 original-case names the records point into
+#   strings  NUL-separated source names followed by NUL-separated category names
+MAGIC = b"CLSIDX\x00\x00"
+INDEX_VERSION = 1
+_HEADER = struct.Struct("<8sIIIIQQQQ")
+# folded name offset/length, name offset/length, parent record (-1 if none), source id, category id
+_RECORD = struct.Struct("<IIIIiII")
+_RECORD_FIELDS = 7
+# Record fields can be read straight from the mapping only where native order is the file's
+_NATIVE_LITTLE = sys.byteorder == "little"
+
+class NameIndexError(Exception):
+    """Raised when a class name index file is unreadable or of another version"""
+
+def write_name_index(database: ClassDatabase, path: Path) -> int:
+    """
+    Export the classes of a database to a binary name index file.
+
+    Holds one record per case-folded class name (the first source in name
+    order, as for the inheritance hierarchy) with its parent resolved to a
+    record number. The file is written under a temporary name and moved into
+    place, so readers never map a partial file. Returns the record count.
+    """
+    start = time.perf_counter()
+    cursor = database.iter_rows(("name_folded", "name", "inherits_from", "parent", "source", "category"),
+                                order_by=("name_folded", "name", "source"))
+
+    rows = []
+    seen = set()
+    for folded, name, inherits, parent, source, category in cursor:
+        if folded not in seen:
+            seen.add(folded)
+            parent = inherits if inherits is not None else parent
+            rows.append((folded.encode("utf-8"), name.encode("utf-8"), parent, source, category or ""))
+    rows.sort(key=lambda row: row[0])  # Byte order, exactly as the reader compares
+    positions = {row[0]: i for i, row in enumerate(rows)}
+
+    sources: Dict[str, int] = {}
+    categories: Dict[str, int] = {}
+    records = bytearray()
+    folded_blob = bytearray()
+    name_blob = bytearray()
+    for folded, name, parent, source, category in rows:
+        parent_id = positions.get(parent.lower().encode("utf-8"), -1) if parent else -1
+        records += _RECORD.pack(
+            len(folded_blob), len(folded), len(name_blob), len(name), parent_id,
+            sources.setdefault(source, len(sources)), categories.setdefault(category, len(categories)))
+        folded_blob += folded
+        name_blob += name
+
+    strings = "\0".join(list(sources) + list(categories)).encode("utf-8")
+    records_offset = _HEADER.size
+    folded_offset = records_offset + len(records)
+    names_offset = folded_offset + len(folded_blob)
+    strings_offset = names_offset + len(name_blob)
+    header = _HEADER.pack(MAGIC, INDEX_VERSION, len(rows), len(sources), len(categories),
+                          records_offset, folded_offset, names_offset, strings_offset)
+
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        for section in (header, records, folded_blob, name_blob, strings):
+            f.write(section)
+    os.replace(tmp_path, path)
+
+    logger.info(f"Wrote class name index {path.name} with {len(rows)} names "
+                f"in {time.perf_counter() - start:.2f}s")
+    return len(rows)
+
+def _record_fields(mm: mmap.mmap, offset: int, count: int) -> Sequence[int]:
+    """Get the little-endian record fields as a flat sequence of unsigned ints"""
+    if _NATIVE_LITTLE:
+        return memoryview(mm)[offset:offset + count * _RECORD.size].cast("I")
+    # Big-endian hosts decode the fields once into a native array
+    return array("I", struct.unpack_from(f"<{count * _RECORD_FIELDS}I", mm, offset))
+
+class NameIndex:
+    """
+    Read-only class name index backed by a memory-mapped file.
+
+    Opening maps the file without reading it, so any number of worker
+    processes share the one copy in the OS page cache and start instantly.
+    Lookups are case-insensitive binary searches over the sorted records.
+    Pickling an index (e.g. to send it to a spawned worker) only transfers
+    its path; the receiving process maps the file again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._open()
+
+    def _open(self) -> None:
+        with open(self.path, "rb") as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # Empty file
+                raise NameIndexError(f"Invalid class name index {self.path}: {e}") from e
+
+        if len(self._mm) < _HEADER.size:
+            self.close()
+            raise NameIndexError(f"Truncated class name index {self.path}")
+        (magic, version, self._count, source_count, category_count, self._records,
+         self._folded, self._names, strings) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise NameIndexError(f"Unsupported class name index {self.path}")
+        if not self._records + self._count * _RECORD.size <= self._folded <= self._names <= strings <= len(self._mm):
+            self.close()
+            raise NameIndexError(f"Corrupt class name index {self.path}")
+
+        # Record fields as unsigned ints, read without struct unpacking on the lookup path
+        self._fields = _record_fields(self._mm, self._records, self._count)
+
+        # The string tables are tiny, so decode them once
+        table = self._mm[strings:].decode("utf-8").split("\0") if len(self._mm) > strings else []
+        self._sources: List[str] = table[:source_count]
+        self._categories: List[str] = table[source_count:source_count + category_count]
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._open()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, name: str) -> bool:
+        return self.get_class(name)
+
+    def _record(self, position: int) -> Tuple[int, int, int, int, int, int, int]:
+        return _RECORD.unpack_from(self._mm, self._records + position * _RECORD.size)
+
+    def _find(self, name: str) -> int:
+        """Get the record position of a class name, or -1"""
+        key = name.lower().encode("utf-8")
+        fields, mm, folded, width = self._fields, self._mm, self._folded, _RECORD_FIELDS
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            start = folded + fields[mid * width]
+            if mm[start:start + fields[mid * width + 1]] < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self._count:
+            start = folded + fields[low * width]
+            if mm[start:start + fields[low * width + 1]] == key:
+                return low
+        return -1
+
+    def _name(self, position: int) -> str:
+        record = self._record(position)
+        start = self._names + record[2]
+        return self._mm[start:start + record[3]].decode("utf-8")
+
+    def get_class(self, class_name: str) -> bool:
+        """Check if a class exists using case-insensitive lookup"""
+        return bool(class_name) and self._find(class_name) >= 0
+
+    def get_name(self, class_name: str) -> Optional[str]:
+        """Get the stored spelling of a class name"""
+        position = self._find(class_name) if class_name else -1
+        return self._name(position) if position >= 0 else None
+
+    def get_parent(self, class_name: str) -> Optional[str]:
+        """Get the stored name of a class's parent, if it is indexed"""
+        position = self._find(class_name) if class_name else -1
+        if position < 0:
+            return None
+        parent = self._record(position)[4]
+        return self._name(parent) if parent >= 0 else None
+
+    def get_chain(self, class_name: str) -> List[str]:
+        """Get the class followed by its ancestors, nearest first"""
+        chain = []
+        position = self._find(class_name) if class_name else -1
+        seen = set()
+        while position >= 0 and position not in seen:
+            seen.add(position)
+            chain.append(self._name(position))
+            position = self._record(position)[4]
+        return chain
+
+    def get_source(self, class_name: str) -> Optional[str]:
+        """Get the source mod of a class"""
+        position = self._find(class_name) if class_name else -1
+        return self._sources[self._record(position)[5]] if position >= 0 else None
+
+    def get_category(self, class_name: str) -> Optional[str]:
+        """Get the config category of a class, if known"""
+        position = self._find(class_name) if class_name else -1
+        if position < 0:
+            return None
+        return self._categories[self._record(position)[6]] or None
+
+    def close(self) -> None:
+        if isinstance(getattr(self, "_fields", None), memoryview):
+            self._fields.release()
+        self._fields = None
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
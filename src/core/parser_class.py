@@ -6,15 +6,26 @@ import csv
 import logging
 from .models import ClassDef, InidbiClass
 from .base_parser import BaseParser
+from .cache import CacheManager
 from .parser_mission import MissionParser
 
 logger = logging.getLogger(__name__)
 
+# Part of every parse cache key: bump whenever a change to the parsers
+# changes the classes they produce, so stale cached results are not reused
+PARSER_VERSION = 3
+
 class ClassParser(BaseParser):
-    """Unified parser for all class definition formats"""
+    """
+    Unified parser for all class definition formats.
+
+    With a cache_mgr, parse_file() caches each file's classes by content
+    hash and parser version, and only parses files it has not seen.
+    """
     
-    def __init__(self):
+    def __init__(self, cache_mgr: Optional[CacheManager] = None):
         super().__init__()
+        self.cache_mgr = cache_mgr
         # Updated regex to better handle nested braces and parentheses
         self._class_pattern = re.compile(
             r'class\s+(\w+)(?:\s*:\s*(\w+))?\s*({[^{}]*(?:{[^{}]*}[^{}]*)*})',
@@ -38,7 +49,6 @@ class ClassParser(BaseParser):
             'linkedItems', 'sidearmWeapon', 'attachment', 'scope',
             'silencer', 'bipod', 'backpackItems'  # Added backpackItems
         }
-        self._processed_classes = set()  # Add set to track unique class names
 
         # Add ignore patterns
         self._ignore_patterns = [
@@ -85,13 +95,21 @@ class ClassParser(BaseParser):
         try:
             content = path.read_text(encoding='utf-8')
             source = path.stem
+            # Only use mission parsing if enabled and file matches mission patterns
+            mission_mode = treat_as_mission and self.mission_parser.is_mission_file(path)
+
+            # Classes depend on the content, the parser and the file's stem (their source)
+            cache_key = None
+            if self.cache_mgr is not None:
+                cache_key = f"{PARSER_VERSION}|{int(mission_mode)}|{source}|{self._get_content_hash(content)}"
+                if (cached := self.cache_mgr.get_cached_parse(cache_key)) is not None:
+                    return cached
             
             if not self._verify_balanced_braces(content, path):
                 logger.error(f"Failed to parse {path} due to unbalanced braces")
                 raise ValueError(f"File {path} has unbalanced braces")
             
-            # Only use mission parsing if enabled and file matches mission patterns
-            if treat_as_mission and self.mission_parser.is_mission_file(path):
+            if mission_mode:
                 classes.update(self.mission_parser.parse_file(path))
             else:
                 classes.update(self._parse_content(content, source))
@@ -101,6 +119,9 @@ class ClassParser(BaseParser):
             for class_def in classes:
                 if not class_def.is_mission_local:
                     self.validate_inheritance(class_def, available)
+
+            if cache_key is not None:
+                self.cache_mgr.cache_parse(cache_key, path.name, classes)
                 
         except Exception as e:
             logger.error(f"Failed to parse file {path}: {e}")
@@ -117,6 +138,7 @@ class ClassParser(BaseParser):
     def _parse_class_content(self, content: str, source: str) -> Set[ClassDef]:
         """Parse class definitions with improved error handling"""
         classes = set()
+        references: Dict[str, ClassDef] = {}  # Equipment references in this content by name
         
         # First verify brace balance
         if not self._verify_balanced_braces(content, source):
@@ -165,7 +187,7 @@ class ClassParser(BaseParser):
                 properties = self._extract_properties(nested_content)
                 
                 # Extract equipment references from properties
-                self._extract_equipment_references(properties, classes, source)
+                self._extract_equipment_references(properties, classes, references, source)
                 
                 # Create main class
                 class_def = ClassDef(
@@ -577,8 +599,8 @@ class ClassParser(BaseParser):
         return chain
 
     def _extract_equipment_references(self, properties: Dict[str, str], 
-                                   classes: Set[ClassDef], source: str, 
-                                   mission_mode: bool = False):
+                                   classes: Set[ClassDef], references: Dict[str, ClassDef],
+                                   source: str, mission_mode: bool = False):
         """Extract equipment references with mission-aware handling"""
         for key, value in properties.items():
             key = key.strip('[]')
@@ -608,17 +630,7 @@ class ClassParser(BaseParser):
                     if mission_mode and self._is_mission_local_class(content):
                         continue
                         
-                    if content not in self._processed_classes:
-                        self._processed_classes.add(content)
-                        ref_class = ClassDef(
-                            name=content,
-                            parent=None,
-                            source=source,
-                            properties={"list_count": str(count)},
-                            is_reference=True,
-                            is_mission_local=False
-                        )
-                        classes.add(ref_class)
+                    self._add_reference(classes, references, content, source, key, {"list_count": str(count)})
                         
                 # Handle regular item references
                 elif item and not item.isdigit():
@@ -626,17 +638,25 @@ class ClassParser(BaseParser):
                     if mission_mode and self._is_mission_local_class(item):
                         continue
                         
-                    if item not in self._processed_classes:
-                        self._processed_classes.add(item)
-                        ref_class = ClassDef(
-                            name=item,
-                            parent=None,
-                            source=source,
-                            properties={},
-                            is_reference=True,
-                            is_mission_local=False
-                        )
-                        classes.add(ref_class)
+                    self._add_reference(classes, references, item, source, key, {})
+
+    def _add_reference(self, classes: Set[ClassDef], references: Dict[str, ClassDef], name: str,
+                       source: str, array: str, properties: Dict[str, str]):
+        """Add an equipment reference, or record another array an existing one appears in"""
+        ref_class = references.get(name)
+        if ref_class is None:
+            properties["equipment_arrays"] = array
+            ref_class = references[name] = ClassDef(
+                name=name,
+                parent=None,
+                source=source,
+                properties=properties,
+                is_reference=True,
+                is_mission_local=False
+            )
+            classes.add(ref_class)
+        elif array not in ref_class.equipment_arrays:
+            ref_class.properties["equipment_arrays"] += f",{array}"
 
     def _parse_array_items(self, content: str) -> List[str]:
         """Parse array content with improved comma handling"""
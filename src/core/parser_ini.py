@@ -1,14 +1,36 @@
 from pathlib import Path
-from typing import Set, Dict, List, Optional, Tuple, Generator, DefaultDict
-from collections import defaultdict
+from typing import Set, Dict, List, Optional, Tuple, Generator, DefaultDict, Iterable
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 import re
 import csv
 import logging
-from .models import ClassDef, InidbiClass
+import mmap
+import os
+from sys import intern
+from .models import ClassDef, InidbiClass, RowProperties, IniStats
 from .base_parser import BaseParser
 
 logger = logging.getLogger(__name__)
 
+# Target size of the byte ranges decoded by each worker in parallel mode
+SHARD_SIZE = 8 << 20
+
+# Size hint for the blocks of lines read and decoded together
+BLOCK_SIZE = 1 << 20
+
+# A run of decoded rows sharing a section: (category, headers, field rows)
+RowBlock = Tuple[Optional[str], List[str], List[List[str]]]
+
+# Shared empty nested-class set for INI rows
+_NO_NESTED = frozenset()
+
+# Columns read positionally by InidbiParser._create_class, in unpacking order
+_LAYOUT_COLUMNS = (
+    "ClassName", "Source", "Parent", "InheritsFrom", "IsSimpleObject",
+    "NumProperties", "Scope", "Model", "DisplayName"
+)
+
 class InidbiParser(BaseParser):
     """Base class for parsing INIDBI format class definitions"""
     def __init__(self):
@@ -20,55 +42,27 @@ class InidbiParser(BaseParser):
         ]
         self._sources = set()
         self._class_lookup: Dict[str, ClassDef] = {}
+        self._header_layouts: Dict[Tuple[str, ...], Tuple[Dict[str, int], int, Tuple[int, ...]]] = {}
+
+    def parse_file(self, path: Path, workers: Optional[int] = 1) -> Dict[str, Set[ClassDef]]:
+        """
+        Parse INIDBI format with proper quote handling
 
-    def parse_file(self, path: Path) -> Dict[str, Set[ClassDef]]:
-        """Parse INIDBI format with proper quote handling"""
+        Args:
+            path: Path to the INIDBI file
+            workers: Number of processes to decode sections with; 1 parses serially,
+                     None uses every core
+        """
         try:
             classes_by_source = defaultdict(set)
             self._class_lookup.clear()
             self._sources.clear()
-            
-            current_category = None
-            header_fields = self._default_headers
-            
-            lines = path.read_text(encoding='utf-8', errors='ignore').splitlines()
-            
-            for line in lines:
-                line = line.strip()
-                if not line or line.startswith(';'):
-                    continue
 
-                # Handle category headers
-                if line.startswith('[CategoryData_'):
-                    current_category = line[13:-1]
-                    continue
-
-                # Handle header line
-                if line.startswith('header='):
-                    header_line = line[7:].strip('"')
-                    header_fields = next(csv.reader([header_line]))
-                    header_fields = [f.strip() for f in header_fields]
-                    continue
-
-                # Handle data lines
-                if current_category and '=' in line:
-                    if line.startswith('header='):
-                        continue
-                        
-                    try:
-                        idx, data = line.split('=', 1)
-                        data = data.strip().strip('"')
-                        fields = next(csv.reader([data]))
-                        
-                        if class_def := self._create_class(fields, current_category, header_fields):
-                            source = class_def.source
-                            classes_by_source[source].add(class_def)
-                            self._sources.add(source)
-                            self._class_lookup[class_def.name] = class_def
-                            
-                    except Exception as e:
-                        logger.debug(f"Skipping malformed line: {line} - {e}")
-                        continue
+            for class_def in self.iter_classes(path, workers):
+                source = class_def.source
+                classes_by_source[source].add(class_def)
+                self._sources.add(source)
+                self._class_lookup[class_def.name] = class_def
 
             logger.info(f"Parsed {sum(len(classes) for classes in classes_by_source.values())} "
                        f"total classes from {len(classes_by_source)} sources")
@@ -79,36 +73,250 @@ class InidbiParser(BaseParser):
             logger.error(f"Failed to parse INIDBI file {path}: {e}")
             return {}
 
-    def _create_class(self, fields: List[str], category: str, headers: List[str]) -> Optional[ClassDef]:
-        """Fixed class creation logic"""
+    def iter_classes(self, path: Path, workers: Optional[int] = 1,
+                     stats: Optional[IniStats] = None) -> Generator[ClassDef, None, None]:
+        """
+        Stream class definitions from an INIDBI file.
+
+        The file is read line by line and each class is yielded as soon as its
+        row is decoded, so memory use does not grow with the size of the export.
+        Unlike parse_file, nothing is retained in the parser's lookup tables.
+        With workers other than 1, sections are decoded in a process pool
+        (None uses every core) and classes are yielded in file order.
+        If stats is given it is updated as classes and malformed lines are seen.
+        """
+        if workers != 1:
+            yield from self._iter_classes_parallel(path, workers, stats=stats)
+            return
+
+        with open(path, 'r', encoding='utf-8', errors='ignore') as ini_file:
+            blocks = iter(lambda: ini_file.readlines(BLOCK_SIZE), [])
+            yield from self._create_classes(self._decode_blocks(blocks, stats=stats), stats)
+
+    def _decode_blocks(self, blocks: Iterable[List[str]], category: Optional[str] = None,
+                       headers: Optional[List[str]] = None,
+                       stats: Optional[IniStats] = None) -> Generator[RowBlock, None, None]:
+        """Decode blocks of INIDBI lines, starting in the given section state"""
+        header_fields = headers or self._default_headers
+        for lines in blocks:
+            for block in self._decode_block(lines, category, header_fields, stats):
+                category, header_fields = block[0], block[1]
+                if block[2]:
+                    yield block
+
+    def _decode_block(self, lines: List[str], category: Optional[str], headers: List[str],
+                      stats: Optional[IniStats] = None) -> List[RowBlock]:
+        """
+        Split a block of INIDBI lines into (category, headers, rows) groups.
+
+        Data lines are written by getconfigs.sqf as N=""a,b,c"", with quotes
+        only ever doubled around the whole row, so once the index and outer
+        quotes are cut off most rows split on plain commas. Rows with quotes
+        left inside fall back to the csv module. A new group starts at every
+        section or header line; the last group carries the state to continue
+        with in the next block.
+        """
+        rows = []
+        groups = [(category, headers, rows)]
+        append = rows.append
+
+        for line in lines:
+            line = line.strip()
+            if not line or line[0] == ';':
+                continue
+
+            if line[0] == '[' or line.startswith('header='):
+                if line.startswith('[CategoryData_'):
+                    category = line[14:-1]
+                elif line[0] == 'h':
+                    headers = self._parse_header(line)
+                else:
+                    category = None  # Rows of other sections are not classes
+                rows = []
+                groups.append((category, headers, rows))
+                append = rows.append
+                continue
+
+            if not category:
+                continue
+
+            index, sep, data = line.partition('=')
+            if not sep:
+                continue
+            data = data.strip().strip('"')
+            if '"' not in data:
+                append(data.split(','))
+                continue
+
+            try:
+                append(next(csv.reader([data])))
+            except Exception as e:
+                logger.debug(f"Skipping malformed line: {line} - {e}")
+                if stats:
+                    stats.malformed_lines += 1
+
+        return groups
+
+    def _parse_header(self, line: str) -> List[str]:
+        """Parse a header= line into field names"""
+        header_line = line.strip()[7:].strip('"')
+        return [f.strip() for f in next(csv.reader([header_line]))]
+
+    def _iter_classes_parallel(self, path: Path, workers: Optional[int] = None,
+                               shard_size: int = SHARD_SIZE,
+                               stats: Optional[IniStats] = None) -> Generator[ClassDef, None, None]:
+        """
+        Decode an INIDBI file in a process pool.
+
+        Sections are located by byte offset and split into shards of roughly
+        shard_size bytes at line boundaries, so a single large category such as
+        CfgVehicles is still spread across workers. Workers return decoded
+        field rows, which are far cheaper to pickle than ClassDef objects; the
+        classes are built here and yielded in file order, matching iter_classes.
+        """
+        shards = self.find_shards(path, shard_size)
+        if len(shards) <= 1:
+            yield from self.iter_classes(path, stats=stats)
+            return
+
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Bound the shards in flight so decoded rows never pile up in memory
+            window = 2 * workers
+            pending = deque()
+            for shard in shards:
+                pending.append(executor.submit(_decode_shard, *shard))
+                if len(pending) >= window:
+                    yield from self._collect_shard(pending.popleft(), stats)
+            while pending:
+                yield from self._collect_shard(pending.popleft(), stats)
+
+    def _collect_shard(self, future, stats: Optional[IniStats]) -> Generator[ClassDef, None, None]:
+        """Build class definitions from a finished shard"""
+        blocks, malformed = future.result()
+        if stats:
+            stats.malformed_lines += malformed
+        return self._create_classes(blocks, stats)
+
+    def _create_classes(self, blocks: Iterable[RowBlock],
+                        stats: Optional[IniStats] = None) -> Generator[ClassDef, None, None]:
+        """Build class definitions from decoded row blocks"""
+        create_class = self._create_class
+        for category, headers, rows in blocks:
+            # Resolve the header layout once per block rather than per row
+            category = intern(category)
+            layout = self._get_header_layout(headers)
+            for fields in rows:
+                if class_def := create_class(fields, category, layout):
+                    if stats:
+                        stats.record(class_def)
+                    yield class_def
+                elif stats:
+                    stats.malformed_lines += 1
+
+    def find_shards(self, path: Path, shard_size: int = SHARD_SIZE) -> List[Tuple[str, int, int, Optional[str], List[str]]]:
+        """
+        Split an INIDBI file into independently decodable byte ranges.
+
+        Returns (path, start, end, category, headers) tuples. Each range starts
+        on a line boundary inside a [CategoryData_*] section, after the
+        section's header line, and carries the section state needed to decode
+        it without seeing the rest of the file.
+        """
+        if path.stat().st_size == 0:
+            return []
+
+        shards = []
+        headers = self._default_headers
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            sections = self._find_sections(mm)
+            for i, (name, body_start, _) in enumerate(sections):
+                section_end = sections[i + 1][2] if i + 1 < len(sections) else len(mm)
+                if not name.startswith('CategoryData_'):
+                    continue
+                category = name[len('CategoryData_'):]
+
+                # Header lines come first in each section; data starts after them
+                pos = body_start
+                while pos < section_end:
+                    line_end = mm.find(b'\n', pos, section_end)
+                    line_end = section_end if line_end == -1 else line_end + 1
+                    line = mm[pos:line_end].decode('utf-8', errors='ignore').strip()
+                    if line.startswith('header='):
+                        headers = self._parse_header(line)
+                    elif line and not line.startswith(';'):
+                        break
+                    pos = line_end
+
+                # Cut the section body into shards at line boundaries
+                while pos < section_end:
+                    end = min(pos + shard_size, section_end)
+                    if end < section_end:
+                        newline = mm.find(b'\n', end, section_end)
+                        end = section_end if newline == -1 else newline + 1
+                    shards.append((str(path), pos, end, category, headers))
+                    pos = end
+
+        return shards
+
+    def _find_sections(self, mm: mmap.mmap) -> List[Tuple[str, int, int]]:
+        """Find [section] lines as (name, body start offset, line start offset)"""
+        sections = []
+        pos = mm.find(b'[')
+        while pos != -1:
+            line_start = mm.rfind(b'\n', 0, pos) + 1
+            line_end = mm.find(b'\n', pos)
+            line_end = len(mm) if line_end == -1 else line_end + 1
+            line = mm[line_start:line_end].strip()
+            # Only bracketed lines count, not '[' inside a data value
+            if line.startswith(b'[') and line.endswith(b']'):
+                name = line[1:-1].decode('utf-8', errors='ignore')
+                sections.append((name, line_end, line_start))
+            pos = mm.find(b'[', line_end)
+        return sections
+
+    def _create_class(self, fields: List[str], category: str,
+                      layout: Tuple[Dict[str, int], int, Tuple[int, ...]]) -> Optional[ClassDef]:
+        """
+        Build a class from one decoded row, given its header layout from
+        _get_header_layout.
+
+        Field values are stored once as a tuple behind a RowProperties view
+        shared by ClassDef.properties and InidbiClass.properties. Everything
+        but the class name repeats heavily across rows and is interned.
+        """
         try:
             # Ensure we have minimum required fields
             if len(fields) < 3:  # Need at least classname, source, category
                 return None
-                
-            # Map fields to headers, handling any missing fields
-            data = {}
-            for i, header in enumerate(headers):
-                if i < len(fields):
-                    data[header] = fields[i].strip()
-                else:
-                    data[header] = ""
+
+            index, width, (name_pos, source_pos, parent_pos, inherits_pos, simple_pos,
+                    num_props_pos, scope_pos, model_pos, display_pos) = layout
+
+            # Map fields to headers, handling any missing fields. The trailing
+            # "" is never exposed by the view but lets absent columns (-1) read
+            # as empty without a branch per column.
+            values = list(map(intern, map(str.strip, fields[:width])))
+            values.extend([""] * (width - len(values) + 1))
+            if name_pos >= 0:
+                values[name_pos] = fields[name_pos].strip() if name_pos < len(fields) else ""
+            data = RowProperties(index, tuple(values))
             
-            name = data.get("ClassName", "").strip()
+            name = values[name_pos]
             if not name:  # Skip if no class name
                 return None
                 
-            source = data.get("Source", "unknown").strip()
-            parent = data.get("Parent", "").strip() or None
+            source = values[source_pos] if source_pos >= 0 else "unknown"
+            parent = values[parent_pos] or None
             
             # Handle empty or invalid fields gracefully
             try:
-                num_properties = int(data.get("NumProperties", 0))
+                num_properties = int(values[num_props_pos] or 0)
             except ValueError:
                 num_properties = 0
 
             try:
-                scope = int(data.get("Scope", 0))
+                scope = int(values[scope_pos] or 0)
             except ValueError:
                 scope = 0
 
@@ -116,12 +324,12 @@ class InidbiParser(BaseParser):
                 category=category,
                 source_mod=source,
                 properties=data,  # Store all fields in properties
-                inherits_from=data.get("InheritsFrom", "").strip() or None,
-                is_simple_object=data.get("IsSimpleObject", "false").lower() == "true",
+                inherits_from=values[inherits_pos] or None,
+                is_simple_object=values[simple_pos].lower() == "true",
                 num_properties=num_properties,
                 scope=scope,
-                model=data.get("Model", "").strip(),
-                display_name=data.get("DisplayName", "").strip()
+                model=values[model_pos],
+                display_name=values[display_pos]
             )
             
             return ClassDef(
@@ -129,13 +337,27 @@ class InidbiParser(BaseParser):
                 parent=parent,
                 source=source,
                 properties=data,  # Include all fields in properties
-                inidbi_meta=meta
+                inidbi_meta=meta,
+                nested_classes=_NO_NESTED  # INI rows never carry nested classes
             )
             
         except Exception as e:
             logger.debug(f"Error creating class from fields: {fields} - {e}")
             return None
 
+    def _get_header_layout(self, headers: List[str]) -> Tuple[Dict[str, int], int, Tuple[int, ...]]:
+        """
+        Get the shared header -> position index for a header row, the number
+        of columns, and the positions of the columns _create_class reads
+        (-1 when absent).
+        """
+        key = tuple(headers)
+        if (layout := self._header_layouts.get(key)) is None:
+            index = {intern(header): i for i, header in enumerate(headers)}
+            positions = tuple(index.get(column, -1) for column in _LAYOUT_COLUMNS)
+            layout = self._header_layouts[key] = (index, len(headers), positions)
+        return layout
+
     def get_class(self, class_name: str) -> Optional[ClassDef]:
         """Get class definition by exact name"""
         return self._class_lookup.get(class_name)
@@ -147,3 +369,18 @@ class InidbiParser(BaseParser):
             cls for cls in self._class_lookup.values()
             if pattern.match(cls.name)
         }
+
+
+def _decode_shard(path: str, start: int, end: int, category: str,
+                  headers: List[str]) -> Tuple[List[RowBlock], int]:
+    """
+    Decode one byte range of an INIDBI file into row blocks; runs in a worker
+    process. Returns the blocks and the number of malformed lines skipped.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    lines = data.decode('utf-8', errors='ignore').splitlines()
+    stats = IniStats()
+    blocks = list(InidbiParser()._decode_blocks([lines], category, headers, stats))
+    return blocks, stats.malformed_lines
@@ -45,7 +45,6 @@ class MissionParser(BaseParser):
             'silencer', 'bipod', 'backpackItems'
         }
         self._list_macro_pattern = re.compile(r'LIST_(\d+)\s*\(\s*(["\']?)([^"\'\)]*)\2\s*\)')
-        self._processed_classes = set()
         # Add dictionary to store defines
         self._defines: Dict[str, str] = {}
 
@@ -57,6 +56,8 @@ class MissionParser(BaseParser):
         """Parse mission file and extract only external class references"""
         try:
             content = path.read_text(encoding='utf-8')
+            # Results depend on this file alone, so they can be cached per file
+            self._mission_local_classes.clear()
             # First process any #define directives
             self._process_defines(content, path)
             source = path.stem
@@ -88,7 +89,7 @@ class MissionParser(BaseParser):
 
     def _parse_mission_content(self, content: str, source: str) -> Set[ClassDef]:
         """Parse content extracting only external class references"""
-        referenced_classes = set()
+        references: Dict[str, ClassDef] = {}
         current_class_properties = {}
         
         for match in self._class_pattern.finditer(content):
@@ -104,9 +105,9 @@ class MissionParser(BaseParser):
                 # Parse array properties properly
                 properties = self._extract_properties(clean_body)
                 # Process array properties and extract equipment
-                self._extract_equipment_references(properties, referenced_classes, source)
+                self._extract_equipment_references(properties, references, source)
                 
-        return referenced_classes
+        return set(references.values())
 
     def _clean_class_body(self, body: str) -> str:
         """Clean class body by removing comments and normalizing whitespace"""
@@ -135,8 +136,8 @@ class MissionParser(BaseParser):
         return properties
 
     def _extract_equipment_references(self, properties: Dict[str, str], 
-                                   classes: Set[ClassDef], source: str):
-        """Extract equipment references with improved comma handling"""
+                                   references: Dict[str, ClassDef], source: str):
+        """Extract equipment references by name with improved comma handling"""
         for key, value in properties.items():
             key = key.strip('[]')
             if key not in self._equipment_arrays:
@@ -181,18 +182,19 @@ class MissionParser(BaseParser):
                         continue
                         
                     if content and not self._is_local_class(content):
-                        # Simplified class reference creation
-                        ref_class = ClassDef(
-                            name=content,
-                            is_reference=True,
-                            properties={"list_count": str(count)} if count > 1 else {}
-                        )
-                        classes.add(ref_class)
+                        self._add_reference(references, content, key,
+                                            {"list_count": str(count)} if count > 1 else {})
                 # Handle regular items        
                 elif item and not item.isdigit() and not self._is_local_class(item):
-                    # Simplified class reference creation - only needs name
-                    ref_class = ClassDef(
-                        name=item,
-                        is_reference=True
-                    )
-                    classes.add(ref_class)
+                    self._add_reference(references, item, key, {})
+
+    def _add_reference(self, references: Dict[str, ClassDef], name: str, array: str,
+                       properties: Dict[str, str]):
+        """Add an equipment reference, or record another array an existing one appears in"""
+        ref_class = references.get(name)
+        if ref_class is None:
+            # Simplified class reference creation - only needs name
+            properties["equipment_arrays"] = array
+            references[name] = ClassDef(name=name, is_reference=True, properties=properties)
+        elif array not in ref_class.equipment_arrays:
+            ref_class.properties["equipment_arrays"] += f",{array}"
@@ -1,19 +1,25 @@
 from pathlib import Path
-from typing import Set, Dict, Optional, Generator, List, Pattern
+from typing import Set, Dict, Optional, Generator, List, Pattern, Tuple
 from datetime import datetime
 import hashlib
 import logging
+import os
 import subprocess
 import tempfile
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import partial
 import re
+from collections import defaultdict
+from .fingerprint import TreeFingerprint, fingerprint_tree
 from .models import Asset, ClassDef, ScanResult
 from .cache import CacheManager  # Add this import
 
 logger = logging.getLogger(__name__)
 
+# Files a scan reads; nothing else can change its result
+SCAN_SUFFIXES = {'.pbo', '.paa', '.p3d', '.sqf'}
+
 class AssetScanner:
     """
     Asset scanner for mission content.
@@ -23,27 +29,82 @@ class AssetScanner:
     - Direct asset files
     - Referenced content
     """
-    def __init__(self, cache_dir: Path):
+    def __init__(self, cache_dir: Path, cache_mgr: Optional[CacheManager] = None):
         self.cache_dir = cache_dir
-        self.cache_mgr = CacheManager(cache_dir)  # Initialize cache manager
+        self.cache_mgr = cache_mgr or CacheManager(cache_dir)  # Shared with the caller when given
         self._asset_cache = {}
     
     def scan_directory(self, path: Path, patterns: Optional[List[Pattern]] = None, max_files: Optional[int] = None) -> Set[Asset]:
-        """Scan directory for assets with strict file limit enforcement"""
-        if cached := self.cache_mgr.get_cached_scan(path.as_posix()):
-            if max_files is None or len(cached) <= max_files:
-                return cached
-            return set(list(cached)[:max_files])
+        """
+        Scan directory for assets with strict file limit enforcement.
 
+        Full scans are cached together with a fingerprint of the tree, per
+        directory: an unchanged tree is answered from the cache without
+        reading a file, and a changed one only rescans the directories whose
+        files changed. Scans limited by max_files, or that could not list
+        every directory, are not cached.
+        """
         patterns = patterns or [re.compile(".*")]
-        all_assets = set()
+        if max_files:
+            pbo_files, regular_files, _ = self._collect_files(path, patterns, max_files=max_files)
+            assets = set().union(*self._scan_files(path, pbo_files, regular_files, max_files=max_files).values())
+            return set(list(assets)[:max_files])  # Final size enforcement
+
+        cache_key = self._get_cache_key(path, patterns)
+        fingerprint = fingerprint_tree(path, SCAN_SUFFIXES)
+        cached, previous = self.cache_mgr.get_scan_entry(cache_key, fingerprint.root)
+        if cached is not None:
+            return set().union(*cached["dirs"].values())
 
-        # First collect all candidate files
+        # Keep what is still valid from the last scan of this tree
+        by_dir = {}
+        changed = set(fingerprint.dirs)
+        if previous:
+            changed = fingerprint.changed_dirs(TreeFingerprint.from_dict(previous["fingerprint"]))
+            by_dir = {d: assets for d, assets in previous["dirs"].items()
+                      if d in fingerprint.dirs and d not in changed}
+            logger.debug(f"Rescanning {len(changed)} of {len(fingerprint.dirs)} directories in {path}")
+
+        pbo_files, regular_files, complete = self._collect_files(path, patterns, dirs=changed)
+        by_dir.update(self._scan_files(path, pbo_files, regular_files))
+        if not complete:
+            logger.warning(f"Not caching the incomplete scan of {path}")
+            return set().union(*by_dir.values())
+
+        # Cache results
+        try:
+            self.cache_mgr.cache_scan(cache_key, {"fingerprint": fingerprint.to_dict(), "dirs": by_dir},
+                                      fingerprint.root)
+            self.cache_mgr.flush()
+        except Exception as e:
+            logger.error(f"Cache write error: {e}")
+
+        return set().union(*by_dir.values())
+
+    def _collect_files(self, path: Path, patterns: List[Pattern], dirs: Optional[Set[str]] = None,
+                       max_files: Optional[int] = None) -> Tuple[List[Path], List[Path], bool]:
+        """
+        Collect the PBOs and regular asset files under path, or directly in the given relative dirs.
+
+        A directory that cannot be listed (e.g. one removed during the scan)
+        is skipped on its own; the returned flag is False if any was.
+        """
         pbo_files = []
         regular_files = []
+        complete = True
+
+        def skip_dir(error: OSError) -> None:
+            nonlocal complete
+            complete = False
+            logger.warning(f"Skipping unreadable directory: {error}")
+
+        if dirs is None:
+            candidates = (Path(root) / name for root, _, names in os.walk(path, onerror=skip_dir) for name in names)
+        else:
+            candidates = (f for rel_dir in sorted(dirs) for f in self._list_dir(path / rel_dir, skip_dir))
 
         try:
-            for f in path.rglob("*"):
+            for f in candidates:
                 if f.is_file():
                     rel_path = str(f.relative_to(path))
                     if not any(p.match(rel_path) for p in patterns):
@@ -60,7 +121,24 @@ class AssetScanner:
 
         except Exception as e:
             logger.error(f"Error collecting files: {e}")
-            return set()
+            complete = False
+
+        return pbo_files, regular_files, complete
+
+    @staticmethod
+    def _list_dir(directory: Path, on_error) -> List[Path]:
+        """List a directory, reporting an OSError to on_error instead of raising it"""
+        try:
+            return list(directory.iterdir())
+        except OSError as e:
+            on_error(e)
+            return []
+
+    def _scan_files(self, path: Path, pbo_files: List[Path], regular_files: List[Path],
+                    max_files: Optional[int] = None) -> Dict[str, Set[Asset]]:
+        """Scan collected files, grouping the assets by the relative directory of the file they came from"""
+        by_dir = defaultdict(set)
+        found = 0
 
         # Process PBOs first
         if pbo_files:
@@ -68,33 +146,28 @@ class AssetScanner:
             processed_pbos = pbo_files[:pbo_limit]
             
             with ThreadPoolExecutor(max_workers=4) as executor:
-                pbo_futures = [executor.submit(self._scan_pbo, pbo) for pbo in processed_pbos]
+                pbo_futures = {executor.submit(self._scan_pbo, pbo): pbo for pbo in processed_pbos}
                 for future in as_completed(pbo_futures):
                     try:
-                        all_assets.update(future.result())
+                        assets = future.result()
+                        by_dir[self._rel_dir(path, pbo_futures[future])].update(assets)
+                        found += len(assets)
                     except Exception as e:
                         logger.error(f"PBO scanning error: {e}")
 
         # Process regular files if we haven't hit the limit
-        if not max_files or len(all_assets) < max_files:
-            remaining = max_files - len(all_assets) if max_files else None
-            file_subset = regular_files[:remaining] if remaining else regular_files
-            try:
-                all_assets.update(self._scan_regular_files(path, patterns, file_subset))
-            except Exception as e:
-                logger.error(f"Regular file scanning error: {e}")
-
-        # Final size enforcement
-        if max_files and len(all_assets) > max_files:
-            all_assets = set(list(all_assets)[:max_files])
+        if not max_files or found < max_files:
+            remaining = max_files - found if max_files else None
+            for file_path in (regular_files[:remaining] if remaining else regular_files):
+                if asset := self._scan_regular_file(path, file_path):
+                    by_dir[self._rel_dir(path, file_path)].add(asset)
 
-        # Cache results
-        try:
-            self.cache_mgr.cache_scan(str(path), all_assets)
-        except Exception as e:
-            logger.error(f"Cache write error: {e}")
+        return dict(by_dir)
 
-        return all_assets
+    @staticmethod
+    def _rel_dir(path: Path, file_path: Path) -> str:
+        """Directory of file_path relative to path, as fingerprints name it"""
+        return file_path.relative_to(path).as_posix().rpartition("/")[0]
 
     def _normalize_asset_path(self, path: str) -> str:
         """
@@ -189,60 +262,30 @@ class AssetScanner:
             
         return set()
 
-    def _scan_regular_files(self, path: Path, patterns: List[Pattern], max_files: Optional[int] = None) -> Set[Asset]:
-        """Scan regular files matching patterns with optional limit"""
-        assets = set()
-        files_processed = 0
-        
+    def _scan_regular_file(self, path: Path, file_path: Path) -> Optional[Asset]:
+        """Scan one regular asset file found under path"""
         try:
-            for file_path in path.rglob('*'):
-                if file_path.suffix.lower() in {'.paa', '.p3d', '.sqf'}:
-                    try:
-                        rel_path = str(file_path.relative_to(path))
-                        if not any(p.match(rel_path) for p in patterns):
-                            continue
-                            
-                        # Special simplified handling for SQF files
-                        if file_path.suffix.lower() == '.sqf':
-                            # For SQF files, just record that we found them without parsing
-                            # This avoids the comparison issues
-                            asset = Asset(
-                                path=file_path.relative_to(path),
-                                checksum="sqf_present",  # Simple presence marker
-                                source=path.name,
-                                last_scan=datetime.now()
-                            )
-                            assets.add(asset)
-                            files_processed += 1
-                            continue
+            # Special simplified handling for SQF files
+            if file_path.suffix.lower() == '.sqf':
+                # For SQF files, just record that we found them without parsing
+                # This avoids the comparison issues
+                return Asset(
+                    path=file_path.relative_to(path),
+                    checksum="sqf_present",  # Simple presence marker
+                    source=path.name,
+                    last_scan=datetime.now()
+                )
 
-                        # Normal handling for other file types
-                        try:
-                            checksum = self._get_file_hash(file_path)
-                            asset = Asset(
-                                path=file_path.relative_to(path),
-                                checksum=checksum,
-                                source=path.name,
-                                last_scan=datetime.now()
-                            )
-                            assets.add(asset)
-                            files_processed += 1
-                        except Exception as e:
-                            logger.error(f"Error scanning file {file_path}: {e}")
-                            continue
-                            
-                        if max_files and files_processed >= max_files:
-                            logger.info(f"Reached file limit of {max_files}")
-                            break
-                            
-                    except Exception as e:
-                        logger.debug(f"Error processing file {file_path}: {e}")
-                        continue
-                        
+            # Normal handling for other file types
+            return Asset(
+                path=file_path.relative_to(path),
+                checksum=self._get_file_hash(file_path),
+                source=path.name,
+                last_scan=datetime.now()
+            )
         except Exception as e:
-            logger.error(f"Error scanning directory: {e}")
-            
-        return assets
+            logger.error(f"Error scanning file {file_path}: {e}")
+            return None
 
     def _get_file_hash(self, path: Path) -> str:
         """Generate MD5 hash of file"""
@@ -252,6 +295,6 @@ class AssetScanner:
                 hasher.update(chunk)
         return hasher.hexdigest()
         
-    def _get_cache_key(self, path: Path) -> str:
-        """Generate cache key for directory"""
-        return f"scan_{path.name}_{path.stat().st_mtime}"
+    def _get_cache_key(self, path: Path, patterns: List[Pattern]) -> str:
+        """Generate cache key for a directory scanned with the given patterns"""
+        return "|".join([path.as_posix()] + [p.pattern for p in patterns])
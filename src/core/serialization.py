@@ -0,0 +1,306 @@
+from dataclasses import fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from collections.abc import Mapping
+import hashlib
+import math
+import struct
+import zlib
+from .models import Asset, ClassDef, InidbiClass, InidbiProperty
+
+# Compact, versioned encoding for cache blobs.
+#
+# A blob is a header, a string table, a table of fixed-width Asset records
+# and a tagged value stream that refers to both by index:
+#
+#     header   magic, format version, flags, schema hash, body length
+#     strings  count, end offsets, UTF-8 bytes
+#     assets   count, (path, checksum, source, last_scan) records
+#     values   one tagged value: None/bool/int/float/str/Path/datetime,
+#              list/tuple/set/frozenset/dict, Asset, or a model record;
+#              ClassDefs with only string properties get a fixed-width
+#              record of their own
+#
+# Every string is stored once however often it is used. Decoding reads
+# straight from the buffer and only turns the strings and assets a value
+# actually refers to into objects. Nothing but the types above can be
+# encoded or decoded, so reading a blob never runs code from it.
+
+MAGIC = b"AMCB"
+FORMAT_VERSION = 1
+FLAG_COMPRESSED = 1
+
+_HEADER = struct.Struct("<4sBB8sI")  # Magic, version, flags, schema hash, body length
+_COUNTS = struct.Struct("<II")  # Strings, assets
+_ASSET = struct.Struct("<IIId")  # Path, checksum and source string indexes, last scan timestamp
+# Name, parent, source, scope, flags, property count; then key/value string pairs
+_CLASS = struct.Struct("<IIIIBI")
+_NO_STRING = 0xFFFFFFFF
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+# Dataclasses stored field by field, by position in this tuple
+_RECORD_TYPES = (ClassDef, InidbiClass, InidbiProperty)
+_RECORD_FIELDS = tuple(tuple(f.name for f in fields(cls)) for cls in _RECORD_TYPES)
+_RECORD_IDS = {cls: i for i, cls in enumerate(_RECORD_TYPES)}
+
+# Changes whenever a record type gains, loses or reorders a field, so blobs
+# written against other models are rejected instead of misread
+SCHEMA_HASH = hashlib.blake2b(
+    repr([(cls.__name__, names) for cls, names in zip(_RECORD_TYPES, _RECORD_FIELDS)]).encode(),
+    digest_size=8).digest()
+
+(_NONE, _TRUE, _FALSE, _INT, _FLOAT, _STR, _LIST, _TUPLE, _SET, _FROZENSET,
+ _DICT, _PATH, _DATETIME, _ASSET_REF, _RECORD, _CLASS_RECORD) = range(16)
+
+_CONTAINERS = {list: _LIST, tuple: _TUPLE, set: _SET, frozenset: _FROZENSET}
+
+class CacheFormatError(Exception):
+    """Raised when a cache blob is corrupt, foreign or of another format version"""
+
+class _Encoder:
+    def __init__(self):
+        self.strings = {}
+        self.assets = {}
+        self.out = bytearray()
+
+    def string(self, value: str) -> bytes:
+        index = self.strings.setdefault(value, len(self.strings))
+        return _U32.pack(index)
+
+    def index(self, value: Optional[str]) -> int:
+        return _NO_STRING if value is None else self.strings.setdefault(value, len(self.strings))
+
+    @staticmethod
+    def plain_class(value: ClassDef) -> bool:
+        return (value.inidbi_meta is None and not value.nested_classes and
+                type(value.name) is str and type(value.source) is str and type(value.scope) is str and
+                (value.parent is None or type(value.parent) is str) and
+                all(type(k) is str and type(v) is str for k, v in value.properties.items()))
+
+    def value(self, value: Any) -> None:
+        out = self.out
+        if value is None:
+            out.append(_NONE)
+        elif value is True or value is False:
+            out.append(_TRUE if value else _FALSE)
+        elif isinstance(value, int):
+            out.append(_INT)
+            out += _I64.pack(value)
+        elif isinstance(value, float):
+            out.append(_FLOAT)
+            out += _F64.pack(value)
+        elif isinstance(value, str):
+            out.append(_STR)
+            out += self.string(value)
+        elif isinstance(value, Path):
+            out.append(_PATH)
+            out += self.string(str(value))
+        elif isinstance(value, datetime):
+            out.append(_DATETIME)
+            out += _F64.pack(value.timestamp())
+        elif isinstance(value, Asset):
+            out.append(_ASSET_REF)
+            out += _U32.pack(self.assets.setdefault(value, len(self.assets)))
+        elif type(value) is ClassDef and self.plain_class(value):
+            # Plain config classes, the bulk of parse results, as one fixed-width record
+            out.append(_CLASS_RECORD)
+            out += _CLASS.pack(self.index(value.name), self.index(value.parent), self.index(value.source),
+                               self.index(value.scope), value.is_reference | value.is_mission_local << 1,
+                               len(value.properties))
+            for key, item in value.properties.items():
+                out += self.string(key)
+                out += self.string(item)
+        elif type(value) in _RECORD_IDS:
+            record_id = _RECORD_IDS[type(value)]
+            out += bytes((_RECORD, record_id))
+            for name in _RECORD_FIELDS[record_id]:
+                self.value(getattr(value, name))
+        elif isinstance(value, Mapping):
+            out.append(_DICT)
+            out += _U32.pack(len(value))
+            for key, item in value.items():
+                self.value(key)
+                self.value(item)
+        elif type(value) in _CONTAINERS:
+            out.append(_CONTAINERS[type(value)])
+            out += _U32.pack(len(value))
+            for item in value:
+                self.value(item)
+        else:
+            raise TypeError(f"Cannot encode {type(value).__name__} in a cache blob")
+
+    def asset_records(self) -> bytes:
+        records = bytearray()
+        for asset in self.assets:
+            records += self.string(str(asset.path))
+            records += self.string(asset.checksum)
+            records += self.string(asset.source)
+            records += _F64.pack(asset.last_scan.timestamp() if asset.last_scan else math.nan)
+        return bytes(records)
+
+def encode(value: Any, compress_above: Optional[int] = None) -> bytes:
+    """
+    Encode value as a cache blob.
+
+    Bodies longer than compress_above bytes are zlib-compressed when that
+    makes them smaller.
+    """
+    encoder = _Encoder()
+    encoder.value(value)
+    assets = encoder.asset_records()  # Adds the asset strings to the table
+
+    encoded = [s.encode("utf-8") for s in encoder.strings]
+    offsets = []
+    end = 0
+    for data in encoded:
+        end += len(data)
+        offsets.append(end)
+
+    body = b"".join([
+        _COUNTS.pack(len(encoded), len(encoder.assets)),
+        struct.pack(f"<{len(offsets)}I", *offsets),
+        *encoded,
+        assets,
+        encoder.out,
+    ])
+    flags = 0
+    length = len(body)
+    if compress_above is not None and length > compress_above:
+        compressed = zlib.compress(body)
+        if len(compressed) < length:
+            body, flags = compressed, FLAG_COMPRESSED
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, flags, SCHEMA_HASH, length) + body
+
+class _Decoder:
+    def __init__(self, body: memoryview):
+        string_count, asset_count = _COUNTS.unpack_from(body, 0)
+        pos = _COUNTS.size
+        self.offsets = struct.unpack_from(f"<{string_count}I", body, pos)
+        pos += 4 * string_count
+        self.text_start = pos
+        pos += self.offsets[-1] if string_count else 0
+        self.asset_start = pos
+        pos += _ASSET.size * asset_count
+        if pos > len(body):
+            raise CacheFormatError("Cache blob is truncated")
+        self.body = body
+        self.pos = pos
+        self._text: Optional[str] = None
+        self._strings: List[Optional[str]] = [None] * string_count
+        self._assets: List[Optional[Asset]] = [None] * asset_count
+        self._times: Dict[float, datetime] = {}
+
+    def string(self, index: int) -> str:
+        value = self._strings[index]
+        if value is None:
+            start = self.text_start + (self.offsets[index - 1] if index else 0)
+            end = self.text_start + self.offsets[index]
+            if self._text is None:
+                # Pure ASCII text can be decoded once and sliced by byte offset
+                text = self.body[self.text_start:self.asset_start]
+                self._text = str(text, "ascii") if bytes(text).isascii() else ""
+            if self._text:
+                value = self._text[start - self.text_start:end - self.text_start]
+            else:
+                value = str(self.body[start:end], "utf-8")
+            self._strings[index] = value
+        return value
+
+    def asset(self, index: int) -> Asset:
+        asset = self._assets[index]
+        if asset is None:
+            path, checksum, source, last_scan = _ASSET.unpack_from(self.body, self.asset_start + _ASSET.size * index)
+            if (scanned := self._times.get(last_scan)) is None and not math.isnan(last_scan):
+                scanned = self._times[last_scan] = datetime.fromtimestamp(last_scan)
+            # Filled in like pickle does, skipping the frozen dataclass __init__
+            asset = object.__new__(Asset)
+            asset.__dict__.update(path=Path(self.string(path)), checksum=self.string(checksum),
+                                  source=self.string(source), last_scan=scanned)
+            self._assets[index] = asset
+        return asset
+
+    def u32(self) -> int:
+        value, = _U32.unpack_from(self.body, self.pos)
+        self.pos += 4
+        return value
+
+    def value(self) -> Any:
+        # Most frequent tags first: this runs once per stored value
+        body = self.body
+        pos = self.pos
+        tag = body[pos]
+        if tag == _STR:
+            self.pos = pos + 5
+            return self.string(_U32.unpack_from(body, pos + 1)[0])
+        self.pos = pos + 1
+        if tag == _CLASS_RECORD:
+            name, parent, source, scope, flags, count = _CLASS.unpack_from(body, pos + 1)
+            pos += 1 + _CLASS.size
+            string = self.string
+            properties = {}
+            if count:
+                pairs = struct.unpack_from(f"<{2 * count}I", body, pos)
+                pos += 8 * count
+                for i in range(0, 2 * count, 2):
+                    properties[string(pairs[i])] = string(pairs[i + 1])
+            self.pos = pos
+            return ClassDef(string(name), None if parent == _NO_STRING else string(parent), string(source),
+                            properties, string(scope), bool(flags & 1), bool(flags & 2))
+        if tag == _NONE:
+            return None
+        if tag == _TRUE or tag == _FALSE:
+            return tag == _TRUE
+        if tag == _ASSET_REF:
+            return self.asset(self.u32())
+        if tag == _RECORD:
+            record_id = body[pos + 1]
+            self.pos = pos + 2
+            if record_id >= len(_RECORD_TYPES):
+                raise CacheFormatError(f"Unknown record type {record_id} in cache blob")
+            value = self.value
+            return _RECORD_TYPES[record_id](*[value() for _ in _RECORD_FIELDS[record_id]])
+        if tag == _DICT:
+            value = self.value
+            return {value(): value() for _ in range(self.u32())}
+        if tag in (_LIST, _TUPLE, _SET, _FROZENSET):
+            value = self.value
+            items = [value() for _ in range(self.u32())]
+            return items if tag == _LIST else (tuple, set, frozenset)[tag - _TUPLE](items)
+        if tag == _PATH:
+            return Path(self.string(self.u32()))
+        if tag == _INT or tag == _FLOAT or tag == _DATETIME:
+            value, = (_I64 if tag == _INT else _F64).unpack_from(body, pos + 1)
+            self.pos = pos + 9
+            return datetime.fromtimestamp(value) if tag == _DATETIME else value
+        raise CacheFormatError(f"Unknown value tag {tag} in cache blob")
+
+def decode(data: bytes) -> Any:
+    """Decode a blob written by encode(), raising CacheFormatError for anything else"""
+    if len(data) < _HEADER.size:
+        raise CacheFormatError("Cache blob is truncated")
+    magic, version, flags, schema, length = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise CacheFormatError("Not a cache blob")
+    if version != FORMAT_VERSION:
+        raise CacheFormatError(f"Cache blob format {version}, expected {FORMAT_VERSION}")
+    if schema != SCHEMA_HASH:
+        raise CacheFormatError("Cache blob was written for other model definitions")
+
+    body = memoryview(data)[_HEADER.size:]
+    try:
+        if flags & FLAG_COMPRESSED:
+            body = memoryview(zlib.decompress(body))
+        if len(body) != length:
+            raise CacheFormatError(f"Cache blob body is {len(body)} bytes, expected {length}")
+        decoder = _Decoder(body)
+        value = decoder.value()
+    except CacheFormatError:
+        raise
+    except (struct.error, IndexError, TypeError, ValueError, zlib.error) as e:
+        raise CacheFormatError(f"Corrupt cache blob: {e}") from e
+    if decoder.pos != length:
+        raise CacheFormatError("Cache blob has trailing data")
+    return value
@@ -0,0 +1,219 @@
+from pathlib import Path
+from typing import List, Optional
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import time
+from .database import ClassDatabase, SCHEMA_VERSION, BLOOM_ERROR_RATE
+from .models import IniStats, ConfigDiff
+from .name_index import NameIndex, write_name_index
+from .parser_ini import InidbiParser
+
+logger = logging.getLogger(__name__)
+
+# Timestamp getconfigs.sqf appends to each export, e.g. ConfigExtract_2024-05-01_18-30-00.ini
+_EXPORT_TIMESTAMP = re.compile(r"_\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}$")
+# Temporary files this old were left by a crashed build; live builds keep writing theirs
+TMP_MAX_AGE = 3600
+
+class SnapshotManager:
+    """
+    Compiled on-disk snapshots of the class database.
+
+    A snapshot is built once per ConfigExtract file and named after a hash of
+    the file's content. Later runs open the matching snapshot read-only instead
+    of re-parsing the INI; snapshots for older content are removed on rebuild.
+    Timestamped exports of the same config in the same folder share one
+    snapshot family, and in
+    incremental mode a new export is applied to a copy of the previous
+    snapshot as a diff instead of being loaded from scratch. Each snapshot is
+    accompanied by a memory-mapped class name index for worker processes.
+    """
+
+    def __init__(self, snapshot_dir: Path, workers: Optional[int] = 1, incremental: bool = False,
+                 bloom_error_rate: Optional[float] = BLOOM_ERROR_RATE):
+        self.snapshot_dir = snapshot_dir
+        self.workers = workers  # INI decode processes used when building; None uses every core
+        self.incremental = incremental
+        # Class name filter stored in new snapshots and used by loaded ones; None disables it
+        self.bloom_error_rate = bloom_error_rate
+        self.last_diff: Optional[ConfigDiff] = None  # Diff applied by the last incremental load
+
+    def load(self, ini_path: Path, rebuild: bool = False) -> ClassDatabase:
+        """
+        Open the snapshot for ini_path, building it first if missing or stale.
+
+        In incremental mode a missing snapshot is derived from the previous
+        export's snapshot when one exists; the applied diff is kept in last_diff.
+        """
+        self.last_diff = None
+        content_hash = self.hash_file(ini_path)
+        snapshot_path = self.snapshot_path(ini_path, content_hash)
+
+        if not rebuild and snapshot_path.exists():
+            if database := self._open_snapshot(snapshot_path, content_hash):
+                logger.info(f"Using class database snapshot {snapshot_path.name}")
+                if not self.name_index_path(snapshot_path).exists():
+                    write_name_index(database, self.name_index_path(snapshot_path))
+                return database
+            logger.info(f"Snapshot {snapshot_path.name} is stale, rebuilding")
+
+        previous = self._find_previous(ini_path, snapshot_path) if self.incremental and not rebuild else None
+        if previous:
+            self.last_diff = self._update_snapshot(previous, ini_path, snapshot_path, content_hash)
+        else:
+            self._build_snapshot(ini_path, snapshot_path, content_hash)
+        self._remove_stale(ini_path, snapshot_path)
+        return self._open(snapshot_path)
+
+    def get_stats(self, database: ClassDatabase) -> Optional[IniStats]:
+        """Get the statistics recorded when a snapshot's INI was ingested"""
+        if data := database.get_meta("ini_stats"):
+            return IniStats.from_dict(json.loads(data))
+        return None
+
+    def snapshot_path(self, ini_path: Path, content_hash: str) -> Path:
+        """Get the snapshot file used for a given INI content hash"""
+        return self.snapshot_dir / f"{self.snapshot_family(ini_path)}_{content_hash[:16]}.db"
+
+    def name_index_path(self, snapshot_path: Path) -> Path:
+        """Get the class name index file exported alongside a snapshot"""
+        return snapshot_path.with_suffix(".idx")
+
+    def get_name_index(self, database: ClassDatabase) -> NameIndex:
+        """Open the memory-mapped name index of a snapshot loaded by this manager"""
+        return NameIndex(self.name_index_path(Path(database.db_path)))
+
+    def snapshot_family(self, ini_path: Path) -> str:
+        """Get the name shared by snapshots of every export of the same config"""
+        # Same-named exports from different folders are different configs
+        folder = hashlib.sha256(str(ini_path.resolve().parent).encode()).hexdigest()[:8]
+        return f"{_EXPORT_TIMESTAMP.sub('', ini_path.stem)}-{folder}"
+
+    def hash_file(self, path: Path, chunk_size: int = 1 << 20) -> str:
+        """Generate SHA-256 hash of file content"""
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def _open(self, snapshot_path: Path) -> ClassDatabase:
+        return ClassDatabase(snapshot_path, read_only=True, use_bloom=bool(self.bloom_error_rate))
+
+    def _open_snapshot(self, snapshot_path: Path, content_hash: str) -> Optional[ClassDatabase]:
+        """Open an existing snapshot, returning None if it does not match"""
+        database = None
+        try:
+            database = self._open(snapshot_path)
+            if (database.get_meta("ini_hash") == content_hash and
+                    database.get_meta("schema_version") == str(SCHEMA_VERSION) and
+                    database.get_meta("ini_stats") is not None):
+                return database
+        except sqlite3.Error as e:
+            logger.warning(f"Unreadable snapshot {snapshot_path}: {e}")
+
+        if database:
+            database.close()
+        return None
+
+    def _find_previous(self, ini_path: Path, current: Path) -> Optional[Path]:
+        """Find the newest usable snapshot of an earlier export of ini_path's config"""
+        candidates = sorted(self._family_snapshots(ini_path, current),
+                            key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in candidates:
+            database = None
+            try:
+                database = ClassDatabase(path, read_only=True)
+                if database.get_meta("schema_version") == str(SCHEMA_VERSION):
+                    return path
+            except sqlite3.Error as e:
+                logger.warning(f"Unreadable snapshot {path}: {e}")
+            finally:
+                if database:
+                    database.close()
+        return None
+
+    def _update_snapshot(self, previous: Path, ini_path: Path, snapshot_path: Path,
+                         content_hash: str) -> ConfigDiff:
+        """Build the snapshot for ini_path by applying its diff against a previous snapshot"""
+        start = time.perf_counter()
+        tmp_path = snapshot_path.with_name(f"{snapshot_path.stem}.{os.getpid()}.tmp")
+        shutil.copyfile(previous, tmp_path)
+
+        database = ClassDatabase(tmp_path)
+        try:
+            # Two streaming passes: one to diff, one to write just the changed classes
+            parser = InidbiParser()
+            stats = IniStats()
+            diff = database.diff_classes(parser.iter_classes(ini_path, self.workers, stats=stats))
+            database.apply_diff(parser.iter_classes(ini_path, self.workers), diff)
+            database.set_meta("previous_ini_path", database.get_meta("ini_path") or "")
+            database.set_meta("ini_hash", content_hash)
+            database.set_meta("ini_stats", json.dumps(stats.to_dict()))
+            database.set_meta("ini_path", str(ini_path))
+            database.finalize(analyze=False, bloom_error_rate=self.bloom_error_rate)
+            write_name_index(database, self.name_index_path(snapshot_path))
+        except Exception:
+            database.close()
+            tmp_path.unlink()
+            raise
+        database.close()
+
+        os.replace(tmp_path, snapshot_path)
+        logger.info(f"Updated class database snapshot {previous.name} -> {snapshot_path.name} "
+                    f"in {time.perf_counter() - start:.2f}s")
+        return diff
+
+    def _build_snapshot(self, ini_path: Path, snapshot_path: Path, content_hash: str) -> None:
+        """Parse ini_path into a fresh snapshot file, recording ingestion statistics"""
+        start = time.perf_counter()
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+        # Build under a temporary name so readers never see a half-written file
+        tmp_path = snapshot_path.with_name(f"{snapshot_path.stem}.{os.getpid()}.tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+        database = ClassDatabase(tmp_path)
+        try:
+            stats = IniStats()
+            database.add_classes(InidbiParser().iter_classes(ini_path, self.workers, stats=stats))
+            database.set_meta("ini_hash", content_hash)
+            database.set_meta("ini_stats", json.dumps(stats.to_dict()))
+            database.set_meta("ini_path", str(ini_path))
+            database.finalize(bloom_error_rate=self.bloom_error_rate)
+            write_name_index(database, self.name_index_path(snapshot_path))
+        finally:
+            database.close()
+
+        os.replace(tmp_path, snapshot_path)
+        logger.info(f"Built class database snapshot {snapshot_path.name} "
+                    f"in {time.perf_counter() - start:.2f}s")
+
+    def _remove_stale(self, ini_path: Path, current: Path) -> None:
+        """Delete snapshots built from older versions of ini_path, and abandoned temporary files"""
+        for path in self._family_snapshots(ini_path, current):
+            try:
+                path.unlink()
+                self.name_index_path(path).unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"Could not remove stale snapshot {path}: {e}")
+
+        cutoff = time.time() - TMP_MAX_AGE
+        for path in self.snapshot_dir.glob("*.tmp*"):  # Includes SQLite's -wal and -shm files
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError as e:
+                logger.warning(f"Could not remove temporary file {path}: {e}")
+
+    def _family_snapshots(self, ini_path: Path, current: Path) -> List[Path]:
+        """Get the other snapshots in ini_path's family"""
+        # Only match <family>_<16 hex digits>, not snapshots of similarly named files
+        return [path for path in self.snapshot_dir.glob(f"{self.snapshot_family(ini_path)}_*.db")
+                if path != current and len(path.stem) == len(current.stem)]
@@ -0,0 +1,110 @@
+from array import array
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Set, Tuple
+import heapq
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Trigrams shared by more than this share of names (e.g. "_f$", "rhs") carry
+# little signal and make posting lists long, so they are skipped when a name
+# has enough rarer trigrams to go on
+COMMON_GRAM_RATIO = 0.02
+MIN_GRAMS = 3
+
+def trigrams(name: str) -> Set[str]:
+    """Get the distinct trigrams of a case-folded name, padded at both ends"""
+    padded = f"^{name.lower()}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class ClassSuggester:
+    """
+    "Did you mean" lookups over a fixed set of class names.
+
+    Built once from the names of a database: a trigram inverted index maps
+    each trigram to the names containing it. A lookup counts the trigrams a
+    candidate shares with the misspelt name over the posting lists of its
+    trigrams only, ranks candidates by Dice similarity and re-scores the
+    short list by edit similarity, so no query scans every name.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        start = time.perf_counter()
+        self._names: List[str] = []
+        self._gram_counts = array("H")
+        postings: Dict[str, array] = {}
+        seen = set()
+        for name in names:
+            folded = name.lower()
+            if not name or folded in seen:
+                continue
+            seen.add(folded)
+            grams = trigrams(folded)
+            name_id = len(self._names)
+            self._names.append(name)
+            self._gram_counts.append(min(len(grams), 0xFFFF))
+            for gram in grams:
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("I")
+                posting.append(name_id)
+        self._postings = postings
+        self._common = max(int(len(self._names) * COMMON_GRAM_RATIO), 50)
+        logger.debug(f"Built suggestion index of {len(self._names)} names and {len(postings)} trigrams "
+                     f"in {time.perf_counter() - start:.2f}s")
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def suggest(self, name: str, limit: int = 3, min_score: float = 0.5) -> List[Tuple[str, float]]:
+        """
+        Get up to limit (name, score) pairs for the names closest to name,
+        best first. Scores are edit similarities in [0, 1].
+        """
+        if not name:
+            return []
+        folded = name.lower()
+        query_grams = trigrams(folded)
+        grams = [gram for gram in query_grams if gram in self._postings]
+        if not grams:
+            return []
+
+        # Rarest trigrams first; common ones only while too few rare ones remain
+        grams.sort(key=lambda gram: len(self._postings[gram]))
+        rare = [gram for gram in grams if len(self._postings[gram]) <= self._common]
+        if len(rare) >= MIN_GRAMS:
+            grams = rare
+
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings[gram])
+
+        # Names sharing far fewer trigrams than the best match cannot rank, so
+        # only the rest are scored
+        cutoff = max(shared.values()) * 2 // 3
+        query_size = len(query_grams)
+        counts = self._gram_counts
+        ranked = heapq.nlargest(
+            limit * 10, (item for item in shared.items() if item[1] >= cutoff),
+            key=lambda item: 2 * item[1] / (query_size + counts[item[0]]))
+
+        suggestions = []
+        matcher = SequenceMatcher(b=folded, autojunk=False)
+        for name_id, _ in ranked:
+            candidate = self._names[name_id]
+            if candidate.lower() == folded:
+                continue
+            matcher.set_seq1(candidate.lower())
+            score = matcher.ratio()
+            if score >= min_score:
+                suggestions.append((candidate, round(score, 3)))
+        suggestions.sort(key=lambda item: (-item[1], item[0]))
+        return suggestions[:limit]
+
+    def suggest_many(self, names: Iterable[str], limit: int = 3,
+                     min_score: float = 0.5) -> Dict[str, List[str]]:
+        """Get suggested names for many names at once; names without any map to []"""
+        return {name: [candidate for candidate, _ in self.suggest(name, limit, min_score)]
+                for name in dict.fromkeys(names)}
@@ -1,19 +1,23 @@
 from datetime import datetime
 from pathlib import Path
-from typing import Set, List, Optional, Dict, Any, Pattern
+from typing import Set, List, Optional, Dict, Any, FrozenSet, Pattern, Tuple
 import re
 import logging
 import traceback  # Add this import
 from .cache import CacheManager
 from .scanner import AssetScanner
-from .parser_class import ClassParser
+from .parser_class import ClassParser, PARSER_VERSION
 from .parser_ini import InidbiParser
-from .models import Asset, ClassDef
+from .models import Asset, ClassDef, EQUIPMENT_ARRAY_CATEGORIES
 from .database import ClassDatabase
+from .fingerprint import TreeFingerprint, fingerprint_tree
 from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
+# Files a mission validation parses
+CONFIG_SUFFIXES = {'.cpp', '.hpp'}
+
 class MissionValidationError(Exception):
     """Custom exception for mission validation errors"""
     def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
@@ -29,15 +33,21 @@ class MissionValidator:
     - Checking class inheritance
     - Validating config references
     - Caching results for performance
+
+    With category_scoped, equipment references are checked only against
+    the config categories their array implies (CfgMagazines for
+    magazines[], ...), and references found in another category are
+    reported as misplaced.
     """
 
-    def __init__(self, cache_dir: Path, file_patterns: Optional[List[str]] = None, config_path: Optional[Path] = None, database: Optional[ClassDatabase] = None):
+    def __init__(self, cache_dir: Path, file_patterns: Optional[List[str]] = None, config_path: Optional[Path] = None, database: Optional[ClassDatabase] = None,
+                 category_scoped: bool = False, cache_mgr: Optional[CacheManager] = None):
         if not database:
             raise ValueError("Database instance is required")
         
-        self.scanner = AssetScanner(cache_dir)
-        self.parser = ClassParser()
-        self.cache_mgr = CacheManager(cache_dir)
+        self.cache_mgr = cache_mgr or CacheManager(cache_dir)  # Shared with the caller when given
+        self.scanner = AssetScanner(cache_dir, cache_mgr=self.cache_mgr)
+        self.parser = ClassParser(cache_mgr=self.cache_mgr)
         self.file_patterns = [re.compile(p) for p in (file_patterns or [".*"])]
         self.database = database  # Use the provided database
         self._missing_classes = set()
@@ -60,6 +70,12 @@ class MissionValidator:
         self._ignored_regexes = [re.compile(p) for p in self._ignored_patterns]
         self._missing_by_source = defaultdict(set)  # Track missing items by source
         self._missing_equipment = defaultdict(set)  # Track by class category instead of source
+        self._class_status: Dict[str, bool] = {}  # Database existence, resolved once per run
+        self.category_scoped = category_scoped
+        self._misplaced: Dict[str, Set[str]] = defaultdict(set)  # Reference -> arrays it is misplaced in
+        self._scope_status: Dict[Tuple[str, FrozenSet[str]], bool] = {}  # (reference, categories) -> found
+        # Config categories of the loaded export; arrays only scope to categories it has
+        self._export_categories: FrozenSet[str] = frozenset()
 
     def get_all_classes(self) -> Set[ClassDef]:
         """Get all classes found during validation"""
@@ -84,7 +100,7 @@ class MissionValidator:
 
             # Check each class
             for class_def in sorted(classes, key=lambda x: x.name):
-                exists_in_db = self.database.get_class(class_def.name)
+                exists_in_db = self._in_database(class_def.name)
                 if exists_in_db:
                     mission_summary['found_in_database'] += 1
                 else:
@@ -115,6 +131,9 @@ class MissionValidator:
         """Validate mission folder content with enhanced error checking."""
         self._missing_classes.clear()
         self._missing_assets.clear()
+        self._class_status.clear()
+        self._misplaced.clear()
+        self._scope_status.clear()
 
         if not folder.exists():
             raise MissionValidationError(
@@ -128,11 +147,6 @@ class MissionValidator:
                 {"path": str(folder)}
             )
 
-        # Check cache first
-        cache_key = str(folder)
-        if cached := self.cache_mgr.get_cached_scan(cache_key):
-            return cached
-
         warnings = []
         try:
             # Basic validation setup
@@ -153,34 +167,48 @@ class MissionValidator:
             # Parse config files
             config_files = list(folder.rglob("*.cpp")) + list(folder.rglob("*.hpp"))
             classes = set()
+            parsed_files = self._parse_configs(folder, config_files)  # (classes, error) per config file, in order
 
-            # Process each config file
-            for config in config_files:
-                try:
-                    new_classes = self.parser.parse_file(config, treat_as_mission=True)
+            for new_classes, error in parsed_files:
+                if new_classes is not None:
                     classes.update(new_classes)
-                    
+
                     # Track classes by mission
                     mission_name = folder.name
                     self._mission_classes[mission_name].update(new_classes)
                     self._found_classes.update(new_classes)
 
-                    # Validate each class against database
-                    for cls in new_classes:
-                        if cls.is_reference:  # Equipment references
-                            if not self.database.get_class(cls.name):
-                                self._missing_classes.add(cls)
-                                warnings.append(f"Referenced equipment class '{cls.name}' not found in database")
-                        elif not getattr(cls, 'is_mission_local', False):  # Regular classes
-                            if not self.database.get_class(cls.name):
-                                self._missing_classes.add(cls)
-                                warnings.append(f"Class '{cls.name}' not found in database")
-                            if cls.parent and not self.database.get_class(cls.parent):
-                                warnings.append(f"Parent class '{cls.parent}' for '{cls.name}' not found in database")
-
-                except Exception as e:
-                    logger.error(f"Error parsing file {config}: {e}")
-                    warnings.append(f"Failed to parse {config}: {str(e)}")
+            # Resolve every referenced name against the database in one batch. Each
+            # file's classes are passed on their own: references from different
+            # files compare equal in a set but may sit in different arrays
+            if self.category_scoped:
+                self._export_categories = frozenset(self.database.get_config_categories())
+            self._resolve_classes([cls for new_classes, _ in parsed_files if new_classes for cls in new_classes])
+
+            # Validate each file's classes against database
+            for new_classes, error in parsed_files:
+                if error:
+                    warnings.append(error)
+                    continue
+                for cls in new_classes:
+                    if cls.is_reference:  # Equipment references
+                        # Each array the reference sits in is checked against its own categories
+                        misplaced = [array for array in self._scoped_arrays(cls)
+                                     if not self._in_scope(cls, array)]
+                        if not self._in_database(cls.name):
+                            self._missing_classes.add(cls)
+                            warnings.append(f"Referenced equipment class '{cls.name}' not found in database")
+                            continue
+                        for array in misplaced:
+                            self._misplaced[cls.name].add(array)
+                            warnings.append(f"Equipment class '{cls.name}' in {array}[] is not a "
+                                            f"{'/'.join(sorted(self._scope(array)))} class")
+                    elif not getattr(cls, 'is_mission_local', False):  # Regular classes
+                        if not self._in_database(cls.name):
+                            self._missing_classes.add(cls)
+                            warnings.append(f"Class '{cls.name}' not found in database")
+                        if cls.parent and not self._in_database(cls.parent):
+                            warnings.append(f"Parent class '{cls.parent}' for '{cls.name}' not found in database")
 
             # Process validation results
             non_sqf_assets = {a for a in assets if not str(a.path).lower().endswith('.sqf')}
@@ -202,11 +230,9 @@ class MissionValidator:
                 "missing_required": len(self._missing_required),
                 "class_stats": dict(self._class_stats),
                 "database_mismatches": len(warnings),
-                "missing_in_database": len([cls for cls in classes if not self.database.get_class(cls.name)])
+                "missing_in_database": len([cls for cls in classes if not self._in_database(cls.name)])
             })
 
-            # Cache results
-            self.cache_mgr.cache_scan(cache_key, warnings)
             return warnings
 
         except MissionValidationError:
@@ -222,9 +248,48 @@ class MissionValidator:
                 }
             ) from e
 
+    def _parse_configs(self, folder: Path, config_files: List[Path]) -> List[tuple]:
+        """
+        Parse the mission's config files into (classes, error) pairs, in order.
+
+        Results are cached with a fingerprint of the folder's config files;
+        only files in directories whose configs changed are parsed again, so
+        an unchanged mission is revalidated without reading a file. Reusing a
+        file's result relies on it depending on that file alone, which is
+        why the key carries the parser version.
+        """
+        fingerprint = fingerprint_tree(folder, CONFIG_SUFFIXES)
+        cache_key = f"configs|{PARSER_VERSION}|{folder.resolve().as_posix()}"
+        cached, previous = self.cache_mgr.get_scan_entry(cache_key, fingerprint.root)
+        if cached is not None:
+            changed, parsed = set(), cached["files"]
+        elif previous:
+            changed = fingerprint.changed_dirs(TreeFingerprint.from_dict(previous["fingerprint"]))
+            parsed = previous["files"]
+        else:
+            changed, parsed = set(fingerprint.dirs), {}
+
+        results = {}
+        for config in config_files:
+            rel_path = config.relative_to(folder).as_posix()
+            if rel_path in parsed and rel_path.rpartition("/")[0] not in changed:
+                results[rel_path] = parsed[rel_path]
+                continue
+            try:
+                results[rel_path] = (self.parser.parse_file(config, treat_as_mission=True), None)
+            except Exception as e:
+                logger.error(f"Error parsing file {config}: {e}")
+                results[rel_path] = (None, f"Failed to parse {config}: {str(e)}")
+
+        if cached is None:
+            self.cache_mgr.cache_scan(cache_key, {"fingerprint": fingerprint.to_dict(), "files": results},
+                                      fingerprint.root)
+            self.cache_mgr.flush()
+        return list(results.values())
+
     def get_missing_items_report(self) -> str:
         """Generate a human readable report of missing items"""
-        if not self._missing_classes and not self._missing_assets:
+        if not self._missing_classes and not self._missing_assets and not self._misplaced:
             return "No missing items found."
 
         report = []
@@ -253,6 +318,15 @@ class MissionValidator:
                 for item in sorted(other_classes):
                     report.append(f"  - {item}")
 
+        if self._misplaced:
+            report.append("\nMisplaced Equipment:")
+            report.append("-" * 40)
+            categories = self.database.get_categories(self._misplaced)
+            for name, arrays in sorted(self._misplaced.items()):
+                found_in = ", ".join(sorted(categories.get(name, ()))) or "unknown category"
+                for array in sorted(arrays):
+                    report.append(f"  - {name} in {array}[] (found in {found_in})")
+
         if self._missing_required:
             report.append("\nMissing Required Classes:")
             report.append("-" * 40)
@@ -292,14 +366,36 @@ class MissionValidator:
             by_source = defaultdict(list)
             for cls in sorted(self._missing_classes, key=lambda x: x.name):
                 by_source[cls.source].append(cls.name)
+
+            # Nearest database names for every missing class, looked up in one batch
+            suggestions = self.get_suggestions()
             
             for source, classes in sorted(by_source.items()):
                 report.append(f"\nFrom {source}:")
                 for cls in sorted(classes):
-                    report.append(f"  - {cls}")
+                    if suggestions.get(cls):
+                        report.append(f"  - {cls} (did you mean: {', '.join(suggestions[cls])}?)")
+                    else:
+                        report.append(f"  - {cls}")
 
         return "\n".join(report) if report else "No missing items found."
 
+    def get_referenced_names(self) -> Set[str]:
+        """Get every class name the mission needs from the config, as checked against the database"""
+        names = set()
+        for cls in self._found_classes:
+            if cls.is_reference or not getattr(cls, 'is_mission_local', False):
+                names.add(cls.name)
+                if cls.parent and not cls.is_reference:
+                    names.add(cls.parent)
+        return {name for name in names if not self._should_ignore_class(name)}
+
+    def get_suggestions(self, limit: int = 3) -> Dict[str, List[str]]:
+        """Get the closest database class names for each missing class"""
+        if not self._missing_classes:
+            return {}
+        return self.database.suggest_classes(sorted({cls.name for cls in self._missing_classes}), limit)
+
     def _validate_assets(self, assets: Set[Asset]) -> List[str]:
         """Validate individual assets with detailed error checking"""
         warnings = []
@@ -423,7 +519,7 @@ class MissionValidator:
         """
         warnings = []
         # Only check if class exists in database
-        if not self.database.get_class(cls.name):
+        if not self._in_database(cls.name):
             warnings.append(f"Class '{cls.name}' not found in database")
             self._missing_classes.add(cls)
         return warnings
@@ -479,8 +575,8 @@ class MissionValidator:
             if self._should_ignore_class(cls.name):
                 continue
 
-            # Case-insensitive database check
-            if not self.database.get_class(cls.name):  # Database now handles case-insensitivity
+            # Case-insensitive database check, answered from the per-run resolution
+            if not self._in_database(cls.name):
                 missing_in_db.add(cls.name)
                 self._missing_classes.add(cls)
                 warnings.append(f"Class '{cls.name}' not found in database")
@@ -494,5 +590,53 @@ class MissionValidator:
         
         return warnings
 
+    def _scope(self, array: str) -> FrozenSet[str]:
+        """Get the categories an equipment array implies, limited to those the loaded export has"""
+        return EQUIPMENT_ARRAY_CATEGORIES.get(array, frozenset()) & self._export_categories
+
+    def _scoped_arrays(self, cls: ClassDef) -> List[str]:
+        """Get the equipment arrays a reference is checked by category for in category-scoped mode"""
+        if not self.category_scoped or not cls.is_reference:
+            return []
+        return [array for array in cls.equipment_arrays if self._scope(array)]
+
+    def _in_scope(self, cls: ClassDef, array: str) -> bool:
+        """Check a reference against the categories an equipment array implies"""
+        key = (cls.name, self._scope(array))
+        if key not in self._scope_status:
+            self._resolve_scope(key[1], {cls.name})
+        return self._scope_status[key]
+
+    def _resolve_scope(self, scope: FrozenSet[str], names: Set[str]) -> Set[str]:
+        """Check a batch of references against one set of categories, returning those not found"""
+        found = self.database.resolve_in(names, scope)
+        self._scope_status.update({(name, scope): name in found for name in names})
+        self._class_status.update(dict.fromkeys(found, True))
+        return names - found
+
+    def _resolve_classes(self, classes: List[ClassDef]) -> None:
+        """Resolve class and parent names against the database in a single batch"""
+        # Scoped references are checked in one batch per set of categories;
+        # only those not found there need the plain existence check
+        by_scope: Dict[FrozenSet[str], Set[str]] = defaultdict(set)
+        for cls in classes:
+            for array in self._scoped_arrays(cls):
+                by_scope[self._scope(array)].add(cls.name)
+        unscoped = set()
+        for scope, names in by_scope.items():
+            unscoped |= self._resolve_scope(scope, {n for n in names if (n, scope) not in self._scope_status})
+
+        names = {cls.name for cls in classes if not self._scoped_arrays(cls)} | unscoped
+        names |= {cls.parent for cls in classes if cls.parent}
+        found, missing = self.database.resolve_many(names - self._class_status.keys())
+        self._class_status.update(dict.fromkeys(found, True))
+        self._class_status.update(dict.fromkeys(missing, False))
+
+    def _in_database(self, class_name: str) -> bool:
+        """Check a class against the resolved names, querying only unseen ones"""
+        if class_name not in self._class_status:
+            self._class_status[class_name] = bool(self.database.get_class(class_name))
+        return self._class_status[class_name]
+
     def _should_ignore_class(self, class_name: str) -> bool:
         """Case-insensitive pattern matching"""
@@ -1,12 +1,27 @@
 import pytest
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
+import time
 from pathlib import Path
 import tempfile
 import shutil
 from src.core.scanner import AssetScanner
+from src.core.cache import CacheManager, format_stats
 from src.core.parser_class import ClassParser
 from src.core.parser_ini import InidbiParser
 from src.core.database import ClassDatabase
-from src.core.models import ClassDef, Asset
+from src.core import snapshot
+from src.core.snapshot import SnapshotManager
+from src.core.hierarchy import ClassHierarchy
+from src.core.name_index import NameIndex, NameIndexError, write_name_index
+from src.core.attribution import AttributionIndex
+from src.core.bloom import BloomFilter
+from src.core.fingerprint import fingerprint_tree
+from src.core.serialization import MAGIC, CacheFormatError, decode, encode
+from src.core.models import ClassDef, Asset, InidbiClass
 
 # === Fixtures ===
 
@@ -97,6 +112,179 @@ def test_scan_caching(temp_dir, cache_dir):
     
     assert next(iter(assets1)).checksum == next(iter(assets2)).checksum
 
+def test_incremental_scan(temp_dir, cache_dir):
+    """Test rescans reuse unchanged directories and pick up edits"""
+    for name in ("a", "b"):
+        (temp_dir / name).mkdir()
+        (temp_dir / name / "texture.paa").write_bytes(b"v1")
+    scanner = AssetScanner(cache_dir)
+    first = scanner.scan_directory(temp_dir)
+
+    hashed = []
+    get_file_hash = scanner._get_file_hash
+    scanner._get_file_hash = lambda path: hashed.append(path) or get_file_hash(path)
+
+    assert scanner.scan_directory(temp_dir) == first
+    assert hashed == []  # Unchanged tree is answered from the cache
+
+    (temp_dir / "b" / "texture.paa").write_bytes(b"version 2")
+    (temp_dir / "b" / "notes.txt").write_text("not an asset")
+    assets = {a.path.as_posix(): a.checksum for a in scanner.scan_directory(temp_dir)}
+    assert hashed == [temp_dir / "b" / "texture.paa"]
+    assert assets["b/texture.paa"] == hashlib.md5(b"version 2").hexdigest()
+    assert assets["a/texture.paa"] == hashlib.md5(b"v1").hexdigest()
+
+    fingerprint = fingerprint_tree(temp_dir, {".paa"})
+    (temp_dir / "b" / "notes.txt").write_text("still not an asset")
+    assert fingerprint_tree(temp_dir, {".paa"}) == fingerprint
+    (temp_dir / "a" / "c").mkdir()
+    (temp_dir / "a" / "c" / "model.paa").write_bytes(b"new")
+    assert fingerprint_tree(temp_dir, {".paa"}).changed_dirs(fingerprint) == {"a/c"}
+
+def test_scan_skips_vanished_dirs(temp_dir, cache_dir, monkeypatch):
+    """Test a directory removed mid-scan is skipped and the scan is not cached"""
+    import src.core.scanner as scanner_module
+    for name in ("a", "b"):
+        (temp_dir / name).mkdir()
+        (temp_dir / name / "texture.paa").write_bytes(name.encode())
+    scanned = []
+
+    def fingerprint_then_remove(path, suffixes):
+        scanned.append(fingerprint_tree(path, suffixes))
+        shutil.rmtree(temp_dir / "b")
+        return scanned[-1]
+
+    monkeypatch.setattr(scanner_module, "fingerprint_tree", fingerprint_then_remove)
+    scanner = AssetScanner(cache_dir)
+    assets = scanner.scan_directory(temp_dir)
+    assert {a.path.as_posix() for a in assets} == {"a/texture.paa"}
+    cache_key = scanner._get_cache_key(temp_dir, [scanner_module.re.compile(".*")])
+    assert scanner.cache_mgr.get_scan_entry(cache_key, scanned[0].root) == (None, None)
+
+def test_scan_follows_directory_symlinks(temp_dir, cache_dir):
+    """Test assets under symlinked directories are scanned and fingerprinted"""
+    mission = temp_dir / "mission"
+    (temp_dir / "shared").mkdir()
+    (temp_dir / "shared" / "texture.paa").write_bytes(b"v1")
+    mission.mkdir()
+    try:
+        (mission / "linked").symlink_to(temp_dir / "shared", target_is_directory=True)
+        (mission / "loop").symlink_to(mission, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip("Symlinks not supported")
+
+    scanner = AssetScanner(cache_dir)
+    assert {a.path.as_posix() for a in scanner.scan_directory(mission)} == {"linked/texture.paa"}
+
+    fingerprint = fingerprint_tree(mission, {".paa"})
+    assert set(fingerprint.dirs) == {"", "linked"}  # The cycle back to the root is not followed
+    (temp_dir / "shared" / "texture.paa").write_bytes(b"version 2")
+    assert fingerprint_tree(mission, {".paa"}).changed_dirs(fingerprint) == {"linked"}
+    assets = {a.path.as_posix(): a.checksum for a in scanner.scan_directory(mission)}
+    assert assets["linked/texture.paa"] == hashlib.md5(b"version 2").hexdigest()
+
+def test_persistent_cache(cache_dir):
+    """Test cache entries are shared between threads and survive the manager"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = CacheManager(cache_dir)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda i: cache.cache_scan(f"pbo_{i}", [f"asset_{i}.paa"]), range(100)))
+    assert cache.get_cached_scan("pbo_99") == ["asset_99.paa"]  # Queued writes are visible at once
+    cache.close()
+
+    assert (cache_dir / "cache.db").exists()
+    with CacheManager(cache_dir) as reopened:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda i: reopened.get_cached_scan(f"pbo_{i}"), range(100)))
+        assert results == [[f"asset_{i}.paa"] for i in range(100)]
+        assert reopened.get_cached_scan("pbo_missing") is None
+
+def test_cache_eviction(cache_dir):
+    """Test the cache stays within budget by evicting least recently used entries"""
+    with CacheManager(cache_dir, max_entries=15) as cache:
+        for i in range(10):
+            cache.cache_scan(f"scan_{i}", [f"asset_{i}.paa"])
+        cache.flush()
+        assert cache.get_cached_scan("scan_0")  # Now more recently used than scan_1..9
+        for i in range(10, 20):
+            cache.cache_pbo(f"addon_{i}.pbo", f"hash_{i}", [f"asset_{i}.paa"])
+        cache.flush()
+
+        stats = cache.stats()
+        assert stats["scan_cache"].entries + stats["pbo_cache"].entries == 13  # 10% below budget
+        assert stats["scan_cache"].evictions == 7 and stats["pbo_cache"].evictions == 0
+        assert cache.get_cached_scan("scan_0") == ["asset_0.paa"]
+        assert cache.get_cached_scan("scan_1") is None
+        assert cache.get_cached_pbo("addon_19.pbo", "hash_19") == ["asset_19.paa"]
+
+        cache.max_bytes = 5 * stats["pbo_cache"].bytes // stats["pbo_cache"].entries
+        stats = cache.vacuum()
+        assert sum(s.entries for s in stats.values()) == 5
+        assert sum(s.bytes for s in stats.values()) <= cache.max_bytes
+        assert cache.get_cached_pbo("addon_19.pbo", "hash_19") == ["asset_19.paa"]
+
+def test_cache_stats(cache_dir):
+    """Test per-table cache counters"""
+    with CacheManager(cache_dir) as cache:
+        cache.cache_scan("mission", ["a warning"], fingerprint="v1")
+        cache.cache_pbo("addon.pbo", "hash", [f"asset_{i}.paa" for i in range(10)])
+        assert cache.get_cached_scan("mission", "v1") == ["a warning"]
+        assert cache.get_cached_scan("mission", "v2") is None  # Stale
+        assert cache.get_cached_scan("elsewhere") is None
+        assert cache.get_cached_pbo("addon.pbo", "hash")
+        cache.cache_scan("unencodable", [object()])
+
+        stats = cache.stats()
+        scans, pbos = stats["scan_cache"], stats["pbo_cache"]
+        assert (scans.entries, scans.hits, scans.misses, scans.writes, scans.errors) == (1, 1, 2, 1, 1)
+        assert scans.hit_rate == pytest.approx(1 / 3)
+        assert (pbos.entries, pbos.hits, pbos.misses, pbos.writes) == (1, 1, 0, 1)
+        assert pbos.bytes == pbos.bytes_written > 0
+        assert pbos.encode_seconds > 0 and pbos.decode_seconds > 0
+        assert stats["parse_cache"].lookups == 0
+
+        table = format_stats(stats)
+        assert table.splitlines()[0].split()[:3] == ["Table", "Entries", "Bytes"]
+        assert any(line.startswith("scan_cache") and "33.3%" in line for line in table.splitlines())
+
+        # A stale entry handed back for an incremental update counts as one miss
+        assert cache.get_scan_entry("mission", "v2") == (None, ["a warning"])
+        assert cache.get_scan_entry("mission", "v1") == (["a warning"], None)
+        assert cache.get_scan_entry("elsewhere", "v1") == (None, None)
+        scans = cache.stats()["scan_cache"]
+        assert (scans.hits, scans.misses) == (2, 4)
+
+def test_cache_blob_format(cache_dir):
+    """Test cache blobs round-trip without pickle and foreign data is rejected"""
+    from datetime import datetime
+    assets = {Asset(Path(f"addons/tex_{i}.paa"), f"{i:032x}", "mission", datetime(2024, 1, 1)) for i in range(500)}
+    meta = InidbiClass(category="CfgWeapons", source_mod="A3", properties={})
+    value = {"dirs": {"": assets}, "warnings": ["Missing 'é'"], "files": {
+        "gear.hpp": ({ClassDef("Rifleman", "Man", "gear.hpp", {"items": "2"}, is_reference=True),
+                      ClassDef("arifle_MX_F", None, "A3", {}, inidbi_meta=meta)}, None)}}
+
+    blob = encode(value, compress_above=1024)
+    assert blob[:4] == MAGIC and len(blob) < len(pickle.dumps(value)) // 4
+    decoded = decode(blob)
+    assert decoded == value
+    assert {a.checksum for a in decoded["dirs"][""]} == {a.checksum for a in assets}
+    classes = {c.name: c for c in decoded["files"]["gear.hpp"][0]}
+    assert classes["Rifleman"].parent == "Man" and classes["Rifleman"].is_reference
+    assert classes["arifle_MX_F"].inidbi_meta.category == "CfgWeapons"
+
+    for bad in (pickle.dumps(value), blob[:40], blob[:4] + bytes([99]) + blob[5:], b""):
+        with pytest.raises(CacheFormatError):
+            decode(bad)
+
+    with CacheManager(cache_dir) as cache:
+        cache.cache_scan("mission", ["a warning"])
+        cache.flush()
+    with sqlite3.connect(cache_dir / "cache.db") as conn:
+        conn.execute("UPDATE scan_cache SET data = ?", (pickle.dumps(["planted"]),))
+    with CacheManager(cache_dir) as cache:
+        assert cache.get_cached_scan("mission") is None  # Rejected, not unpickled
+
 def test_scan_arma3_install(cache_dir):
     """Test scanning limited set of ARMA 3 files."""
     arma3_path = Path("C:/Program Files (x86)/Steam/steamapps/common/Arma 3")
@@ -138,6 +326,49 @@ def test_parse_basic_class(sample_class_file):
     assert "count" in wheels.properties, "Wheels class missing count property"
     assert wheels.properties["count"] == "4", "Wheels count property incorrect"
 
+def test_parse_cache(sample_class_file, cache_dir, monkeypatch):
+    """Test files are parsed once per content and parser version"""
+    import src.core.parser_class as parser_class
+    parsed = []
+    parse_content = ClassParser._parse_content
+    monkeypatch.setattr(ClassParser, "_parse_content",
+                        lambda self, content, source: parsed.append(source) or parse_content(self, content, source))
+
+    with CacheManager(cache_dir) as cache:
+        first = ClassParser(cache_mgr=cache).parse_file(sample_class_file, treat_as_mission=False)
+        again = ClassParser(cache_mgr=cache).parse_file(sample_class_file, treat_as_mission=False)
+        assert parsed == ["classes"]
+        assert {(c.name, c.parent, c.source) for c in again} == {(c.name, c.parent, c.source) for c in first}
+        assert next(c for c in again if c.name == "Car.Wheels").properties["count"] == "4"
+
+        copy = sample_class_file.with_name("copy.cpp")
+        copy.write_text(sample_class_file.read_text())
+        assert {c.source for c in ClassParser(cache_mgr=cache).parse_file(copy, treat_as_mission=False)} == {"copy"}
+
+        sample_class_file.write_text("class Boat { scope = 2; };")
+        assert {c.name for c in ClassParser(cache_mgr=cache).parse_file(sample_class_file)} == {"Boat"}
+        monkeypatch.setattr(parser_class, "PARSER_VERSION", parser_class.PARSER_VERSION + 1)
+        ClassParser(cache_mgr=cache).parse_file(sample_class_file)
+        assert parsed == ["classes", "copy", "classes", "classes"]
+
+def test_parse_independent_of_history(temp_dir, cache_dir):
+    """Test a file parses the same whichever files the parser saw before"""
+    gear = 'class rifleman {\n    items[] = {"MissingThing"};\n};\n'
+    first, second = temp_dir / "a.hpp", temp_dir / "b.hpp"
+    first.write_text(gear)
+    second.write_text(gear.replace("rifleman", "medic"))
+
+    with CacheManager(cache_dir) as cache:
+        parser = ClassParser(cache_mgr=cache)
+        parser.parse_file(first)
+        after_other = parser.parse_file(second)
+        assert "MissingThing" in {c.name for c in after_other if c.is_reference}
+
+        fresh = ClassParser().parse_file(second)
+        cached = ClassParser(cache_mgr=cache).parse_file(second)
+        assert {(c.name, c.is_reference) for c in fresh} == \
+            {(c.name, c.is_reference) for c in after_other} == {(c.name, c.is_reference) for c in cached}
+
 def test_inheritance_graph(temp_dir):
     """Test building and querying inheritance graph"""
     parser = ClassParser()
@@ -261,6 +492,21 @@ def test_class_lookup(sample_inidbi_file):
     # Test non-existent class
     assert parser.get_class("NonExistent") is None
 
+def test_iter_classes_streaming(sample_inidbi_file):
+    """Test streaming INIDBI parsing yields the same classes as parse_file"""
+    parser = InidbiParser()
+    stream = parser.iter_classes(sample_inidbi_file)
+    assert not isinstance(stream, (list, set, dict)), "iter_classes should be lazy"
+
+    streamed = list(stream)
+    assert {c.name for c in streamed} == {"Car", "Truck"}
+    # Streaming must not populate the parser's lookup tables
+    assert parser.get_class("Car") is None
+
+    classes_by_source = parser.parse_file(sample_inidbi_file)
+    parsed = set().union(*classes_by_source.values())
+    assert parsed == set(streamed)
+
 def test_parse_config_extract_pca():
     """Test parsing of ConfigExtract_pca.ini file"""
     file_source = Path("D:/git/mission_checker/data/ConfigExtract_pca.ini")
@@ -351,3 +597,499 @@ def test_add_and_retrieve_class(in_memory_db):
     assert in_memory_db.get_class("testvehicle"), "Should find class with case-insensitive lookup"
     assert in_memory_db.get_class("TESTVEHICLE"), "Should find class with uppercase lookup"
 
+
+def test_add_classes_bulk(in_memory_db):
+    """Test bulk loading classes with properties and nested classes"""
+    wheels = ClassDef(name="Car.Wheels", properties={"count": "4"}, source="mod1")
+    classes = [
+        ClassDef(name="Vehicle", properties={"displayName": "Base Vehicle"}, source="base_mod"),
+        ClassDef(name="Car", parent="Vehicle", properties={"maxSpeed": "100"},
+                 source="mod1", nested_classes={wheels}),
+    ] + [ClassDef(name=f"Filler_{i}", parent="Car", source="mod1") for i in range(25)]
+
+    loaded = in_memory_db.add_classes(iter(classes), batch_size=10)
+    assert loaded == 28, "Nested classes should be loaded alongside their owners"
+
+    assert in_memory_db.get_class("car.wheels")
+    assert in_memory_db.get_class("Filler_24")
+    history = in_memory_db.get_class_history("Car.Wheels")
+    assert history[0].parent == "Car"
+    assert history[0].properties["count"] == "4"
+
+    chain = in_memory_db.get_inheritance_chain("Filler_3")
+    assert [c.name for c in chain] == ["Filler_3", "Car", "Vehicle"]
+    assert chain[1].properties["maxSpeed"] == "100"
+
+def test_replaced_classes_drop_properties(in_memory_db):
+    """Test a repeated (name, source) keeps only the last row's properties"""
+    in_memory_db.add_class(ClassDef(name="Car", source="mod1", properties={"maxSpeed": "100"}))
+    in_memory_db.add_class(ClassDef(name="Car", source="mod1", properties={"armor": "50"}))
+    in_memory_db.add_classes([ClassDef(name="Truck", source="mod1", properties={"maxSpeed": "80"}),
+                              ClassDef(name="Truck", source="mod1", properties={"armor": "90"})])
+    in_memory_db.add_classes([ClassDef(name="Car", source="mod1", properties={"fuel": "60"})])
+
+    assert dict(in_memory_db.get_class_history("Truck")[0].properties) == {"armor": "90"}
+    assert dict(in_memory_db.get_class_history("Car")[0].properties) == {"fuel": "60"}
+    conn = in_memory_db._get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM properties WHERE class_id NOT IN (SELECT id FROM classes)").fetchone()[0] == 0
+
+def test_inheritance_hierarchy(in_memory_db):
+    """Test chains, depth and descendant checks from the precomputed hierarchy"""
+    in_memory_db.add_classes(InidbiParser().iter_classes(Path(__file__).parent / "config.ini"))
+
+    # INI classes inherit through InheritsFrom rather than their Parent category
+    chain = in_memory_db.get_inheritance_chain("Truck")
+    assert [c.name for c in chain] == ["Truck", "Car", "LandVehicle", "Land", "AllVehicles", "All"]
+    assert chain[1].properties["NumProperties"] == "104"
+    assert in_memory_db.get_depth("Truck") == 5
+    assert in_memory_db.get_depth("All") == 0
+    assert in_memory_db.get_depth("Missing") is None
+
+    assert in_memory_db.is_descendant("Truck", "Land")
+    assert not in_memory_db.is_descendant("Land", "Truck")
+    assert not in_memory_db.is_descendant("Truck", "Truck")
+    assert not in_memory_db.is_descendant("Truck", "Air")
+
+    chains = in_memory_db.get_chains(["APC", "Missing"])
+    assert [c.name for c in chains["APC"]] == ["APC", "Tank", "LandVehicle", "Land", "AllVehicles", "All"]
+    assert chains["Missing"] == []
+
+    # The hierarchy is rebuilt after new classes are added
+    in_memory_db.add_class(ClassDef(name="PickupTruck", parent="Truck", source="mod1"))
+    assert in_memory_db.is_descendant("PickupTruck", "Car")
+
+def test_descendant_queries(in_memory_db):
+    """Test subtree listing and counting from the precomputed hierarchy"""
+    in_memory_db.add_classes([
+        ClassDef(name="Rifle_Base_F", source="mod1"),
+        ClassDef(name="arifle_MX_Base_F", parent="Rifle_Base_F", source="mod1"),
+        ClassDef(name="arifle_MX_F", parent="arifle_MX_Base_F", source="mod1"),
+        ClassDef(name="arifle_MXC_F", parent="arifle_MX_Base_F", source="mod1"),
+        ClassDef(name="srifle_EBR_F", parent="Rifle_Base_F", source="mod1"),
+        ClassDef(name="Pistol_Base_F", source="mod1"),
+    ])
+
+    descendants = in_memory_db.get_descendants("Rifle_Base_F")
+    assert set(descendants) == {"arifle_MX_Base_F", "arifle_MX_F", "arifle_MXC_F", "srifle_EBR_F"}
+    assert in_memory_db.count_descendants("Rifle_Base_F") == 4
+    assert in_memory_db.count_descendants("arifle_MX_Base_F") == 2
+    assert in_memory_db.get_descendants("arifle_MX_F") == []
+    assert in_memory_db.count_descendants("Missing") == 0
+    assert sorted(in_memory_db.get_hierarchy().get_children("arifle_MX_Base_F")) == ["arifle_MXC_F", "arifle_MX_F"]
+
+def test_class_suggestions(in_memory_db):
+    """Test did-you-mean lookups from the trigram index"""
+    in_memory_db.add_classes([ClassDef(name=name, source="mod1") for name in [
+        "rhs_mag_an_m8hc", "rhs_mag_an_m14th3", "rhs_mag_m67", "arifle_MX_F", "arifle_MXC_F", "Truck",
+    ]])
+
+    suggestions = in_memory_db.suggest_classes(["rhs_mag_an_m8hcx", "ARIFLE_MX_Fx", "qqqq"], limit=2)
+    assert suggestions["rhs_mag_an_m8hcx"][0] == "rhs_mag_an_m8hc"
+    assert suggestions["ARIFLE_MX_Fx"] == ["arifle_MX_F", "arifle_MXC_F"]
+    assert suggestions["qqqq"] == []
+
+    # Exact names are never suggested for themselves
+    assert "Truck" not in in_memory_db.get_suggester().suggest_many(["truck"])["truck"]
+
+def test_attribution_index():
+    """Test one coverage pass answers membership and sources for every pack"""
+    pcanext, legacy = ClassDatabase(), ClassDatabase()
+    pcanext.add_classes([
+        ClassDef(name="rhs_weap_m4a1", source="@rhsusaf"),
+        ClassDef(name="ACE_fieldDressing", source="@ace"),
+        ClassDef(name="ItemMap", source="A3"),
+    ])
+    legacy.add_classes([
+        ClassDef(name="ItemMap", source="A3"),
+        ClassDef(name="ace_fielddressing", source="@ace_legacy"),
+    ])
+
+    index = AttributionIndex.from_databases({"pcanext": pcanext, "legacy": legacy})
+    assert index.get_packs("ITEMMAP") == ["pcanext", "legacy"]
+    assert index.get_sources("ACE_fieldDressing") == ["@ace", "@ace_legacy"]
+    assert index.get_sources("ACE_fieldDressing", pack="legacy") == ["@ace_legacy"]
+
+    coverage = index.coverage(["rhs_weap_m4a1", "ACE_fieldDressing", "ItemMap", "Missing"])
+    assert coverage["pcanext"].missing == {"Missing"}
+    assert coverage["pcanext"].found == 3
+    assert coverage["legacy"].missing == {"rhs_weap_m4a1", "Missing"}
+    assert coverage["legacy"].sources == {"A3": {"ItemMap"}, "@ace_legacy": {"ACE_fieldDressing"}}
+
+    with pytest.raises(ValueError):
+        index.add_pack("legacy", legacy)
+
+def test_lazy_properties(in_memory_db):
+    """Test stored properties load on first access and keep commas intact"""
+    in_memory_db.add_classes([
+        ClassDef(name="Base", source="mod1", properties={"magazines": "{a,b,c}", "scope": "2"}),
+        ClassDef(name="Rifle", parent="Base", source="mod1", properties={"displayName": "Rifle, Mk1"}),
+    ])
+
+    chain = in_memory_db.get_inheritance_chain("Rifle")
+    assert [c.name for c in chain] == ["Rifle", "Base"]
+    assert not any(c.properties.loaded for c in chain), "Chain walks should not read properties"
+    assert chain[1].properties["magazines"] == "{a,b,c}"
+    assert dict(chain[0].properties) == {"displayName": "Rifle, Mk1"}
+
+    history = in_memory_db.get_class_history("base")
+    assert not history[0].properties.loaded
+    assert list(history[0].properties) == ["magazines", "scope"]
+
+    # Keys are stored once and shared between classes
+    conn = in_memory_db._get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM property_keys").fetchone()[0] == 3
+
+def test_name_index(in_memory_db, temp_dir):
+    """Test the memory-mapped name index answers lookups like the database"""
+    in_memory_db.add_classes(InidbiParser().iter_classes(Path(__file__).parent / "config.ini"))
+    index_path = temp_dir / "classes.idx"
+    assert write_name_index(in_memory_db, index_path) == in_memory_db.count_classes()
+
+    with NameIndex(index_path) as index:
+        assert index.get_class("landvehicle") and "LANDVEHICLE" in index
+        assert not index.get_class("Missing") and not index.get_class("")
+        assert index.get_name("landvehicle") == "LandVehicle"
+        assert index.get_parent("car") == "LandVehicle"
+        assert index.get_parent("All") is None
+        assert index.get_chain("truck") == [c.name for c in in_memory_db.get_inheritance_chain("Truck")]
+        assert index.get_source("Car") == "@em"
+        assert index.get_category("Car") == "CfgVehicles"
+
+        # Pickling sends only the path; the copy maps the same file
+        copy = pickle.loads(pickle.dumps(index))
+        assert copy.get_parent("Truck") == "Car"
+        copy.close()
+
+    index_path.write_bytes(b"not an index")
+    with pytest.raises(NameIndexError):
+        NameIndex(index_path)
+
+def test_name_index_portable_fields(in_memory_db, temp_dir, monkeypatch):
+    """Test record fields decode as little-endian without the native-order cast"""
+    from src.core import name_index
+    monkeypatch.setattr(name_index, "_NATIVE_LITTLE", False)  # As on a big-endian host
+    record = bytes.fromhex("01000000 02000000 03000000 04000000 ffffffff 05000000 06000000")
+    assert list(name_index._record_fields(record, 0, 1)) == [1, 2, 3, 4, 0xFFFFFFFF, 5, 6]
+
+    in_memory_db.add_classes(InidbiParser().iter_classes(Path(__file__).parent / "config.ini"))
+    index_path = temp_dir / "classes.idx"
+    write_name_index(in_memory_db, index_path)
+    with NameIndex(index_path) as index:
+        assert not isinstance(index._fields, memoryview)
+        assert index.get_name("landvehicle") == "LandVehicle"
+        assert index.get_chain("truck") == [c.name for c in in_memory_db.get_inheritance_chain("Truck")]
+
+    # A record count reaching past the records section is rejected, not sliced
+    data = bytearray(index_path.read_bytes())
+    data[12:16] = (10 ** 6).to_bytes(4, "little")
+    index_path.write_bytes(bytes(data))
+    with pytest.raises(NameIndexError):
+        NameIndex(index_path)
+
+def test_hierarchy_breaks_cycles():
+    """Test inheritance cycles are cut instead of looping"""
+    hierarchy = ClassHierarchy([("A", "C"), ("B", "A"), ("C", "B"), ("D", "B"), ("E", None)])
+    # The cycle is cut above A, the first of its classes reached
+    assert hierarchy.get_chain("D") == ["D", "B", "A"]
+    assert hierarchy.get_chain("C") == ["C", "B", "A"]
+    assert hierarchy.is_descendant("C", "A")
+    assert not hierarchy.is_descendant("A", "C")
+    assert hierarchy.get_depth("E") == 0
+
+def test_concurrent_readers(temp_dir):
+    """Test threads query a shared database through connections of their own"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    classes = [ClassDef(name=f"Class_{i}", parent=f"Class_{i // 2}" if i else None, source="mod1",
+                        properties={"scope": "2"}) for i in range(200)]
+    file_db = ClassDatabase(temp_dir / "classes.db")
+    file_db.add_classes(classes)
+    file_db.finalize()
+    file_db.close()
+
+    for database in (ClassDatabase(), ClassDatabase(temp_dir / "classes.db", read_only=True)):
+        if not database.read_only:
+            database.add_classes(classes)
+
+        def check(i):
+            history = database.get_class_history(f"class_{i}")
+            return (database.get_class(f"CLASS_{i}"), history[0].properties["scope"],
+                    len(database.get_inheritance_chain(f"Class_{i}")), database._get_connection())
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(check, range(200)))
+        assert all(found and scope == "2" for found, scope, _, _ in results)
+        assert results[7][2] == 4  # Class_7 -> 3 -> 1 -> 0
+        assert database._get_connection() not in {conn for _, _, _, conn in results}
+
+        database.close()
+        with pytest.raises(sqlite3.ProgrammingError):
+            database.count_classes()
+
+def test_bloom_filter():
+    """Test the filter never rejects an added name and round-trips through bytes"""
+    names = [f"rhs_weap_class_{i}" for i in range(5000)]
+    bloom = BloomFilter.from_items(names, len(names), error_rate=0.01)
+    assert all(name in bloom for name in names)
+    false_positives = sum(f"missing_{i}" in bloom for i in range(5000))
+    assert false_positives < 150  # ~1% expected
+
+    restored = BloomFilter.from_bytes(bloom.to_bytes())
+    assert (restored.size, restored.probes) == (bloom.size, bloom.probes)
+    assert all(name in restored for name in names[:100])
+    with pytest.raises(ValueError):
+        BloomFilter.from_bytes(bloom.to_bytes()[:-1])
+    for rate in (0, -0.1, 1, 1.5):
+        with pytest.raises(ValueError):
+            BloomFilter.for_capacity(100, rate)
+
+def test_bloom_lookups(temp_dir):
+    """Test existence checks through the stored filter and its counters"""
+    db_path = temp_dir / "classes.db"
+    database = ClassDatabase(db_path)
+    database.add_classes([ClassDef(name=f"Class_{i}", source="mod1") for i in range(100)])
+    database.finalize()
+    database.close()
+
+    database = ClassDatabase(db_path, read_only=True, use_bloom=True)
+    assert database.has_bloom
+    assert database.get_class("CLASS_5")
+    assert not database.get_class("Missing_5")
+    found, missing = database.resolve_many(["class_7", "Missing_7", "Missing_8"])
+    assert found == {"class_7"} and missing == {"Missing_7", "Missing_8"}
+    assert database._folded_names is None, "Lookups should not load the name set"
+    stats = database.bloom_stats
+    assert stats.hits == 2
+    assert stats.negatives + stats.false_positives == 3
+    database.close()
+
+    # Writing classes drops the stored filter until the next finalize
+    database = ClassDatabase(db_path)
+    database.add_class(ClassDef(name="Late", source="mod1"))
+    database.close()
+    database = ClassDatabase(db_path, read_only=True, use_bloom=True)
+    assert not database.has_bloom
+    assert database.get_class("late")
+    database.close()
+
+    # A writer opened with use_bloom picks the filter up again once it is finalized
+    database = ClassDatabase(db_path, use_bloom=True)
+    database.add_classes([ClassDef(name="Later", source="mod1")])
+    assert not database.has_bloom
+    database.finalize()
+    assert database.has_bloom
+    assert database.get_class("later") and not database.get_class("Missing_9")
+    assert database.bloom_stats.hits == 1
+    database.close()
+
+    # Lookups on several threads all land in the shared counters
+    from concurrent.futures import ThreadPoolExecutor
+    database = ClassDatabase(db_path, read_only=True, use_bloom=True)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert all(pool.map(lambda i: database.get_class(f"Class_{i % 100}"), range(800)))
+    assert database.bloom_stats.hits == 800
+    database.close()
+
+def test_snapshot_reuse_and_rebuild(temp_dir):
+    """Test compiled snapshots are reused until the INI content changes"""
+    ini_path = temp_dir / "ConfigExtract_test.ini"
+    ini_path.write_text((Path(__file__).parent / "config.ini").read_text())
+    snapshots = SnapshotManager(temp_dir / "snapshots")
+
+    db = snapshots.load(ini_path)
+    assert db.read_only
+    assert db.get_class("LandVehicle")
+    first_path = db.db_path
+    first_built = first_path.stat().st_mtime_ns
+    with snapshots.get_name_index(db) as index:
+        assert index.get_class("landvehicle")
+    db.close()
+
+    # Unchanged content reuses the existing file
+    db = snapshots.load(ini_path)
+    assert db.db_path == first_path
+    assert first_path.stat().st_mtime_ns == first_built
+    db.close()
+
+    # Changed content builds a new snapshot and removes the stale one
+    with ini_path.open("a") as f:
+        f.write('\n50=""NewThing,@test,CfgVehicles,CfgVehicles,All,false,1,2,""\n')
+    db = snapshots.load(ini_path)
+    assert db.db_path != first_path
+    assert not first_path.exists()
+    assert not snapshots.name_index_path(first_path).exists()
+    assert db.get_class("newthing")
+    db.close()
+
+def test_snapshot_families_per_folder(temp_dir):
+    """Test same-named exports from different folders keep their own snapshots"""
+    config = (Path(__file__).parent / "config.ini").read_text()
+    # Characters with a meaning in SQLite URIs must not reach the URI unescaped
+    snapshots = SnapshotManager(temp_dir / "cache #1 100%" / "snapshots")
+    paths = []
+    for pack in ("modpackA", "modpackB"):
+        ini_path = temp_dir / pack / "ConfigExtract.ini"
+        ini_path.parent.mkdir()
+        ini_path.write_text(config + f'\n50=""{pack}_Thing,@test,CfgVehicles,CfgVehicles,All,false,1,2,""\n')
+        db = snapshots.load(ini_path)
+        assert db.get_class(f"{pack}_Thing")
+        paths.append(db.db_path)
+        db.close()
+    assert all(path.exists() for path in paths)
+
+    # Temporary files abandoned by a crashed build are removed, fresh ones kept
+    abandoned = snapshots.snapshot_dir / "ConfigExtract-0_0.123.tmp"
+    building = snapshots.snapshot_dir / "ConfigExtract-0_0.456.tmp"
+    abandoned.touch()
+    building.touch()
+    old = time.time() - 2 * snapshot.TMP_MAX_AGE
+    os.utime(abandoned, (old, old))
+    snapshots.load(temp_dir / "modpackA" / "ConfigExtract.ini", rebuild=True).close()
+    assert not abandoned.exists()
+    assert building.exists()
+
+def test_snapshot_incremental_update(temp_dir):
+    """Test a new timestamped export is applied to the previous snapshot as a diff"""
+    lines = (Path(__file__).parent / "config.ini").read_text().splitlines()
+    old_ini = temp_dir / "ConfigExtract_2024-05-01_18-30-00.ini"
+    old_ini.write_text("\n".join(lines) + "\n")
+    snapshots = SnapshotManager(temp_dir / "snapshots", incremental=True)
+    snapshots.load(old_ini).close()
+    assert snapshots.last_diff is None  # Nothing to diff against yet
+
+    # Drop Logic, change Car's property count and add a class
+    new_lines = [line for line in lines if '""Logic,' not in line]
+    new_lines = [line.replace('""Car,@em,CfgVehicles,CfgVehicles,LandVehicle,false,104,',
+                              '""Car,@em,CfgVehicles,CfgVehicles,LandVehicle,false,105,')
+                 for line in new_lines]
+    new_lines.insert(2, '999=""NewThing,@test,CfgVehicles,CfgVehicles,All,false,1,2,""')
+    new_ini = temp_dir / "ConfigExtract_2024-05-02_18-30-00.ini"
+    new_ini.write_text("\n".join(new_lines) + "\n")
+
+    db = snapshots.load(new_ini)
+    diff = snapshots.last_diff
+    assert set(diff.added) == {("NewThing", "@test")}
+    assert diff.removed == {("Logic", "curator")}
+    assert set(diff.changed) == {("Car", "@em")}
+    assert len(list((temp_dir / "snapshots").glob("*.db"))) == 1
+
+    # The updated snapshot holds the same classes as a full build
+    full = ClassDatabase()
+    full.add_classes(InidbiParser().iter_classes(new_ini))
+    query = "SELECT c.name, c.source, c.row_hash, COUNT(p.key_id) FROM classes c " \
+            "LEFT JOIN properties p ON p.class_id = c.id GROUP BY c.id ORDER BY c.name, c.source"
+    assert [tuple(r) for r in db._get_connection().execute(query)] == \
+        [tuple(r) for r in full._get_connection().execute(query)]
+    assert not db.get_class("Logic")
+    assert snapshots.get_stats(db).classes == full.count_classes()
+    db.close()
+    full.close()
+
+def test_case_insensitive_lookup_uses_index(in_memory_db):
+    """Test case-folded lookups are served by an index rather than a scan"""
+    in_memory_db.add_class(ClassDef(name="rhs_mag_AN_M8HC", source="rhs"))
+
+    assert in_memory_db.get_class("RHS_MAG_an_m8hc")
+    assert not in_memory_db.get_class("rhs_mag_an_m8hcx")
+    assert in_memory_db.get_class_history("RHS_MAG_AN_M8HC")[0].name == "rhs_mag_AN_M8HC"
+
+    # Names added after the in-process set is loaded are still found
+    in_memory_db.add_classes([ClassDef(name="Late_Addition", source="rhs")])
+    assert in_memory_db.get_class("late_addition")
+
+    plan = in_memory_db._get_connection().execute(
+        "EXPLAIN QUERY PLAN SELECT 1 FROM classes WHERE name_folded = ?", ("x",)
+    ).fetchall()
+    assert any("idx_classes_name_folded" in row[-1] for row in plan)
+
+def test_resolve_many(in_memory_db):
+    """Test batch existence checks split names into found and missing"""
+    in_memory_db.add_classes([
+        ClassDef(name="Vehicle", source="base_mod"),
+        ClassDef(name="Car", parent="Vehicle", source="mod1"),
+    ])
+
+    found, missing = in_memory_db.resolve_many(["car", "VEHICLE", "Plane", None, ""])
+    assert found == {"car", "VEHICLE"}
+    assert missing == {"Plane"}
+
+def test_inidbi_compact_rows():
+    """Test INI rows share interned values behind a read-only properties view"""
+    classes = {c.name: c for c in InidbiParser().iter_classes(Path(__file__).parent / "config.ini")}
+    car, tank = classes["Car"], classes["Tank"]
+
+    assert dict(car.properties) == {
+        "ClassName": "Car", "Source": "@em", "Category": "CfgVehicles", "Parent": "CfgVehicles",
+        "InheritsFrom": "LandVehicle", "IsSimpleObject": "false", "NumProperties": "104",
+        "Scope": "0", "Model": "\\A3\\Weapons_F\\empty.p3d",
+    }
+    assert car.properties is car.inidbi_meta.properties
+    assert car.inidbi_meta.inherits_from == "LandVehicle"
+    assert car.inidbi_meta.num_properties == 104
+
+    # Repeated values are stored once
+    assert car.source is tank.source
+    assert car.inidbi_meta.model is tank.inidbi_meta.model
+    if sys.version_info >= (3, 10):
+        assert not hasattr(car, "__dict__"), "ClassDef should be slotted"
+
+def test_block_decoder_rows():
+    """Test the block decoder splits rows and carries section state across blocks"""
+    parser = InidbiParser()
+    blocks = [
+        ['[CategoryData_CfgWeapons]\n', 'header=""ClassName,Source,DisplayName""\n',
+         '0=""rifle_a,@mod, Rifle ""\n', '; comment\n'],
+        ['1=""rifle_b,"@mod, x",B""\n', '[Other]\n', '2=""rifle_c,@mod,C""\n',
+         '[CategoryData_CfgWeapons]\n', 'header=""ClassName,Source,Scope""\n', '3=""rifle_d,@mod,2""\n'],
+    ]
+    decoded = list(parser._decode_blocks(blocks))
+
+    # Rows of the [Other] section are not classes
+    assert [(category, headers, len(rows)) for category, headers, rows in decoded] == [
+        ("CfgWeapons", ["ClassName", "Source", "DisplayName"], 1),
+        ("CfgWeapons", ["ClassName", "Source", "DisplayName"], 1),
+        ("CfgWeapons", ["ClassName", "Source", "Scope"], 1),
+    ]
+    assert decoded[0][2] == [["rifle_a", "@mod", " Rifle "]]
+    # Quotes left inside a row fall back to csv parsing
+    assert decoded[1][2][0] == ["rifle_b", "@mod, x", "B"]
+
+    classes = list(parser._create_classes(decoded))
+    assert [c.name for c in classes] == ["rifle_a", "rifle_b", "rifle_d"]
+    assert classes[0].inidbi_meta.display_name == "Rifle"
+    assert classes[2].inidbi_meta.scope == 2
+
+def test_parallel_ini_parsing_matches_serial():
+    """Test section-sharded parallel parsing produces the serial result"""
+    config_path = Path(__file__).parent / "config.ini"
+    serial = InidbiParser().parse_file(config_path)
+
+    parser = InidbiParser()
+    shards = parser.find_shards(config_path, shard_size=512)
+    assert len(shards) > 2, "Small shard size should split sections into several shards"
+    assert {s[3] for s in shards} == {c.inidbi_meta.category for cs in serial.values() for c in cs}
+
+    parallel = list(parser._iter_classes_parallel(config_path, workers=2, shard_size=512))
+    assert [c.name for c in parallel] == [c.name for c in parser.iter_classes(config_path)]
+    assert {source: {c.name for c in cs} for source, cs in serial.items()} == \
+        {source: {c.name for c in cs} for source, cs in InidbiParser().parse_file(config_path, workers=2).items()}
+
+def test_parallel_ini_parsing_skips_other_sections(tmp_path):
+    """Test rows of non-CategoryData sections are skipped by both decoders"""
+    header = 'header=""ClassName,Source,Category,Parent,InheritsFrom,IsSimpleObject,NumProperties,Scope,Model""'
+    lines = ["[CategoryData_CfgWeapons]", header]
+    lines += [f'{i}=""rifle_{i},@mod,CfgWeapons,CfgWeapons,,false,1,2,""' for i in range(40)]
+    lines += ["[Other]"]
+    lines += [f'{i}=""other_{i},@mod,CfgWeapons,CfgWeapons,,false,1,2,""' for i in range(40)]
+    lines += ["[CategoryData_CfgMagazines]", header]
+    lines += [f'{i}=""mag_{i},@mod,CfgMagazines,CfgMagazines,,false,1,2,""' for i in range(40)]
+    config_path = tmp_path / "config.ini"
+    config_path.write_text("\n".join(lines) + "\n")
+
+    parser = InidbiParser()
+    serial = [c.name for c in parser.iter_classes(config_path)]
+    assert len(parser.find_shards(config_path, shard_size=512)) > 2
+    parallel = [c.name for c in parser._iter_classes_parallel(config_path, workers=2, shard_size=512)]
+    assert parallel == serial
+    assert not any(name.startswith("other_") for name in serial)
+    assert len(serial) == 80
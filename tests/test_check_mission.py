@@ -1,9 +1,12 @@
 import pytest
 from pathlib import Path
-from src.check_mission import validate_paths, validate_ini_file, write_validation_report
+from src.check_mission import validate_paths, validate_ini_file, validate_ini_stats, write_validation_report, write_diff_report, write_coverage_report, compare_packs, error_rate
+from src.core.snapshot import SnapshotManager
 from src.core.validator import MissionValidator
 from src.core.database import ClassDatabase
+from src.core.models import ConfigDiff, PackCoverage
 import tempfile
+import argparse
 import yaml
 
 @pytest.fixture
@@ -56,6 +59,27 @@ def test_validate_ini_file(temp_ini_file):
     assert result is not None
     assert "not found" in result
 
+def test_snapshot_ini_stats(temp_ini_file, tmp_path):
+    """Test ingestion statistics are collected in the same pass that loads the database"""
+    with open(temp_ini_file, 'a') as f:
+        f.write('3="Broken"\n')
+
+    snapshots = SnapshotManager(tmp_path / "snapshots")
+    database = snapshots.load(temp_ini_file)
+    stats = snapshots.get_stats(database)
+
+    assert stats.classes == 2
+    assert stats.malformed_lines == 1
+    assert stats.sources == {"vanilla": 1, "mod_x": 1}
+    assert sum(stats.categories.values()) == 2
+    assert validate_ini_stats(stats) is None
+    database.close()
+
+    # Reopening the snapshot returns the recorded stats without re-parsing
+    database = snapshots.load(temp_ini_file)
+    assert snapshots.get_stats(database) == stats
+    database.close()
+
 def test_write_validation_report(temp_mission_dir):
     """Test report generation"""
     database = ClassDatabase()
@@ -94,3 +118,68 @@ def test_write_validation_report(temp_mission_dir):
         yaml_data = yaml.safe_load(f)
         assert yaml_data['missions']['test_mission']['total_classes'] == 10
         assert len(yaml_data['warnings']) == 1
+
+def test_write_diff_report(tmp_path):
+    """Test config diff report generation"""
+    diff = ConfigDiff(
+        added={("NewThing", "@test"): "0" * 16},
+        removed={("Logic", "curator")},
+        changed={("Car", "@em"): "1" * 16},
+        unchanged=5
+    )
+
+    report_path = write_diff_report(diff, tmp_path / "ConfigExtract_2024-05-02_18-30-00.ini")
+    assert report_path.exists()
+    assert "- Logic" in report_path.read_text()
+
+    with open(report_path.with_suffix('.yml')) as f:
+        yaml_data = yaml.safe_load(f)
+        assert yaml_data['unchanged'] == 5
+        assert yaml_data['classes']['added'] == {"@test": ["NewThing"]}
+        assert yaml_data['classes']['changed'] == {"@em": ["Car"]}
+
+def test_write_coverage_report(tmp_path):
+    """Test modpack coverage report generation"""
+    coverage = {
+        "pcanext": PackCoverage(pack="pcanext", total=2, sources={"@ace": {"ACE_fieldDressing"}, "A3": {"ItemMap"}}),
+        "legacy": PackCoverage(pack="legacy", total=2, missing={"ACE_fieldDressing"}, sources={"A3": {"ItemMap"}}),
+    }
+
+    report_path = write_coverage_report(coverage, tmp_path / "op_test.Altis")
+    text = report_path.read_text()
+    assert "pcanext: 2/2 classes (complete)" in text
+    assert "legacy: 1/2 classes (1 missing)" in text
+
+    with open(report_path.with_suffix('.yml')) as f:
+        yaml_data = yaml.safe_load(f)
+        assert yaml_data['legacy']['missing'] == ["ACE_fieldDressing"]
+        assert yaml_data['pcanext']['sources'] == {"@ace": ["ACE_fieldDressing"], "A3": ["ItemMap"]}
+
+def test_compare_packs_labels(temp_ini_file, tmp_path):
+    """Test compared configs sharing a file name are reported under distinct labels"""
+    other = tmp_path / "other" / temp_ini_file.name
+    other.parent.mkdir()
+    other.write_text('[CategoryData_Vehicles]\n1="Car,vanilla,vehicles,Vehicle,,false,5,2,"\n')
+    mission = tmp_path / "mission"
+    mission.mkdir()
+
+    snapshots = SnapshotManager(tmp_path / "snapshots")
+    database = snapshots.load(temp_ini_file)
+    paths = {"Config": temp_ini_file, "Missions": mission}
+    try:
+        coverage = compare_packs(snapshots, database, paths, [str(temp_ini_file), str(other)], {"Car", "Truck"})
+    finally:
+        database.close()
+
+    stem = temp_ini_file.stem
+    assert list(coverage) == [stem, f"{stem}-2"]
+    assert coverage[stem].is_complete
+    assert coverage[f"{stem}-2"].missing == {"Truck"}
+
+def test_bloom_error_rate_argument():
+    """Test --bloom-error-rate accepts 0 or a rate between 0 and 1"""
+    assert error_rate("0") == 0
+    assert error_rate("0.05") == 0.05
+    for value in ("-0.1", "1", "2", "x"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            error_rate(value)
@@ -2,7 +2,7 @@ import pytest
 from pathlib import Path
 from src.core.validator import MissionValidator, MissionValidationError
 from src.core.database import ClassDatabase
-from src.core.models import ClassDef
+from src.core.models import ClassDef, InidbiClass
 import tempfile
 
 @pytest.fixture
@@ -83,6 +83,121 @@ class baseMan {
     assert "NonExistentMedkit" in report
     assert "NonExistentNVG" in report
 
+def test_missing_class_suggestions(validator):
+    """Test missing classes are reported with their nearest database names"""
+    validator._validate_against_database({
+        ClassDef("Truk", None, "description.ext", {}),
+        ClassDef("Xyzzy", None, "description.ext", {}),
+    })
+
+    assert validator.get_suggestions() == {"Truk": ["Truck"], "Xyzzy": []}
+    report = validator.get_missing_items_report()
+    assert "  - Truk (did you mean: Truck?)" in report
+    assert "  - Xyzzy\n" in report or report.endswith("  - Xyzzy")
+
+def test_category_scoped_validation(tmp_path):
+    """Test references are checked against the categories their arrays imply"""
+    database = ClassDatabase()
+    for name, category in [("U_B_CombatUniform_mcam", "CfgWeapons"),
+                           ("30Rnd_556x45_Stanag", "CfgMagazines"),
+                           ("B_AssaultPack_mcamo", "CfgVehicles")]:
+        meta = InidbiClass(category=category, source_mod="A3", properties={})
+        database.add_class(ClassDef(name, None, "A3", {}, inidbi_meta=meta))
+    database.add_class(ClassDef("FirstAidKit", None, "test", {}))  # Category unknown
+
+    mission_path = tmp_path / "test_mission.vr"
+    mission_path.mkdir()
+    (mission_path / "gear.hpp").write_text("""
+class rifleman {
+    uniform = "30Rnd_556x45_Stanag";
+    backpack = "B_AssaultPack_mcamo";
+    magazines[] = {LIST_2("30Rnd_556x45_Stanag")};
+    items[] = {"FirstAidKit"};
+};
+""")
+
+    validator = MissionValidator(cache_dir=tmp_path / ".cache", database=database, category_scoped=True)
+    # References are resolved in batches, never one query per name
+    def single_lookup(*args):
+        raise AssertionError("Per-reference database lookup")
+    database.get_class = database.get_class_in = single_lookup
+    warnings = validator.validate_mission_folder(mission_path)
+    del database.get_class, database.get_class_in
+    assert any("'30Rnd_556x45_Stanag' in uniform[] is not a CfgWeapons class" in w for w in warnings)
+    assert not any("B_AssaultPack_mcamo" in w or "FirstAidKit" in w for w in warnings)
+    assert "30Rnd_556x45_Stanag in uniform[] (found in CfgMagazines)" in validator.get_missing_items_report()
+
+    # Every array a reference appears in is checked, whichever comes first
+    (mission_path / "gear.hpp").write_text("""
+class rifleman {
+    magazines[] = {LIST_2("30Rnd_556x45_Stanag")};
+    uniform = "30Rnd_556x45_Stanag";
+};
+""")
+    warnings = validator.validate_mission_folder(mission_path)
+    assert any("'30Rnd_556x45_Stanag' in uniform[] is not a CfgWeapons class" in w for w in warnings)
+    assert not any("in magazines[]" in w for w in warnings)
+
+    assert database.get_class_in("b_assaultpack_mcamo", ["CfgVehicles"])
+    assert not database.get_class_in("B_AssaultPack_mcamo", ["CfgWeapons"])
+    assert database.get_categories(["30RND_556x45_Stanag"]) == {"30RND_556x45_Stanag": {"CfgMagazines"}}
+
+def test_category_scope_limited_to_export(tmp_path):
+    """Test arrays only scope to config categories the loaded export contains"""
+    # Like INIDBI2 exports, which hold CfgWeapons and CfgVehicles but no CfgMagazines
+    database = ClassDatabase()
+    for name, category in [("arifle_MX_F", "CfgWeapons"), ("B_AssaultPack_mcamo", "CfgVehicles")]:
+        meta = InidbiClass(category=category, source_mod="A3", properties={})
+        database.add_class(ClassDef(name, None, "A3", {}, inidbi_meta=meta))
+
+    mission_path = tmp_path / "test_mission.vr"
+    mission_path.mkdir()
+    (mission_path / "gear.hpp").write_text("""
+class rifleman {
+    magazines[] = {"arifle_MX_F"};
+    uniform = "B_AssaultPack_mcamo";
+};
+""")
+    validator = MissionValidator(cache_dir=tmp_path / ".cache", database=database, category_scoped=True)
+    warnings = validator.validate_mission_folder(mission_path)
+    # magazines[] cannot be checked without CfgMagazines; uniform[] still is
+    assert not any("arifle_MX_F" in w for w in warnings)
+    assert any("'B_AssaultPack_mcamo' in uniform[] is not a CfgWeapons class" in w for w in warnings)
+
+def test_unchanged_configs_not_reparsed(validator, tmp_path):
+    """Test revalidation only parses config files whose directory changed"""
+    mission_path = tmp_path / "test_mission.vr"
+    (mission_path / "loadouts").mkdir(parents=True)
+    (mission_path / "config.cpp").write_text("class MyCar: Car {};\n")
+    (mission_path / "loadouts" / "gear.hpp").write_text('class rifleman {\n    items[] = {"Truck"};\n};\n')
+    first = validator.validate_mission_folder(mission_path)
+
+    parsed = []
+    parse_file = validator.parser.parse_file
+    validator.parser.parse_file = lambda path, **kwargs: parsed.append(path.name) or parse_file(path, **kwargs)
+
+    assert sorted(validator.validate_mission_folder(mission_path)) == sorted(first)
+    assert parsed == []
+    assert "MyCar" in {c.name for c in validator.get_all_classes()}  # State is rebuilt from the cache
+
+    (mission_path / "loadouts" / "gear.hpp").write_text('class rifleman {\n    items[] = {"Truk"};\n};\n')
+    warnings = validator.validate_mission_folder(mission_path)
+    assert parsed == ["gear.hpp"]
+    assert "Referenced equipment class 'Truk' not found in database" in warnings
+
+def test_reused_configs_keep_shared_references(validator, tmp_path):
+    """Test a reference shared by two directories survives editing one of them"""
+    mission_path = tmp_path / "test_mission.vr"
+    (mission_path / "loadouts").mkdir(parents=True)
+    (mission_path / "a.hpp").write_text('class rifleman {\n    items[] = {"MissingThing"};\n};\n')
+    (mission_path / "loadouts" / "b.hpp").write_text('class medic {\n    items[] = {"MissingThing"};\n};\n')
+    warning = "Referenced equipment class 'MissingThing' not found in database"
+    assert validator.validate_mission_folder(mission_path).count(warning) == 2
+
+    # Only a.hpp is parsed again; b.hpp's cached result still holds the reference
+    (mission_path / "a.hpp").write_text('class rifleman {\n    items[] = {"Truck"};\n};\n')
+    assert validator.validate_mission_folder(mission_path).count(warning) == 1
+
 def test_validation_error_handling(validator, tmp_path):
     """Test error handling during validation"""
     non_existent = tmp_path / "non_existent"
@@ -112,3 +227,38 @@ class Vehicles {
     warnings2 = validator.validate_mission_folder(mission_path)
     
     assert warnings1 == warnings2  # Results should be identical
+
+def test_database_resolved_once_per_run(validator, database, tmp_path):
+    """Test class existence is resolved in one batch and reused for stats and summary"""
+    mission_path = tmp_path / "test_mission.vr"
+    mission_path.mkdir()
+    (mission_path / "config.cpp").write_text("""
+class MyCar: Car {
+    maxSpeed = 100;
+};
+class MyTruck: MissingBase {
+    maxSpeed = 80;
+};
+""")
+
+    calls = {"resolve_many": 0, "get_class": 0}
+    resolve_many, get_class = database.resolve_many, database.get_class
+
+    def counting_resolve_many(names):
+        calls["resolve_many"] += 1
+        return resolve_many(names)
+
+    def counting_get_class(name):
+        calls["get_class"] += 1
+        return get_class(name)
+
+    database.resolve_many = counting_resolve_many
+    database.get_class = counting_get_class
+
+    warnings = validator.validate_mission_folder(mission_path)
+    summary = validator.get_validation_summary()
+
+    assert calls == {"resolve_many": 1, "get_class": 0}
+    assert "Parent class 'MissingBase' for 'MyTruck' not found in database" in warnings
+    assert validator._validation_stats["missing_in_database"] == 2
+    assert summary["missions"]["test_mission.vr"]["missing_from_database"] == 2